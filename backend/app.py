@@ -1,11 +1,23 @@
 # backend/app.py
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 from utils.gemini_handler import GeminiHandler
 from database.chromadb_manager import ChromaDBManager
+from database.history_store import parse_feedback_cursor
 from services.health_tips import HealthTipsService
+from utils.async_runtime import AsyncRuntime
+from utils.metrics import metrics
+from utils.deadline import Deadline
+from utils.logging_config import configure_logging, logging_stats, parse_module_levels
 from config import Config
+from datetime import date
+from typing import Optional
+import asyncio
+import atexit
+import json
+import logging
 import os
+import time
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -13,15 +25,62 @@ CORS(app)
 
 # Load configuration
 config = Config()
+configure_logging(
+    level=config.LOG_LEVEL,
+    module_levels=parse_module_levels(config.LOG_LEVELS),
+    fmt=config.LOG_FORMAT,
+    queue_size=config.LOG_QUEUE_SIZE,
+    debug_sample_rate=config.LOG_DEBUG_SAMPLE_RATE
+)
+logger = logging.getLogger(__name__)
+metrics.enabled = config.METRICS_ENABLED
+metrics.window = config.METRICS_WINDOW
+
+# One long-lived event loop for all async work, so pooled LLM clients and
+# in-flight coalescing are shared across requests
+runtime = AsyncRuntime()
 
 # Initialize handlers
 gemini_handler = GeminiHandler(config)
-db_manager = ChromaDBManager(config.CHROMA_DB_PATH)
+db_manager = ChromaDBManager(
+    config.CHROMA_DB_PATH,
+    index_chats=config.INDEX_CHAT_EMBEDDINGS,
+    write_behind=config.WRITE_BEHIND_ENABLED,
+    write_batch_size=config.WRITE_BEHIND_MAX_BATCH,
+    write_linger_ms=config.WRITE_BEHIND_LINGER_MS,
+    write_queue_size=config.WRITE_BEHIND_MAX_QUEUE,
+    query_cache_size=config.QUERY_EMBEDDING_CACHE_SIZE,
+    count_ttl=config.COLLECTION_COUNT_TTL,
+    refresh_interval=config.KNOWLEDGE_REFRESH_INTERVAL
+)
+# Flush queued chat/feedback writes on shutdown
+atexit.register(db_manager.close)
 
 # Initialize services
 gemini_handler.set_managers(db_manager)
 health_tips_service = HealthTipsService(db_manager)
 
+def db_metric_samples():
+    """Scrape-time gauges for the database manager's queues and indexes"""
+    if db_manager.write_queue:
+        yield "write_queue_depth", {}, db_manager.write_queue.stats()["depth"]
+    yield "cache_entries", {"cache": "query_embeddings"}, db_manager.query_embeddings.stats()["entries"]
+    yield "lexical_index_documents", {}, len(db_manager.lexical_index)
+
+metrics.register_collector(db_metric_samples)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.inc("http_requests", endpoint=endpoint, status=response.status_code)
+    if "request_started" in g:
+        metrics.observe("http_request_seconds", time.perf_counter() - g.request_started, endpoint=endpoint)
+    return response
+
 @app.errorhandler(404)
 def not_found_error(error):
     return jsonify({"error": "Resource not found"}), 404
@@ -43,8 +102,34 @@ def health_check():
         }
     })
 
+@app.route('/stats', methods=['GET'])
+def get_stats():
+    """Internal component statistics"""
+    return jsonify({
+        "write_behind": db_manager.write_queue.stats() if db_manager.write_queue else None,
+        "query_embeddings": db_manager.query_embeddings.stats(),
+        "lexical_index": db_manager.lexical_index.stats(),
+        "category_index": {
+            "tips": db_manager.tip_categories.stats(),
+            "products": db_manager.product_categories.stats()
+        },
+        "pipeline": gemini_handler.get_pipeline_stats(),
+        "semantic_cache": gemini_handler.semantic_cache.stats() if gemini_handler.semantic_cache else None,
+        "research": gemini_handler.search_controller.stats(),
+        "decomposition": gemini_handler.query_decomposer.stats(),
+        "llm_clients": gemini_handler.llm_clients.stats(),
+        "upstream": gemini_handler.upstream.stats(),
+        "sessions": gemini_handler.context_manager.stats(),
+        "logging": logging_stats()
+    })
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus scrape endpoint: latency quantiles, in-flight gauges and error counts"""
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/chat', methods=['POST'])
-async def chat():
+def chat():
     """Handle chat messages"""
     try:
         data = request.json
@@ -54,14 +139,18 @@ async def chat():
         if not message:
             return jsonify({"error": "Message is required"}), 400
 
-        # Get response from Gemini
-        response = await gemini_handler.get_response(
-            user_id=user_id,
-            message=message
-        )
+        # Get response from Gemini; the latency budget starts counting at request arrival
+        deadline = Deadline(config.CHAT_LATENCY_BUDGET_SECONDS)
+        with metrics.in_flight("chat_in_flight", endpoint="chat"):
+            response = runtime.run(gemini_handler.get_response(
+                user_id=user_id,
+                message=message,
+                deadline=deadline
+            ))
         
         # Store chat history
-        db_manager.store_chat(user_id, message, response)
+        with metrics.timer("chat_persist_seconds"):
+            db_manager.store_chat(user_id, message, response)
         
         return jsonify({
             "response": response,
@@ -69,9 +158,50 @@ async def chat():
         })
 
     except Exception as e:
-        print(f"Error in chat endpoint: {str(e)}")
+        logger.error("Error in chat endpoint: %s", e)
         return jsonify({"error": "Failed to process chat message"}), 500
 
+async def stream_and_store(user_id: str, message: str, deadline: Deadline):
+    """Stream response chunks, persisting the chat once the stream completes"""
+    chunks = []
+    with metrics.in_flight("chat_in_flight", endpoint="chat_stream"):
+        async for chunk in gemini_handler.get_response_stream(user_id=user_id, message=message, deadline=deadline):
+            chunks.append(chunk)
+            yield chunk
+    # store_chat commits to SQLite and may embed synchronously, so keep it off the shared loop
+    with metrics.timer("chat_persist_seconds"):
+        await asyncio.get_running_loop().run_in_executor(
+            None, db_manager.store_chat, user_id, message, "".join(chunks)
+        )
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """Stream chat response tokens as Server-Sent Events"""
+    data = request.json or {}
+    user_id = data.get('user_id', 'default_user')
+    message = data.get('message')
+    
+    if not message:
+        return jsonify({"error": "Message is required"}), 400
+
+    deadline = Deadline(config.CHAT_LATENCY_BUDGET_SECONDS)
+
+    def events():
+        # The worker keeps running if the client disconnects, so the chat is still stored
+        try:
+            for chunk in runtime.iterate(stream_and_store(user_id, message, deadline)):
+                yield f"data: {json.dumps({'token': chunk})}\n\n"
+        except Exception as e:
+            logger.error("Error in chat stream: %s", e)
+            yield f"data: {json.dumps({'error': 'Failed to process chat message'})}\n\n"
+        yield f"data: {json.dumps({'done': True, 'user_id': user_id})}\n\n"
+
+    return Response(
+        events(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/tips/random', methods=['GET'])
 def get_random_tip():
     """Get random health tip"""
@@ -85,7 +215,7 @@ def get_random_tip():
             "related_products": tip.get('related_products', [])
         })
     except Exception as e:
-        print(f"Error in random tip endpoint: {str(e)}")
+        logger.error("Error in random tip endpoint: %s", e)
         return jsonify({
             "tip": config.DEFAULT_RESPONSE,
             "category": "general_health",
@@ -112,21 +242,62 @@ def submit_feedback():
             "status": "success"
         })
     except Exception as e:
-        print(f"Error in feedback endpoint: {str(e)}")
+        logger.error("Error in feedback endpoint: %s", e)
         return jsonify({"error": "Failed to process feedback"}), 500
 
+def _int_arg(name: str) -> Optional[int]:
+    value = request.args.get(name)
+    return int(value) if value not in (None, "") else None
+
+def _date_arg(name: str) -> Optional[date]:
+    value = request.args.get(name)
+    return date.fromisoformat(value) if value else None
+
 @app.route('/admin/feedback', methods=['GET'])
 def get_all_feedback():
+    """Cursor-paginated feedback, newest first, with rating and date filters"""
     try:
-        feedback = db_manager.get_all_feedback()
+        # Malformed parameters raise ValueError here, before any query runs
+        limit = _int_arg('limit')
+        if limit is not None and limit < 1:
+            return jsonify({"error": "limit must be at least 1"}), 400
+        limit = min(limit or config.ADMIN_FEEDBACK_PAGE_SIZE, config.ADMIN_FEEDBACK_MAX_PAGE_SIZE)
+        cursor = request.args.get('cursor')
+        page = db_manager.get_feedback_page(
+            limit=limit,
+            cursor=parse_feedback_cursor(cursor) if cursor else None,
+            min_rating=_int_arg('min_rating'),
+            max_rating=_int_arg('max_rating'),
+            since=_date_arg('since'),
+            until=_date_arg('until')
+        )
         return jsonify({
             "status": "success",
-            "feedback": feedback
+            "feedback": page["feedback"],
+            "next_cursor": page["next_cursor"]
         })
+    except ValueError:
+        return jsonify({"error": "Invalid query parameter"}), 400
     except Exception as e:
-        print(f"Error getting feedback: {str(e)}")
+        logger.error("Error getting feedback: %s", e)
         return jsonify({"error": "Failed to get feedback"}), 500
 
+@app.route('/admin/feedback/stats', methods=['GET'])
+def get_feedback_stats():
+    """Feedback count, average and rating histogram per day"""
+    try:
+        stats = db_manager.get_feedback_stats(since=_date_arg('since'), until=_date_arg('until'))
+        return jsonify({
+            "status": "success",
+            "total": stats["total"],
+            "days": stats["days"]
+        })
+    except ValueError:
+        return jsonify({"error": "Invalid query parameter"}), 400
+    except Exception as e:
+        logger.error("Error getting feedback stats: %s", e)
+        return jsonify({"error": "Failed to get feedback stats"}), 500
+
 @app.route('/clear-context', methods=['POST'])
 def clear_context():
     """Clear user context"""
@@ -144,7 +315,7 @@ def clear_context():
             "status": "success"
         })
     except Exception as e:
-        print(f"Error clearing context: {str(e)}")
+        logger.error("Error clearing context: %s", e)
         return jsonify({"error": "Failed to clear context"}), 500
 
 if __name__ == '__main__':
@@ -0,0 +1,94 @@
+# backend/benchmarks/bench_collection_counts.py
+"""
+Benchmark: query latency vs. collection size
+
+Compares sizing n_results with a full collection.get() scan (the old approach)
+against the manager's cached per-collection count. Run from the backend dir:
+
+    python benchmarks/bench_collection_counts.py --sizes 1000 5000 20000
+
+A cheap hashed embedding is used so the numbers reflect the cost of the
+query path rather than ONNX inference.
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.append(backend_dir)
+
+from chromadb import EmbeddingFunction, Documents, Embeddings
+from database.chromadb_manager import ChromaDBManager
+
+class HashEmbeddingFunction(EmbeddingFunction):
+    """Deterministic 64-dim embedding derived from a SHA-256 digest"""
+    def __init__(self):
+        pass
+
+    def __call__(self, input: Documents) -> Embeddings:
+        vectors = []
+        for text in input:
+            digest = hashlib.sha256(text.encode('utf-8')).digest() * 2
+            vectors.append([b / 255.0 for b in digest])
+        return vectors
+
+    @staticmethod
+    def name() -> str:
+        return "bench_hash"
+
+def grow_collection(collection, start: int, end: int, batch_size: int = 2000):
+    for batch_start in range(start, end, batch_size):
+        batch_end = min(end, batch_start + batch_size)
+        collection.add(
+            documents=[f"Health tip number {i}" for i in range(batch_start, batch_end)],
+            metadatas=[{"category": "general_health"} for _ in range(batch_start, batch_end)],
+            ids=[f"bench_tip_{i}" for i in range(batch_start, batch_end)]
+        )
+
+def time_call(fn, repeats: int) -> float:
+    """Mean latency in milliseconds"""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) * 1000 / repeats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 20000])
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_counts_")
+    try:
+        manager = ChromaDBManager(work_dir, embedding_function=HashEmbeddingFunction())
+        collection = manager.health_tips
+
+        def full_scan_query():
+            collection.query(
+                query_texts=["sleep"],
+                n_results=min(5, len(collection.get()['ids']))
+            )
+
+        def cached_count_query():
+            manager._query(collection, 5, query_texts=["sleep"])
+
+        print(f"{'docs':>8} | {'full get() scan (ms)':>20} | {'cached count (ms)':>18}")
+        print("-" * 53)
+        current = 0
+        for size in sorted(args.sizes):
+            grow_collection(collection, current, size)
+            manager._invalidate_count(collection)
+            current = size
+            scan_ms = time_call(full_scan_query, args.repeats)
+            cached_ms = time_call(cached_count_query, args.repeats)
+            print(f"{size:>8} | {scan_ms:>20.2f} | {cached_ms:>18.2f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# backend/benchmarks/bench_generation_strategies.py
+"""
+Benchmark: response generation strategies against a stub LLM
+
+Runs ResponseGenerator with each strategy (two_pass, single_pass, adaptive)
+over a mix of research / non-research messages and reports latency and
+token counts. The stub simulates a fixed round-trip cost plus per-token
+decode time, so results are reproducible without API keys:
+
+    python benchmarks/bench_generation_strategies.py --messages 20 --research-ratio 0.3
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.append(backend_dir)
+
+from utils.response_generator import GENERATION_STRATEGIES, ResponseGenerator
+from utils.tokens import estimate_tokens
+
+class StubResponseGenerator(ResponseGenerator):
+    """ResponseGenerator whose LLM calls are simulated"""
+
+    def __init__(self, strategy: str, round_trip_ms: float, ms_per_output_token: float,
+                 reasoning_tokens: int, answer_tokens: int):
+        # Skip client setup; only the strategy logic is exercised
+        self.api_key = None
+        self.strategy = strategy
+        self.final_pass_reserve = 0.0
+        self.is_groq = True
+        self.round_trip = round_trip_ms / 1000.0
+        self.per_token = ms_per_output_token / 1000.0
+        self.reasoning_tokens = reasoning_tokens
+        self.answer_tokens = answer_tokens
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+
+    async def _complete(self, system_prompt: str, prompt: str, deadline=None) -> str:
+        is_reasoning = "Chain of Thought" in system_prompt
+        output_tokens = self.reasoning_tokens if is_reasoning else self.answer_tokens
+
+        self.calls += 1
+        self.prompt_tokens += estimate_tokens(system_prompt) + estimate_tokens(prompt)
+        self.output_tokens += output_tokens
+
+        await asyncio.sleep(self.round_trip + output_tokens * self.per_token)
+        return "word " * output_tokens
+
+async def run_strategy(strategy: str, args) -> dict:
+    generator = StubResponseGenerator(
+        strategy,
+        args.round_trip_ms,
+        args.ms_per_token,
+        args.reasoning_tokens,
+        args.answer_tokens
+    )
+    research_every = round(1 / args.research_ratio) if args.research_ratio > 0 else 0
+    rag_context = "Health Tip: Aim for 7-9 hours of sleep.\nProduct: Melatonin 3mg - Sleep aid"
+
+    latencies = []
+    for i in range(args.messages):
+        needs_research = bool(research_every) and i % research_every == 0
+        research_results = {"What are the risks of melatonin?": "finding " * 200} if needs_research else {}
+
+        start = time.perf_counter()
+        await generator.generate_response(
+            original_query="How much melatonin should I take to sleep better?",
+            sub_queries=list(research_results),
+            research_results=research_results,
+            rag_context=rag_context,
+            needs_research=needs_research
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    latencies.sort()
+    return {
+        "strategy": strategy,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "calls": generator.calls,
+        "prompt_tokens": generator.prompt_tokens,
+        "output_tokens": generator.output_tokens
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=20)
+    parser.add_argument('--research-ratio', type=float, default=0.3)
+    parser.add_argument('--round-trip-ms', type=float, default=300)
+    parser.add_argument('--ms-per-token', type=float, default=2)
+    parser.add_argument('--reasoning-tokens', type=int, default=500)
+    parser.add_argument('--answer-tokens', type=int, default=250)
+    args = parser.parse_args()
+
+    # Silence the generator's progress prints
+    sys.stdout, real_stdout = open(os.devnull, 'w'), sys.stdout
+    try:
+        results = [asyncio.run(run_strategy(strategy, args)) for strategy in GENERATION_STRATEGIES]
+    finally:
+        sys.stdout.close()
+        sys.stdout = real_stdout
+
+    print(f"{args.messages} messages, {args.research_ratio:.0%} needing research")
+    print(f"{'strategy':<12} | {'p50 ms':>8} | {'p95 ms':>8} | {'LLM calls':>9} | {'prompt tok':>10} | {'output tok':>10}")
+    print("-" * 73)
+    for r in results:
+        print(f"{r['strategy']:<12} | {r['p50_ms']:>8.1f} | {r['p95_ms']:>8.1f} | {r['calls']:>9} | "
+              f"{r['prompt_tokens']:>10} | {r['output_tokens']:>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# backend/benchmarks/bench_hybrid_retrieval.py
+"""
+Benchmark: vector vs. BM25 vs. hybrid (RRF) retrieval
+
+Loads a small labelled knowledge base (tips, FAQs, products whose answers
+hinge on exact drug names and dosages) plus optional filler tips, then
+reports lexical index build time, per-query latency and recall@k for
+each retrieval mode. Run from the backend dir:
+
+    python benchmarks/bench_hybrid_retrieval.py --k 3 --filler 5000
+
+--embedding hash swaps MiniLM for a hashed embedding (no model download);
+vector recall is then meaningless, but index and fusion costs are not.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.append(backend_dir)
+
+from database.chromadb_manager import ChromaDBManager
+from utils.rag_handler import RAGHandler
+
+TIPS = [
+    ("tip_sleep_schedule", "Go to bed and wake up at the same time every day, even on weekends.", "sleep"),
+    ("tip_screens", "Avoid phones and screens for an hour before bed; blue light delays sleep.", "sleep"),
+    ("tip_caffeine", "Stop drinking coffee or energy drinks at least 6 hours before bedtime.", "sleep"),
+    ("tip_hydration", "Drink water regularly through the day; thirst is a late signal of dehydration.", "nutrition"),
+    ("tip_fiber", "Eat 25-30 g of fiber daily from vegetables, legumes and whole grains.", "nutrition"),
+    ("tip_walk", "A brisk 30 minute walk five days a week meets basic activity guidelines.", "fitness"),
+    ("tip_strength", "Add two days of strength training per week to protect muscle and bone.", "fitness"),
+    ("tip_sunscreen", "Apply SPF 30 sunscreen every morning, even when it is cloudy.", "skin"),
+    ("tip_stress", "Box breathing (4 seconds in, hold, out, hold) calms acute stress.", "mental_health"),
+    ("tip_alcohol", "Alcohol fragments sleep in the second half of the night.", "sleep"),
+]
+FAQS = [
+    ("faq_ibuprofen_dose", "What is the maximum daily dose of ibuprofen?",
+     "For adults, over-the-counter ibuprofen should not exceed 1200 mg per day unless a doctor advises otherwise.", "medication"),
+    ("faq_paracetamol_alcohol", "Can I take paracetamol after drinking alcohol?",
+     "Regular drinking increases the risk of liver damage from paracetamol (acetaminophen); keep to the lowest dose.", "medication"),
+    ("faq_vitd", "How much vitamin D3 should adults take?",
+     "Many adults take 1000 IU (25 mcg) of vitamin D3 daily, especially in winter.", "supplements"),
+    ("faq_metformin_b12", "Does metformin affect vitamin B12?",
+     "Long-term metformin use can lower vitamin B12 levels; ask for periodic testing.", "medication"),
+    ("faq_magnesium", "Which magnesium is best for sleep?",
+     "Magnesium glycinate is gentle on the stomach and often used in the evening.", "supplements"),
+    ("faq_iron_tea", "Should I take iron with tea?",
+     "Tannins in tea reduce iron absorption; take iron supplements with vitamin C instead.", "supplements"),
+]
+PRODUCTS = [
+    ("prod_melatonin_3", "Melatonin 3mg", "Fast dissolving melatonin tablets for occasional sleeplessness.", "sleep", 8.99),
+    ("prod_melatonin_05", "Melatonin 0.5mg", "Low-dose melatonin for jet lag and circadian rhythm resets.", "sleep", 7.49),
+    ("prod_ibuprofen_200", "Ibuprofen 200mg", "Pain reliever and fever reducer, 100 coated tablets.", "pain_relief", 5.99),
+    ("prod_vitd3_1000", "Vitamin D3 1000 IU", "Daily vitamin D3 softgels for bone and immune support.", "supplements", 11.99),
+    ("prod_mag_glycinate", "Magnesium Glycinate 400mg", "Highly absorbable magnesium for muscle relaxation.", "supplements", 19.99),
+    ("prod_omega3", "Omega-3 Fish Oil 1000mg", "EPA and DHA softgels for heart health.", "supplements", 15.49),
+    ("prod_ors", "Oral Rehydration Salts", "Electrolyte sachets for rehydration after illness or exercise.", "nutrition", 6.99),
+]
+
+# Labelled queries -> relevant (source, doc_id) pairs
+QUERIES = [
+    ("ibuprofen 200mg tablets", {("products", "prod_ibuprofen_200")}),
+    ("max ibuprofen per day", {("faqs", "faq_ibuprofen_dose")}),
+    ("is 0.5mg melatonin enough for jet lag", {("products", "prod_melatonin_05")}),
+    ("melatonin 3mg", {("products", "prod_melatonin_3")}),
+    ("vitamin D3 1000 IU", {("products", "prod_vitd3_1000"), ("faqs", "faq_vitd")}),
+    ("metformin B12 deficiency", {("faqs", "faq_metformin_b12")}),
+    ("magnesium glycinate before bed", {("faqs", "faq_magnesium"), ("products", "prod_mag_glycinate")}),
+    ("acetaminophen and alcohol", {("faqs", "faq_paracetamol_alcohol")}),
+    ("SPF 30 every day", {("health_tips", "tip_sunscreen")}),
+    ("how to stop scrolling on my phone at night", {("health_tips", "tip_screens")}),
+    ("electrolytes after a stomach bug", {("products", "prod_ors")}),
+    ("does coffee in the afternoon hurt sleep", {("health_tips", "tip_caffeine")}),
+]
+
+def load_corpus(manager, filler: int):
+    for tip_id, text, category in TIPS:
+        manager.add_health_tip(tip_id, text, category)
+    for faq_id, question, answer, category in FAQS:
+        manager.add_faq(faq_id, question, answer, category)
+    for product in PRODUCTS:
+        manager.add_product(*product)
+    for start in range(0, filler, 1000):
+        ids = [f"filler_{i}" for i in range(start, min(filler, start + 1000))]
+        rows, existing_ids = manager.diff_documents(
+            manager.health_tips,
+            ids,
+            [f"General wellness note {i}: small daily habits add up over time." for i in range(start, start + len(ids))],
+            [{"category": "general_health"} for _ in ids]
+        )
+        manager.write_documents(manager.health_tips, rows, existing_ids, len(ids))
+
+def evaluate(name: str, search, k: int) -> dict:
+    recalls, latencies = [], []
+    for query, relevant in QUERIES:
+        start = time.perf_counter()
+        hits = search(query)[:k]
+        latencies.append((time.perf_counter() - start) * 1000)
+        found = {(doc.source, doc.doc_id) for doc in hits}
+        recalls.append(len(found & relevant) / len(relevant))
+    return {
+        "mode": name,
+        "recall": statistics.mean(recalls),
+        "p50_ms": statistics.median(latencies),
+        "max_ms": max(latencies)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--k', type=int, default=3)
+    parser.add_argument('--filler', type=int, default=0, help="Extra generic tips to grow the index")
+    parser.add_argument('--embedding', choices=["default", "hash"], default="default")
+    parser.add_argument('--max-distance', type=float, default=None,
+                        help="Relevance cutoff (the app uses RETRIEVAL_MAX_DISTANCE); hybrid applies it to lexical-only hits too")
+    args = parser.parse_args()
+
+    embedding_function = None
+    if args.embedding == "hash":
+        from bench_collection_counts import HashEmbeddingFunction
+        embedding_function = HashEmbeddingFunction()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_hybrid_")
+    try:
+        manager = ChromaDBManager(work_dir, embedding_function=embedding_function)
+        load_corpus(manager, args.filler)
+        manager.close()
+
+        # Reopen to time the startup build of the lexical index
+        manager = ChromaDBManager(work_dir, embedding_function=embedding_function)
+        index_stats = manager.lexical_index.stats()
+
+        all_sources = {"health_tips": args.k, "faqs": args.k, "products": args.k}
+        vector = RAGHandler(manager, quotas=all_sources, max_distance=args.max_distance, max_results=args.k, hybrid=False)
+        hybrid = RAGHandler(manager, quotas=all_sources, max_distance=args.max_distance, max_results=args.k, hybrid=True)
+        results = [
+            evaluate("vector", lambda q: vector.retrieve(q).documents, args.k),
+            evaluate("bm25", lambda q: manager.lexical_search(q, args.k), args.k),
+            evaluate("hybrid", lambda q: hybrid.retrieve(q).documents, args.k),
+        ]
+        manager.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"Lexical index: {index_stats['documents']} docs, {index_stats['terms']} terms, "
+          f"built in {index_stats['build_seconds'] * 1000:.1f} ms")
+    print(f"{len(QUERIES)} labelled queries, recall@{args.k}")
+    print(f"{'mode':<8} | {'recall':>7} | {'p50 ms':>8} | {'max ms':>8}")
+    print("-" * 40)
+    for r in results:
+        print(f"{r['mode']:<8} | {r['recall']:>7.3f} | {r['p50_ms']:>8.2f} | {r['max_ms']:>8.2f}")
+
+if __name__ == "__main__":
+    main()
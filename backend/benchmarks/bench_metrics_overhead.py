@@ -0,0 +1,83 @@
+# backend/benchmarks/bench_metrics_overhead.py
+"""
+Benchmark: cost of the in-process metrics registry
+
+Times the calls one chat request makes (about a dozen stage/pass/upstream
+observations, a few counters, the in-flight gauge) with metrics enabled and
+disabled, then expresses the difference as a share of a typical request.
+Run from the backend dir:
+
+    python benchmarks/bench_metrics_overhead.py --requests 20000 --request-ms 800
+
+Also times one /metrics render with the resulting series.
+"""
+import argparse
+import os
+import sys
+import time
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.append(backend_dir)
+
+from utils.metrics import MetricsRegistry
+
+STAGES = ("context", "cache_lookup", "decompose", "rag", "research", "generate")
+
+def simulate_request(registry: MetricsRegistry):
+    """The metrics calls a research request with two generation passes makes"""
+    with registry.in_flight("chat_in_flight", endpoint="chat"):
+        for stage in STAGES:
+            registry.observe("chat_stage_seconds", 0.01, stage=stage)
+        registry.inc("cache_requests", cache="semantic", result="miss")
+        registry.inc("decompositions", path="llm_calls")
+        for _ in range(3):
+            with registry.timer("research_query_seconds"):
+                registry.inc("cache_requests", cache="research", result="miss")
+            with registry.upstream("research"):
+                pass
+        for generation_pass in ("reasoning", "final"):
+            with registry.timer("generation_pass_seconds", generation_pass=generation_pass):
+                with registry.upstream("groq"):
+                    pass
+        registry.observe("chat_request_seconds", 0.8)
+    with registry.timer("chat_persist_seconds"):
+        pass
+    registry.inc("http_requests", endpoint="/chat", status=200)
+    registry.observe("http_request_seconds", 0.8, endpoint="/chat")
+
+def time_requests(registry: MetricsRegistry, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        simulate_request(registry)
+    return (time.perf_counter() - start) / n
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--request-ms', type=float, default=800.0, help="Typical end-to-end chat latency")
+    args = parser.parse_args()
+
+    enabled = MetricsRegistry(enabled=True)
+    disabled = MetricsRegistry(enabled=False)
+    # Warm up so series exist and the interpreter has settled
+    time_requests(enabled, 1000)
+    time_requests(disabled, 1000)
+
+    on = time_requests(enabled, args.requests)
+    off = time_requests(disabled, args.requests)
+    overhead = on - off
+
+    start = time.perf_counter()
+    text = enabled.render_prometheus()
+    render_ms = (time.perf_counter() - start) * 1000
+
+    print(f"{args.requests} simulated requests")
+    print(f"metrics on:  {on * 1e6:8.1f} us/request")
+    print(f"metrics off: {off * 1e6:8.1f} us/request")
+    print(f"overhead:    {overhead * 1e6:8.1f} us/request = "
+          f"{overhead * 1000 / args.request_ms * 100:.4f}% of a {args.request_ms:.0f} ms request")
+    print(f"/metrics render: {render_ms:.2f} ms for {len(text.splitlines())} lines")
+
+if __name__ == "__main__":
+    main()
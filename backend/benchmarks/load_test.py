@@ -0,0 +1,94 @@
+# backend/benchmarks/load_test.py
+"""
+Load test: concurrent /chat throughput against running backends
+
+Fires --requests POST /chat calls with --concurrency in flight and reports
+throughput and latency percentiles. --baseline-url runs the same load against
+a second server first, so both numbers come from one invocation.
+
+A before/after comparison is only meaningful when the baseline server runs the
+old code. Serve it from a worktree of the commit before the change:
+
+    git worktree add /tmp/before HEAD~1
+    (cd /tmp/before/backend && PORT=5001 python app.py)                     # before
+    gunicorn wsgi:app --worker-class gthread --threads 64 --bind :5000      # after
+    python benchmarks/load_test.py --baseline-url http://localhost:5001 \\
+        --url http://localhost:5000 --requests 200 --concurrency 20
+
+Use --endpoint /health to measure serving overhead without LLM calls.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+MESSAGES = [
+    "How much sleep do I need?",
+    "Is melatonin safe to take every night?",
+    "What are good sources of vitamin D?",
+    "How much water should I drink a day?",
+    "hi"
+]
+
+async def run_load(args, url: str) -> dict:
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+        async def one(i: int):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    if args.endpoint == "/chat":
+                        response = await client.post("/chat", json={
+                            "user_id": f"loadtest_{i % args.users}",
+                            "message": MESSAGES[i % len(MESSAGES)]
+                        })
+                    else:
+                        response = await client.get(args.endpoint)
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(args.requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "elapsed_s": elapsed,
+        "throughput": args.requests / elapsed,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "errors": errors
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default="http://localhost:5000")
+    parser.add_argument('--baseline-url', help="Server running the code before the change, loaded first")
+    parser.add_argument('--endpoint', default="/chat", choices=["/chat", "/health", "/tips/random"])
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--users', type=int, default=20, help="Distinct user_ids to spread requests over")
+    parser.add_argument('--timeout', type=float, default=120)
+    args = parser.parse_args()
+
+    runs = [("before", args.baseline_url), ("after", args.url)] if args.baseline_url else [("", args.url)]
+    for label, url in runs:
+        result = asyncio.run(run_load(args, url))
+        print(f"{label + ': ' if label else ''}{args.requests} x {args.endpoint} @ concurrency {args.concurrency} against {url}")
+        print(f"  elapsed:    {result['elapsed_s']:.2f}s")
+        print(f"  throughput: {result['throughput']:.2f} req/s")
+        print(f"  latency:    p50 {result['p50_ms']:.1f} ms, p95 {result['p95_ms']:.1f} ms")
+        print(f"  errors:     {result['errors']}")
+
+if __name__ == "__main__":
+    main()
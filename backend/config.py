@@ -16,13 +16,98 @@ class Config:
     # Model Configuration
     GEMINI_FLASH_MODEL = "gemini-1.5-flash"
     
+    # LLM Client Configuration (shared connection pools per provider)
+    LLM_MAX_CONNECTIONS = 100
+    LLM_MAX_KEEPALIVE_CONNECTIONS = 20
+    LLM_KEEPALIVE_EXPIRY = 30.0  # seconds
+    LLM_HTTP2 = True  # Requires httpx[http2]; falls back to HTTP/1.1 otherwise
+    LLM_TIMEOUT = 60.0  # seconds
+    LLM_EXECUTOR_WORKERS = 8  # Threads per provider for blocking SDK calls (Gemini)
+    
+    # Upstream Rate Limiting (token bucket + concurrency cap per provider; generation outranks research)
+    UPSTREAM_LIMITS = {
+        "groq": {"rate": 5.0, "burst": 10, "concurrency": 16},  # requests/sec, bucket size, parallel calls
+        "sonar": {"rate": 2.0, "burst": 5, "concurrency": 8},
+        "gemini": {"rate": 5.0, "burst": 10, "concurrency": 16},
+    }
+    UPSTREAM_MAX_RETRIES = 3  # Retries on 429, timeouts and 5xx (full jitter backoff)
+    UPSTREAM_RETRY_BASE_DELAY = 0.5  # seconds
+    UPSTREAM_RETRY_MAX_DELAY = 8.0  # seconds
+    
     # Chat Configuration
     MAX_CHAT_HISTORY = 10
     MAX_SUB_QUERIES = 4
+    RETRIEVAL_EXECUTOR_WORKERS = 4  # Threads for blocking Chroma lookups during /chat
+    CHAT_LATENCY_BUDGET_SECONDS = float(os.getenv('CHAT_LATENCY_BUDGET_SECONDS', '25'))  # End-to-end budget per /chat request
+    GENERATION_RESERVE_SECONDS = 10.0  # Part of the budget research may not use; kept for the generation passes
+    FINAL_PASS_RESERVE_SECONDS = 4.0  # Part of the generation time the two-pass reasoning call may not use
+    INDEX_CHAT_EMBEDDINGS = True  # Also embed chats into the chat_history collection
+    QUERY_EMBEDDING_CACHE_SIZE = 2048  # LRU of query embeddings shared by all Chroma lookups
+    COLLECTION_COUNT_TTL = 30.0  # seconds a cached collection count is trusted before it is re-read
+    KNOWLEDGE_REFRESH_INTERVAL = 10.0  # seconds between checks for knowledge-base writes by other processes (init_db)
+    
+    # Retrieval Configuration (unified search over tips, FAQs and products)
+    RETRIEVAL_QUOTAS = {"health_tips": 3, "faqs": 2, "products": 2}  # Max hits per source
+    RETRIEVAL_MAX_DISTANCE = 1.2  # Squared L2 on unit vectors; 1.2 ~ cosine similarity 0.4
+    RETRIEVAL_MAX_RESULTS = 6  # Merged hits sent to the prompt
+    HYBRID_RETRIEVAL_ENABLED = True  # Fuse BM25 lexical hits with vector hits
+    LEXICAL_TOP_K = 10  # BM25 candidates per query
+    RRF_K = 60  # Reciprocal rank fusion constant
+    
+    # Write-behind Configuration (batched chat/feedback embedding off the request path)
+    WRITE_BEHIND_ENABLED = True
+    WRITE_BEHIND_MAX_BATCH = 64
+    WRITE_BEHIND_LINGER_MS = 50
+    WRITE_BEHIND_MAX_QUEUE = 1000
     
     # Response Configuration
+    # "two_pass" (reasoning + final call), "single_pass" (one call, hidden reasoning)
+    # or "adaptive" (two-pass only when the decomposer flags needs_research)
+    GENERATION_STRATEGY = os.getenv('GENERATION_STRATEGY', 'two_pass')
     DEFAULT_RESPONSE = "I apologize, but I'm having trouble processing your request. Please try again."
     SAFETY_WARNING = "For your safety, please consult a healthcare professional for accurate advice."
     
+    # Semantic Cache Configuration (near-identical questions reuse a recent answer)
+    SEMANTIC_CACHE_ENABLED = True
+    SEMANTIC_CACHE_THRESHOLD = 0.92  # Minimum cosine similarity for a hit
+    SEMANTIC_CACHE_TTL = 86400  # 24 hours in seconds
+    SEMANTIC_CACHE_MAX_ENTRIES = 1000
+    
+    # Research Cache Configuration (Sonar/Groq results keyed by normalized sub-query + model)
+    RESEARCH_CACHE_ENABLED = True
+    RESEARCH_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'cache', 'research.sqlite3')
+    RESEARCH_CACHE_TTL = 604800  # 7 days in seconds
+    RESEARCH_CACHE_MAX_ENTRIES = 5000
+    
+    # Decomposition Cache Configuration (in-process LRU + optional persistent tier)
+    DECOMPOSITION_MEMORY_SIZE = 512
+    DECOMPOSITION_CACHE_PERSISTENT = True
+    DECOMPOSITION_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'cache', 'decompositions.sqlite3')
+    DECOMPOSITION_CACHE_TTL = 604800  # 7 days in seconds
+    DECOMPOSITION_CACHE_MAX_ENTRIES = 10000
+    
     # Session Configuration
-    STREAMLIT_SESSION_TIMEOUT = 3600  # 1 hour in seconds
+    STREAMLIT_SESSION_TIMEOUT = 3600  # 1 hour in seconds (idle sessions are evicted after this)
+    SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'memory')  # "memory" or "sqlite"
+    SESSION_MAX_SESSIONS = 10000
+    SESSION_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'sessions.sqlite3')
+    
+    # Admin Configuration
+    ADMIN_FEEDBACK_PAGE_SIZE = 50
+    ADMIN_FEEDBACK_MAX_PAGE_SIZE = 200
+    
+    # Conversation Context Configuration
+    CONTEXT_TOKEN_BUDGET = 1500  # Tokens of conversation fed into each prompt
+    CONTEXT_SUMMARY_SHARE = 0.25  # Share of the budget kept for summaries of older turns
+    CONTEXT_SUMMARIZER = os.getenv('CONTEXT_SUMMARIZER', 'extractive')  # "extractive" or "llm" (refines in background)
+
+    # Metrics Configuration (served at /metrics in Prometheus text format)
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_WINDOW = 2048  # Recent samples per series used for p50/p95/p99
+
+    # Logging Configuration (records go through a queue drained by a background thread)
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_LEVELS = os.getenv('LOG_LEVELS', 'httpx=WARNING,chromadb=WARNING')  # Per-module overrides: "module=LEVEL,..."
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')  # "text" (key=value) or "json"
+    LOG_QUEUE_SIZE = 10000  # Records beyond this are dropped rather than blocking a request
+    LOG_DEBUG_SAMPLE_RATE = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', '0'))  # Share of requests that dump full RAG context (needs utils.rag_handler=DEBUG)
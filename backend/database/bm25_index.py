@@ -0,0 +1,94 @@
+# backend/database/bm25_index.py
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me my of on or should "
+    "the to what when which who why with you your".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word/number tokens; dosages like '3mg' and '0.5' stay whole"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+class BM25Index:
+    """In-process inverted index with Okapi BM25 scoring over knowledge-base documents"""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        # term -> {(source, doc_id): term frequency}
+        self._postings: Dict[str, Dict[Tuple[str, str], int]] = defaultdict(dict)
+        # (source, doc_id) -> (document, metadata, length, terms)
+        self._docs: Dict[Tuple[str, str], Tuple[str, Dict, int, List[str]]] = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+        self.build_seconds = 0.0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, source: str, doc_id: str, document: str, metadata: Optional[Dict] = None, text: Optional[str] = None):
+        """Index a document (replacing any previous version); text defaults to the document"""
+        key = (source, doc_id)
+        counts = Counter(tokenize(text if text is not None else document))
+        with self._lock:
+            self._remove(key)
+            for term, tf in counts.items():
+                self._postings[term][key] = tf
+            length = sum(counts.values())
+            self._docs[key] = (document, metadata or {}, length, list(counts))
+            self._total_length += length
+
+    def _remove(self, key: Tuple[str, str]):
+        previous = self._docs.pop(key, None)
+        if previous is None:
+            return
+        _, _, length, terms = previous
+        self._total_length -= length
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    del self._postings[term]
+
+    def search(self, query: str, limit: int = 10, sources: Optional[Iterable[str]] = None) -> List[Tuple[str, str, str, Dict, float]]:
+        """Top documents as (source, doc_id, document, metadata, score), best first"""
+        terms = set(tokenize(query))
+        allowed = set(sources) if sources is not None else None
+        scores: Dict[Tuple[str, str], float] = defaultdict(float)
+        with self._lock:
+            n_docs = len(self._docs)
+            if not n_docs or not terms:
+                return []
+            avg_length = self._total_length / n_docs
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, tf in postings.items():
+                    if allowed is not None and key[0] not in allowed:
+                        continue
+                    length = self._docs[key][2]
+                    norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+                    scores[key] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+            top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+            return [
+                (source, doc_id, self._docs[(source, doc_id)][0], self._docs[(source, doc_id)][1], score)
+                for (source, doc_id), score in top
+            ]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "documents": len(self._docs),
+                "terms": len(self._postings),
+                "build_seconds": round(self.build_seconds, 4)
+            }
@@ -0,0 +1,66 @@
+# backend/database/category_index.py
+import random
+import threading
+from typing import Dict, List, Optional, Tuple
+
+Entry = Tuple[str, str, Dict]  # (doc_id, document, metadata)
+
+class CategoryIndex:
+    """In-memory category -> documents map for one collection, rebuilt lazily after writes"""
+
+    def __init__(self, collection, batch_size: int = 1000):
+        self.collection = collection
+        self.batch_size = batch_size
+        self._all: List[Entry] = []
+        self._by_category: Dict[str, List[Entry]] = {}
+        self._stale = True
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def invalidate(self):
+        """Mark the index stale; the next read rebuilds it"""
+        self._stale = True
+
+    def _ensure_built(self):
+        if not self._stale:
+            return
+        with self._lock:
+            if not self._stale:
+                return
+            # Clear the flag first so writes landing during the scan trigger another rebuild
+            self._stale = False
+            entries: List[Entry] = []
+            offset = 0
+            try:
+                while True:
+                    batch = self.collection.get(include=["documents", "metadatas"], limit=self.batch_size, offset=offset)
+                    if not batch['ids']:
+                        break
+                    entries.extend(zip(batch['ids'], batch['documents'], [meta or {} for meta in batch['metadatas']]))
+                    offset += len(batch['ids'])
+            except Exception:
+                self._stale = True
+                raise
+
+            by_category: Dict[str, List[Entry]] = {}
+            for entry in entries:
+                by_category.setdefault(entry[2].get("category"), []).append(entry)
+            self._all, self._by_category = entries, by_category
+            self.builds += 1
+
+    def entries(self, category: Optional[str] = None) -> List[Entry]:
+        self._ensure_built()
+        return self._all if category is None else self._by_category.get(category, [])
+
+    def random(self, category: Optional[str] = None) -> Optional[Entry]:
+        """Uniformly sampled document, optionally within a category"""
+        entries = self.entries(category)
+        return random.choice(entries) if entries else None
+
+    def stats(self) -> Dict:
+        return {
+            "documents": len(self._all),
+            "categories": len(self._by_category),
+            "builds": self.builds,
+            "stale": self._stale
+        }
@@ -1,17 +1,88 @@
 import chromadb
 from chromadb.utils import embedding_functions
+import hashlib
+import json
+import logging
 import os
-from datetime import datetime
-from typing import Dict, List, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from database.bm25_index import BM25Index
+    from database.category_index import CategoryIndex
+    from database.embedding_cache import EmbeddingCache
+    from database.history_store import HistoryStore
+    from database.retrieval import RetrievalResult, RetrievedDocument
+    from database.write_behind import WriteBehindQueue
+except ImportError:
+    from bm25_index import BM25Index
+    from category_index import CategoryIndex
+    from embedding_cache import EmbeddingCache
+    from history_store import HistoryStore
+    from retrieval import RetrievalResult, RetrievedDocument
+    from write_behind import WriteBehindQueue
+
+logger = logging.getLogger(__name__)
+
+# Fixed query text used by get_health_tips; embedded once at startup
+TIPS_QUERY = "health tips"
+
+# Rewritten on every knowledge-base write so managers in other processes
+# (e.g. the app while init_db loads data) know to refresh their indexes
+KNOWLEDGE_VERSION_FILE = "knowledge.version"
+
+# Max hits per knowledge source for unified retrieval
+DEFAULT_RETRIEVAL_QUOTAS = {"health_tips": 3, "faqs": 2, "products": 2}
+
+# Knowledge-base record builders shared by the add_* methods and the bulk loader
+def health_tip_record(tip_id: str, tip_text: str, category: str) -> Tuple[str, str, Dict]:
+    return tip_id, tip_text, {"category": category}
+
+def faq_record(faq_id: str, question: str, answer: str, category: str) -> Tuple[str, str, Dict]:
+    return faq_id, f"Q: {question}\nA: {answer}", {"category": category, "question": question, "answer": answer}
+
+def product_record(product_id: str, name: str, description: str, category: str, price: float) -> Tuple[str, str, Dict]:
+    return product_id, description, {"name": name, "category": category, "price": price}
+
+def content_hash(document: str, metadata: Dict) -> str:
+    """Stable hash of a document and its metadata, used to skip unchanged re-loads"""
+    payload = json.dumps([document, metadata], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
 class ChromaDBManager:
-    def __init__(self, persist_directory: str):
+    def __init__(
+        self,
+        persist_directory: str,
+        embedding_function=None,
+        index_chats: bool = True,
+        write_behind: bool = False,
+        write_batch_size: int = 64,
+        write_linger_ms: int = 50,
+        write_queue_size: int = 1000,
+        query_cache_size: int = 2048,
+        count_ttl: float = 30.0,
+        refresh_interval: float = 10.0
+    ):
         self.persist_directory = persist_directory
+        self.index_chats = index_chats
+        # Cached counts are re-read after count_ttl; the knowledge version file is checked every refresh_interval
+        self.count_ttl = count_ttl
+        self.refresh_interval = refresh_interval
         # Ensure directory exists
         os.makedirs(persist_directory, exist_ok=True)
         
         # Initialize embedding function (use default to avoid heavy downloads)
-        self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
+        self.embedding_function = embedding_function or embedding_functions.DefaultEmbeddingFunction()
+        
+        # Query paths embed once through this cache and pass query_embeddings= to every collection
+        self.query_embeddings = EmbeddingCache(self.embedding_function, max_entries=query_cache_size)
+        try:
+            self.query_embeddings.pin([TIPS_QUERY])
+        except Exception as e:
+            logger.error("Error precomputing query embeddings: %s", e)
         
         # Use PersistentClient for newer ChromaDB versions
         self.client = chromadb.PersistentClient(path=persist_directory)
@@ -25,6 +96,10 @@ class ChromaDBManager:
             name="products",
             embedding_function=self.embedding_function
         )
+        self.faqs = self.client.get_or_create_collection(
+            name="faqs",
+            embedding_function=self.embedding_function
+        )
         self.chat_history = self.client.get_or_create_collection(
             name="chat_history",
             embedding_function=self.embedding_function
@@ -38,8 +113,318 @@ class ChromaDBManager:
             embedding_function=self.embedding_function
         )
 
-        # Initialize collections (empty by default)
+        # Knowledge collections searched together by retrieve()
+        self.knowledge_sources = {
+            "health_tips": self.health_tips,
+            "faqs": self.faqs,
+            "products": self.products
+        }
+        self._search_executor = ThreadPoolExecutor(
+            max_workers=len(self.knowledge_sources),
+            thread_name_prefix="chroma-search"
+        )
+        
+        # Version of the knowledge base the in-memory indexes reflect
+        self._version_path = os.path.join(persist_directory, KNOWLEDGE_VERSION_FILE)
+        self._seen_version = self._read_version()
+        self._version_lock = threading.Lock()
+        self._next_version_check = time.monotonic() + refresh_interval
+        
+        # Lexical index over the same documents for exact terms (drug names, dosages)
+        self.lexical_index = BM25Index()
+        self._build_lexical_index(self.lexical_index)
+        self._lexical_lock = threading.Lock()
+        self._lexical_rebuilding = False
+        self._lexical_dirty = False
+        
+        # Category lookups (random tips, products by category) need no vector search
+        self.tip_categories = CategoryIndex(self.health_tips)
+        self.product_categories = CategoryIndex(self.products)
+        try:
+            self.tip_categories.entries()
+            self.product_categories.entries()
+        except Exception as e:
+            logger.error("Error building category indexes: %s", e)
+
+        # Chronological chat history lives in SQLite; chat embeddings are a secondary index
+        self.history_store = HistoryStore(os.path.join(persist_directory, "history.sqlite3"))
+
+        # Cached (document count, read at) per collection; writes drop the entry so it is recounted
+        self._counts: Dict[str, Tuple[int, float]] = {}
+        self._counts_lock = threading.Lock()
+
+        if self.history_store.is_empty() and self._count(self.chat_history) > 0:
+            self._backfill_history()
+        if self.history_store.feedback_is_empty() and self._count(self.feedback) > 0:
+            self._backfill_feedback()
+
+        # Optional background writer so chat/feedback embedding stays off the request path
+        self.write_queue = None
+        if write_behind:
+            self.write_queue = WriteBehindQueue(
+                max_queue_size=write_queue_size,
+                max_batch_size=write_batch_size,
+                linger_ms=write_linger_ms,
+                on_flushed=lambda collection, _: self._invalidate_count(collection)
+            )
+
+    def close(self):
+        """Flush pending background writes and release resources"""
+        if self.write_queue:
+            self.write_queue.close()
+        self._search_executor.shutdown(wait=False)
+        self.history_store.close()
+
+    def _add_document(self, collection, document: str, metadata: Dict, doc_id: str):
+        """Add one document, via the write-behind queue when enabled"""
+        if self.write_queue and self.write_queue.submit(collection, document, metadata, doc_id):
+            return
         
+        # Write synchronously when write-behind is off or the queue is saturated
+        collection.add(
+            documents=[document],
+            metadatas=[metadata],
+            ids=[doc_id]
+        )
+        self._invalidate_count(collection)
+
+    def _backfill_history(self, batch_size: int = 1000):
+        """One-time import of chats that were only stored in the chat_history collection"""
+        try:
+            offset = skipped = 0
+            while True:
+                batch = self.chat_history.get(
+                    include=["documents", "metadatas"],
+                    limit=batch_size,
+                    offset=offset
+                )
+                if not batch['ids']:
+                    break
+                
+                rows = []
+                for doc_id, doc, meta in zip(batch['ids'], batch['documents'], batch['metadatas']):
+                    # Skip malformed records: aborting would leave a partial import that is never retried
+                    try:
+                        message, _, response = doc.partition("\nBot: ")
+                        timestamp = datetime.fromisoformat(meta['timestamp']).timestamp()
+                        rows.append((meta['user_id'], timestamp, message.replace("User: ", "", 1), response))
+                    except (AttributeError, KeyError, TypeError, ValueError) as e:
+                        skipped += 1
+                        logger.warning("Skipping chat %s during backfill: %r", doc_id, e)
+                self.history_store.append_chats(rows)
+                offset += len(batch['ids'])
+            logger.info("Backfilled %d chats into history store (%d skipped)", offset - skipped, skipped)
+        except Exception as e:
+            logger.error("Error backfilling chat history: %s", e)
+
+    def _backfill_feedback(self, batch_size: int = 1000):
+        """One-time import of feedback that was only stored in the feedback collection"""
+        try:
+            offset = skipped = 0
+            while True:
+                batch = self.feedback.get(
+                    include=["documents", "metadatas"],
+                    limit=batch_size,
+                    offset=offset
+                )
+                if not batch['ids']:
+                    break
+                
+                rows = []
+                for feedback_id, doc, meta in zip(batch['ids'], batch['documents'], batch['metadatas']):
+                    try:
+                        timestamp = datetime.fromisoformat(meta['timestamp']).timestamp()
+                        rows.append((feedback_id, meta.get('user_id', ''), timestamp, int(meta.get('rating', 0)), doc or ''))
+                    except (AttributeError, KeyError, TypeError, ValueError) as e:
+                        skipped += 1
+                        logger.warning("Skipping feedback %s during backfill: %r", feedback_id, e)
+                self.history_store.append_feedbacks(rows)
+                offset += len(batch['ids'])
+            logger.info("Backfilled %d feedback entries into history store (%d skipped)", offset - skipped, skipped)
+        except Exception as e:
+            logger.error("Error backfilling feedback: %s", e)
+
+    @staticmethod
+    def _lexical_text(document: str, metadata: Dict) -> str:
+        """Text indexed for lexical search: the document plus its name and category"""
+        return " ".join(filter(None, [metadata.get("name"), document, metadata.get("category")]))
+
+    def _sync_indexes(self, collection, ids: List[str], documents: List[str], metadatas: List[Dict]):
+        """Keep the in-memory indexes in sync with knowledge-source writes"""
+        if collection.name not in self.knowledge_sources:
+            return
+        if collection.name == self.health_tips.name:
+            self.tip_categories.invalidate()
+        elif collection.name == self.products.name:
+            self.product_categories.invalidate()
+        self._index_lexical(self.lexical_index, collection, ids, documents, metadatas)
+        with self._lexical_lock:
+            # A rebuild already past these rows would drop them, so run another
+            if self._lexical_rebuilding:
+                self._lexical_dirty = True
+        self._bump_version()
+
+    def _index_lexical(self, index: BM25Index, collection, ids: List[str], documents: List[str], metadatas: List[Dict]):
+        """Add knowledge-source documents to a lexical index"""
+        for doc_id, document, metadata in zip(ids, documents, metadatas):
+            index.add(
+                collection.name, doc_id, document, metadata,
+                text=self._lexical_text(document, metadata or {})
+            )
+
+    def _build_lexical_index(self, index: BM25Index, batch_size: int = 1000):
+        """Load all knowledge-source documents into a lexical index"""
+        start = time.perf_counter()
+        try:
+            for collection in self.knowledge_sources.values():
+                offset = 0
+                while True:
+                    batch = collection.get(include=["documents", "metadatas"], limit=batch_size, offset=offset)
+                    if not batch['ids']:
+                        break
+                    self._index_lexical(index, collection, batch['ids'], batch['documents'], batch['metadatas'])
+                    offset += len(batch['ids'])
+        except Exception as e:
+            logger.error("Error building lexical index: %s", e)
+        index.build_seconds = time.perf_counter() - start
+        logger.info("Lexical index built: %d documents in %.2fs", len(index), index.build_seconds)
+
+    def _rebuild_lexical_index(self):
+        """Rebuild the lexical index in the background and swap it in; repeats while writes race it"""
+        with self._lexical_lock:
+            self._lexical_dirty = True
+            if self._lexical_rebuilding:
+                return
+            self._lexical_rebuilding = True
+
+        def rebuild():
+            while True:
+                with self._lexical_lock:
+                    if not self._lexical_dirty:
+                        self._lexical_rebuilding = False
+                        return
+                    self._lexical_dirty = False
+                index = BM25Index()
+                self._build_lexical_index(index)
+                self.lexical_index = index
+
+        threading.Thread(target=rebuild, name="lexical-rebuild", daemon=True).start()
+
+    def _read_version(self) -> Optional[str]:
+        try:
+            with open(self._version_path) as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def _bump_version(self):
+        """Record a knowledge-base write for managers in other processes"""
+        version = f"{os.getpid()}-{time.time_ns()}"
+        with self._version_lock:
+            # Someone else wrote since we last looked; make the next check refresh
+            if self._read_version() != self._seen_version:
+                self._next_version_check = 0.0
+                return
+            try:
+                tmp_path = f"{self._version_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w") as f:
+                    f.write(version)
+                os.replace(tmp_path, self._version_path)
+                self._seen_version = version
+            except OSError as e:
+                logger.error("Error writing knowledge version: %s", e)
+
+    def _check_knowledge_version(self):
+        """Refresh counts and indexes if another process changed the knowledge base (checked every refresh_interval)"""
+        now = time.monotonic()
+        if now < self._next_version_check:
+            return
+        with self._version_lock:
+            if now < self._next_version_check:
+                return
+            self._next_version_check = now + self.refresh_interval
+            version = self._read_version()
+            if version == self._seen_version:
+                return
+            self._seen_version = version
+        
+        logger.info("Knowledge base changed by another process; refreshing indexes")
+        for collection in self.knowledge_sources.values():
+            self._invalidate_count(collection)
+        self.tip_categories.invalidate()
+        self.product_categories.invalidate()
+        self._rebuild_lexical_index()
+
+    def _count(self, collection, refresh: bool = False) -> int:
+        """Cached document count for a collection, re-read once it is count_ttl old or on refresh"""
+        now = time.monotonic()
+        with self._counts_lock:
+            cached = self._counts.get(collection.name)
+            if cached is None or refresh or now - cached[1] >= self.count_ttl:
+                cached = self._counts[collection.name] = (collection.count(), now)
+            return cached[0]
+
+    def _invalidate_count(self, collection):
+        """Drop cached count after a write; duplicate ids and upserts make the delta unknowable"""
+        with self._counts_lock:
+            self._counts.pop(collection.name, None)
+
+    def diff_documents(
+        self,
+        collection,
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict],
+        skip_unchanged: bool = True
+    ) -> Tuple[List[Tuple[str, str, Dict]], set]:
+        """Stamp a batch with content hashes; return the rows that need writing and the ids already stored"""
+        hashes = [content_hash(doc, meta) for doc, meta in zip(documents, metadatas)]
+        
+        # Existing hashes tell unchanged, updated and new documents apart
+        found = collection.get(ids=ids, include=["metadatas"])
+        existing = {
+            doc_id: (meta or {}).get("content_hash")
+            for doc_id, meta in zip(found['ids'], found['metadatas'])
+        }
+
+        rows = [
+            (doc_id, doc, dict(meta, content_hash=digest))
+            for doc_id, doc, meta, digest in zip(ids, documents, metadatas, hashes)
+            if not (skip_unchanged and existing.get(doc_id) == digest)
+        ]
+        return rows, set(existing)
+
+    def write_documents(
+        self,
+        collection,
+        rows: List[Tuple[str, str, Dict]],
+        existing_ids: set,
+        total: int,
+        embeddings=None
+    ) -> Dict[str, int]:
+        """Upsert rows from diff_documents, optionally with precomputed embeddings"""
+        if rows:
+            batch_ids, batch_docs, batch_metas = (list(column) for column in zip(*rows))
+            collection.upsert(ids=batch_ids, documents=batch_docs, metadatas=batch_metas, embeddings=embeddings)
+            self._invalidate_count(collection)
+            self._sync_indexes(collection, batch_ids, batch_docs, batch_metas)
+        
+        inserted = sum(1 for doc_id, _, _ in rows if doc_id not in existing_ids)
+        return {
+            "inserted": inserted,
+            "updated": len(rows) - inserted,
+            "unchanged": total - len(rows)
+        }
+
+    def _query(self, collection, limit: int, **kwargs) -> Dict:
+        """Query a collection with n_results sized from the cached count"""
+        n_results = min(limit, self._count(collection))
+        if n_results == 0:
+            # A cached zero must not hide documents added since (e.g. by init_db)
+            n_results = min(limit, self._count(collection, refresh=True))
+        if n_results == 0:
+            return {'documents': [], 'metadatas': []}
+        return collection.query(n_results=n_results, **kwargs)
 
     def get_user_profile(self, user_id: str) -> Optional[Dict]:
         """Get user profile from database"""
@@ -54,7 +439,7 @@ class ChromaDBManager:
             return None
             
         except Exception as e:
-            print(f"Error getting user profile: {str(e)}")
+            logger.error("Error getting user profile: %s", e)
             return None
 
     def store_user_profile(self, user_id: str, profile: Dict) -> bool:
@@ -69,69 +454,147 @@ class ChromaDBManager:
                 metadatas=[profile],
                 ids=[f"profile_{user_id}"]
             )
+            self._invalidate_count(self.user_profiles)
             return True
             
         except Exception as e:
-            print(f"Error storing user profile: {str(e)}")
+            logger.error("Error storing user profile: %s", e)
             return False
 
+    def retrieve(
+        self,
+        query: str,
+        user_profile: Optional[Dict] = None,
+        quotas: Optional[Dict[str, int]] = None,
+        max_distance: Optional[float] = None,
+        max_results: Optional[int] = None
+    ) -> RetrievalResult:
+        """Embed the query once, search all knowledge sources concurrently and merge hits by distance"""
+        self._check_knowledge_version()
+        # Use user profile topics to enhance search if available
+        search_query = query
+        if user_profile and user_profile.get('key_topics'):
+            topics = ' '.join(user_profile['key_topics'])
+            search_query = f"{query} {topics}"
+        
+        quotas = quotas or DEFAULT_RETRIEVAL_QUOTAS
+        query_embedding = self.query_embeddings.embed_one(search_query)
+        
+        futures = {
+            source: self._search_executor.submit(
+                self._query,
+                self.knowledge_sources[source],
+                quota,
+                query_embeddings=[query_embedding],
+                include=["documents", "metadatas", "distances"]
+            )
+            for source, quota in quotas.items()
+            if quota > 0 and source in self.knowledge_sources
+        }
+        
+        result = RetrievalResult(query=search_query)
+        for source, future in futures.items():
+            try:
+                hits = future.result()
+            except Exception as e:
+                logger.error("Error searching %s: %s", source, e)
+                continue
+            if not hits['documents']:
+                continue
+            
+            filtered = 0
+            for doc_id, document, metadata, distance in zip(
+                hits['ids'][0], hits['documents'][0], hits['metadatas'][0], hits['distances'][0]
+            ):
+                # Far-away documents would only add noise to the prompt
+                if max_distance is not None and distance > max_distance:
+                    filtered += 1
+                    continue
+                result.documents.append(RetrievedDocument(source, doc_id, document, metadata or {}, distance))
+            if filtered:
+                result.filtered[source] = filtered
+        
+        result.documents.sort(key=lambda doc: doc.distance)
+        if max_results is not None:
+            del result.documents[max_results:]
+        return result
+
+    def lexical_search(self, query: str, limit: int = 10, sources: Optional[List[str]] = None) -> List[RetrievedDocument]:
+        """BM25 hits over the knowledge sources, best first"""
+        self._check_knowledge_version()
+        return [
+            RetrievedDocument(source, doc_id, document, metadata, score=score)
+            for source, doc_id, document, metadata, score in self.lexical_index.search(query, limit, sources)
+        ]
+
+    def attach_distances(self, query: str, documents: List[RetrievedDocument]):
+        """Fill in the vector distance of hits found by another ranking (None if the id is gone)"""
+        pending: Dict[str, List[RetrievedDocument]] = {}
+        for doc in documents:
+            if doc.distance is None and doc.source in self.knowledge_sources:
+                pending.setdefault(doc.source, []).append(doc)
+        if not pending:
+            return
+        
+        query_embedding = self.query_embeddings.embed_one(query)
+        futures = {
+            source: self._search_executor.submit(
+                self.knowledge_sources[source].query,
+                query_embeddings=[query_embedding],
+                ids=[doc.doc_id for doc in docs],
+                n_results=len(docs),
+                include=["distances"]
+            )
+            for source, docs in pending.items()
+        }
+        for source, future in futures.items():
+            try:
+                hits = future.result()
+            except Exception as e:
+                logger.error("Error scoring %s hits: %s", source, e)
+                continue
+            distances = dict(zip(hits['ids'][0], hits['distances'][0]))
+            for doc in pending[source]:
+                doc.distance = distances.get(doc.doc_id)
+
     def get_relevant_content(self, query: str, user_profile: Optional[Dict] = None, limit: int = 5) -> Dict:
         """Get relevant content based on query using vector similarity"""
         try:
-            print(f"\n=== Getting Relevant Content for Query: {query} ===")
-            
-            # Use user profile topics to enhance search if available
-            search_query = query
-            if user_profile and user_profile.get('key_topics'):
-                topics = ' '.join(user_profile['key_topics'])
-                search_query = f"{query} {topics}"
-            
-            # Get relevant health tips
-            health_results = self.health_tips.query(
-                query_texts=[search_query],
-                n_results=min(limit, len(self.health_tips.get()['ids']))
-            )
-            
-            # Get relevant products
-            product_results = self.products.query(
-                query_texts=[search_query],
-                n_results=min(limit, len(self.products.get()['ids']))
+            result = self.retrieve(
+                query,
+                user_profile,
+                quotas={"health_tips": limit, "faqs": limit, "products": limit}
             )
             
-            print(f"Found {len(health_results['documents'][0] if health_results['documents'] else [])} relevant health tips")
-            print(f"Found {len(product_results['documents'][0] if product_results['documents'] else [])} relevant products")
-            
-            return {
-                'health_tips': {
-                    'documents': health_results['documents'][0] if health_results['documents'] else [],
-                    'metadatas': health_results['metadatas'][0] if health_results['metadatas'] else []
-                },
-                'products': {
-                    'documents': product_results['documents'][0] if product_results['documents'] else [],
-                    'metadatas': product_results['metadatas'][0] if product_results['metadatas'] else []
+            content = {}
+            for source in self.knowledge_sources:
+                docs = result.by_source(source)
+                logger.debug("Found %d relevant %s", len(docs), source)
+                content[source] = {
+                    'documents': [doc.document for doc in docs],
+                    'metadatas': [doc.metadata for doc in docs]
                 }
-            }
+            return content
             
         except Exception as e:
-            print(f"Error getting relevant content: {str(e)}")
-            return {
-                'health_tips': {'documents': [], 'metadatas': []}, 
-                'products': {'documents': [], 'metadatas': []}
-            }
+            logger.error("Error getting relevant content: %s", e)
+            return {source: {'documents': [], 'metadatas': []} for source in self.knowledge_sources}
 
     def get_health_tips(self, category: Optional[str] = None, limit: int = 5) -> Dict:
         """Get health tips with proper error handling"""
         try:
             if category:
-                results = self.health_tips.query(
-                    query_texts=["health tips"],
-                    where={"category": category},
-                    n_results=min(limit, len(self.health_tips.get()['ids']))
+                results = self._query(
+                    self.health_tips,
+                    limit,
+                    query_embeddings=[self.query_embeddings.embed_one(TIPS_QUERY)],
+                    where={"category": category}
                 )
             else:
-                results = self.health_tips.query(
-                    query_texts=["health tips"],
-                    n_results=min(limit, len(self.health_tips.get()['ids']))
+                results = self._query(
+                    self.health_tips,
+                    limit,
+                    query_embeddings=[self.query_embeddings.embed_one(TIPS_QUERY)]
                 )
             
             return {
@@ -140,150 +603,175 @@ class ChromaDBManager:
             }
             
         except Exception as e:
-            print(f"Error getting health tips: {str(e)}")
+            logger.error("Error getting health tips: %s", e)
             return {'documents': [], 'metadatas': []}
 
-    def get_products_by_category(self, category: str) -> Dict:
-        """Get products by category with proper error handling"""
+    def get_random_health_tip(self, category: Optional[str] = None) -> Optional[Dict]:
+        """Uniformly sampled health tip from the category index"""
         try:
-            results = self.products.query(
-                query_texts=[""],
-                where={"category": category},
-                n_results=min(5, len(self.products.get()['ids']))
-            )
+            self._check_knowledge_version()
+            entry = self.tip_categories.random(category)
+            if entry is None:
+                return None
+            doc_id, document, metadata = entry
+            return {'id': doc_id, 'document': document, 'metadata': metadata}
             
+        except Exception as e:
+            logger.error("Error getting random health tip: %s", e)
+            return None
+
+    def get_products_by_category(self, category: str, limit: int = 5) -> Dict:
+        """Get products by category with proper error handling"""
+        try:
+            self._check_knowledge_version()
+            entries = self.product_categories.entries(category)[:limit]
             return {
-                'documents': results['documents'][0] if results['documents'] else [],
-                'metadatas': results['metadatas'][0] if results['metadatas'] else []
+                'documents': [document for _, document, _ in entries],
+                'metadatas': [metadata for _, _, metadata in entries]
             }
             
         except Exception as e:
-            print(f"Error getting products: {str(e)}")
+            logger.error("Error getting products: %s", e)
             return {'documents': [], 'metadatas': []}
 
     def add_health_tip(self, tip_id: str, tip_text: str, category: str):
         """Add a health tip to the database"""
         try:
+            doc_id, document, metadata = health_tip_record(tip_id, tip_text, category)
             self.health_tips.add(
-                documents=[tip_text],
-                metadatas=[{"category": category}],
-                ids=[tip_id]
+                documents=[document],
+                metadatas=[metadata],
+                ids=[doc_id]
             )
+            self._invalidate_count(self.health_tips)
+            self._sync_indexes(self.health_tips, [doc_id], [document], [metadata])
             # Auto-persisted with PersistentClient
         except Exception as e:
-            print(f"Error adding health tip: {str(e)}")
+            logger.error("Error adding health tip: %s", e)
 
     def add_faq(self, faq_id: str, question: str, answer: str, category: str):
-        """Add an FAQ to the database (using a dedicated collection if available, or health_tips)"""
+        """Add an FAQ to the database"""
         try:
-            # Check if faq collection exists, if not use health_tips
-            try:
-                faq_collection = self.client.get_or_create_collection(
-                    name="faqs",
-                    embedding_function=self.embedding_function
-                )
-                faq_collection.add(
-                    documents=[f"Q: {question}\nA: {answer}"],
-                    metadatas=[{"category": category, "question": question, "answer": answer}],
-                    ids=[faq_id]
-                )
-            except:
-                self.health_tips.add(
-                    documents=[f"Q: {question}\nA: {answer}"],
-                    metadatas=[{"category": category, "type": "faq"}],
-                    ids=[faq_id]
-                )
+            doc_id, document, metadata = faq_record(faq_id, question, answer, category)
+            self.faqs.add(
+                documents=[document],
+                metadatas=[metadata],
+                ids=[doc_id]
+            )
+            self._invalidate_count(self.faqs)
+            self._sync_indexes(self.faqs, [doc_id], [document], [metadata])
             # Auto-persisted with PersistentClient
         except Exception as e:
-            print(f"Error adding FAQ: {str(e)}")
+            logger.error("Error adding FAQ: %s", e)
 
     def add_product(self, product_id: str, name: str, description: str, category: str, price: float):
         """Add a product to the database"""
         try:
+            doc_id, document, metadata = product_record(product_id, name, description, category, price)
             self.products.add(
-                documents=[description],
-                metadatas=[{"name": name, "category": category, "price": price}],
-                ids=[product_id]
+                documents=[document],
+                metadatas=[metadata],
+                ids=[doc_id]
             )
+            self._invalidate_count(self.products)
+            self._sync_indexes(self.products, [doc_id], [document], [metadata])
             # Auto-persisted with PersistentClient
         except Exception as e:
-            print(f"Error adding product: {str(e)}")
+            logger.error("Error adding product: %s", e)
 
     def store_chat(self, user_id: str, message: str, response: str) -> bool:
         """Store chat with proper error handling"""
         try:
-            chat_id = f"chat_{user_id}_{datetime.now().timestamp()}"
-            self.chat_history.add(
-                documents=[f"User: {message}\nBot: {response}"],
-                metadatas=[{
-                    "user_id": user_id,
-                    "timestamp": datetime.now().isoformat()
-                }],
-                ids=[chat_id]
-            )
-            # Auto-persisted with PersistentClient
-            return True
+            now = datetime.now()
+            self.history_store.append_chat(user_id, message, response, timestamp=now.timestamp())
         except Exception as e:
-            print(f"Error storing chat: {str(e)}")
+            logger.error("Error storing chat: %s", e)
             return False
 
+        if self.index_chats:
+            try:
+                self._add_document(
+                    self.chat_history,
+                    f"User: {message}\nBot: {response}",
+                    {
+                        "user_id": user_id,
+                        "timestamp": now.isoformat()
+                    },
+                    f"chat_{user_id}_{now.timestamp()}"
+                )
+            except Exception as e:
+                logger.error("Error indexing chat: %s", e)
+        return True
+
     def store_feedback(self, user_id: str, rating: int, comment: str) -> bool:
         """Store user feedback"""
         try:
-            feedback_id = f"feedback_{user_id}_{datetime.now().timestamp()}"
-            self.feedback.add(
-                documents=[comment],
-                metadatas=[{
+            now = datetime.now()
+            feedback_id = f"feedback_{user_id}_{now.timestamp()}"
+            # SQLite row (and its day's running totals) backs the admin API; Chroma indexes the comment
+            self.history_store.append_feedback(feedback_id, user_id, rating, comment, now.timestamp())
+        except Exception as e:
+            logger.error("Error storing feedback: %s", e)
+            return False
+
+        # The feedback is recorded once the SQLite commit succeeds; indexing is best-effort
+        try:
+            self._add_document(
+                self.feedback,
+                comment,
+                {
                     "user_id": user_id,
                     "rating": rating,
-                    "timestamp": datetime.now().isoformat()
-                }],
-                ids=[feedback_id]
+                    "timestamp": now.isoformat()
+                },
+                feedback_id
             )
-            # Auto-persisted with PersistentClient
-            return True
         except Exception as e:
-            print(f"Error storing feedback: {str(e)}")
-            return False
+            logger.error("Error indexing feedback: %s", e)
+        return True
 
-    def get_all_feedback(self) -> List[Dict]:
-        """Get all feedback entries"""
+    def get_feedback_page(
+        self,
+        limit: int = 50,
+        cursor: Optional[Tuple[float, int]] = None,
+        min_rating: Optional[int] = None,
+        max_rating: Optional[int] = None,
+        since: Optional[date] = None,
+        until: Optional[date] = None
+    ) -> Dict:
+        """Newest-first page of feedback; cursor comes from parse_feedback_cursor, until is inclusive"""
+        since_ts = datetime.combine(since, datetime.min.time()).timestamp() if since else None
+        until_ts = datetime.combine(until + timedelta(days=1), datetime.min.time()).timestamp() if until else None
         try:
-            results = self.feedback.get()
-            feedback_list = []
-            
-            if results['ids']:
-                for i in range(len(results['ids'])):
-                    feedback_list.append({
-                        "id": results['ids'][i],
-                        "comment": results['documents'][i],
-                        "rating": results['metadatas'][i].get("rating", 0),
-                        "timestamp": results['metadatas'][i].get("timestamp"),
-                        "user_id": results['metadatas'][i].get("user_id")
-                    })
-            
-            # Sort by timestamp descending
-            feedback_list.sort(key=lambda x: x['timestamp'] or '', reverse=True)
-            return feedback_list
+            items, next_cursor = self.history_store.get_feedback_page(
+                limit, cursor, min_rating, max_rating, since_ts, until_ts
+            )
+            return {"feedback": items, "next_cursor": next_cursor}
         except Exception as e:
-            print(f"Error getting all feedback: {str(e)}")
-            return []
+            logger.error("Error getting feedback page: %s", e)
+            return {"feedback": [], "next_cursor": None}
 
-    def get_chat_history(self, user_id: str, limit: int = 10) -> Dict:
-        """Get chat history with proper error handling"""
+    def get_feedback_stats(self, since: Optional[date] = None, until: Optional[date] = None) -> Dict:
+        """Per-day and overall feedback aggregates from the running totals"""
         try:
-            results = self.chat_history.query(
-                query_texts=[""],
-                where={"user_id": user_id},
-                n_results=min(limit, len(self.chat_history.get()['ids']))
+            return self.history_store.get_feedback_stats(
+                since.isoformat() if since else None,
+                until.isoformat() if until else None
             )
+        except Exception as e:
+            logger.error("Error getting feedback stats: %s", e)
+            return {"total": {"count": 0, "histogram": {}, "average": 0.0}, "days": []}
+
+    def get_chat_history(self, user_id: str, limit: int = 10) -> Dict:
+        """Get the user's most recent chat turns in chronological order"""
+        try:
+            turns = self.history_store.get_recent_chats(user_id, limit)
             
             return {
-                'documents': results['documents'][0] if results['documents'] else [],
-                'metadatas': results['metadatas'][0] if results['metadatas'] else []
+                'documents': [f"User: {turn['message']}\nBot: {turn['response']}" for turn in turns],
+                'metadatas': [{"user_id": user_id, "timestamp": turn['timestamp']} for turn in turns]
             }
             
         except Exception as e:
-            print(f"Error getting chat history: {str(e)}")
+            logger.error("Error getting chat history: %s", e)
             return {'documents': [], 'metadatas': []}
-        
\ No newline at end of file
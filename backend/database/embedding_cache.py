@@ -0,0 +1,75 @@
+# backend/database/embedding_cache.py
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List
+
+class EmbeddingCache:
+    """LRU cache of query embeddings keyed by text hash, callable like an embedding function"""
+
+    def __init__(self, embedding_function, max_entries: int = 2048):
+        self.embedding_function = embedding_function
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, object]" = OrderedDict()
+        # Precomputed constants (e.g. "health tips") that are never evicted
+        self._pinned: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def _key(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def __call__(self, input: List[str]) -> List:
+        return self.embed(input)
+
+    def embed(self, texts: List[str]) -> List:
+        """Embeddings for texts, computing only the ones not cached (in one batch)"""
+        keys = [self._key(text) for text in texts]
+        vectors = [None] * len(texts)
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._pinned.get(key)
+                if vector is None:
+                    vector = self._entries.get(key)
+                    if vector is not None:
+                        self._entries.move_to_end(key)
+                if vector is None:
+                    missing.append(i)
+                else:
+                    vectors[i] = vector
+            self._stats["hits"] += len(texts) - len(missing)
+            self._stats["misses"] += len(missing)
+
+        if missing:
+            computed = self.embedding_function([texts[i] for i in missing])
+            with self._lock:
+                for i, vector in zip(missing, computed):
+                    vectors[i] = vector
+                    self._entries[keys[i]] = vector
+                    self._entries.move_to_end(keys[i])
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._stats["evictions"] += 1
+        return vectors
+
+    def embed_one(self, text: str):
+        return self.embed([text])[0]
+
+    def pin(self, texts: Iterable[str]):
+        """Precompute embeddings that stay cached for the life of the process"""
+        texts = list(texts)
+        vectors = self.embedding_function(texts)
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                self._pinned[self._key(text)] = vector
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["pinned"] = len(self._pinned)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
@@ -0,0 +1,214 @@
+# backend/database/history_store.py
+import math
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+def parse_feedback_cursor(cursor: str) -> Tuple[float, int]:
+    """(timestamp, row id) from a next_cursor string; raises ValueError if it is malformed"""
+    cursor_ts, cursor_id = cursor.split("_", 1)
+    timestamp = float(cursor_ts)
+    if not math.isfinite(timestamp):
+        raise ValueError(f"Invalid feedback cursor: {cursor!r}")
+    return timestamp, int(cursor_id)
+
+class HistoryStore:
+    """Append-only chronological store for chat turns and feedback, kept alongside ChromaDB"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS chat_turns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                timestamp REAL NOT NULL,
+                message TEXT NOT NULL,
+                response TEXT NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_chat_turns_user_ts ON chat_turns (user_id, timestamp)"
+        )
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS feedback (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                feedback_id TEXT NOT NULL UNIQUE,
+                user_id TEXT NOT NULL,
+                timestamp REAL NOT NULL,
+                rating INTEGER NOT NULL,
+                comment TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_feedback_ts ON feedback (timestamp, id)")
+        # Running per-day totals, updated in the same transaction as each insert
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS feedback_daily (
+                day TEXT NOT NULL,
+                rating INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (day, rating)
+            )
+        """)
+        self._conn.commit()
+
+    def append_chat(self, user_id: str, message: str, response: str, timestamp: float = None) -> int:
+        """Append a chat turn and return its row id"""
+        timestamp = timestamp if timestamp is not None else time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO chat_turns (user_id, timestamp, message, response) VALUES (?, ?, ?, ?)",
+                (user_id, timestamp, message, response)
+            )
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def append_chats(self, rows: List[tuple]):
+        """Bulk append (user_id, timestamp, message, response) rows"""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO chat_turns (user_id, timestamp, message, response) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def is_empty(self) -> bool:
+        """Check whether any chat turns have been stored"""
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM chat_turns LIMIT 1").fetchone() is None
+
+    def get_recent_chats(self, user_id: str, limit: int = 10) -> List[Dict]:
+        """Get the last `limit` turns for a user, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT message, response, timestamp FROM chat_turns
+                   WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?""",
+                (user_id, limit)
+            ).fetchall()
+
+        return [{
+            "message": message,
+            "response": response,
+            "timestamp": datetime.fromtimestamp(timestamp).isoformat()
+        } for message, response, timestamp in reversed(rows)]
+
+    def append_feedback(self, feedback_id: str, user_id: str, rating: int, comment: str, timestamp: float = None) -> bool:
+        """Record feedback and bump its day's running totals; returns False for a duplicate id"""
+        return self.append_feedbacks([(feedback_id, user_id, timestamp if timestamp is not None else time.time(), rating, comment)]) == 1
+
+    def append_feedbacks(self, rows: List[tuple]) -> int:
+        """Bulk insert (feedback_id, user_id, timestamp, rating, comment) rows, skipping known ids"""
+        inserted = 0
+        with self._lock:
+            with self._conn:
+                for feedback_id, user_id, timestamp, rating, comment in rows:
+                    cursor = self._conn.execute(
+                        """INSERT OR IGNORE INTO feedback (feedback_id, user_id, timestamp, rating, comment)
+                           VALUES (?, ?, ?, ?, ?)""",
+                        (feedback_id, user_id, timestamp, int(rating), comment)
+                    )
+                    if cursor.rowcount != 1:
+                        continue
+                    inserted += 1
+                    self._conn.execute(
+                        """INSERT INTO feedback_daily (day, rating, count) VALUES (?, ?, 1)
+                           ON CONFLICT (day, rating) DO UPDATE SET count = count + 1""",
+                        (date.fromtimestamp(timestamp).isoformat(), int(rating))
+                    )
+        return inserted
+
+    def feedback_is_empty(self) -> bool:
+        """Check whether any feedback has been stored"""
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM feedback LIMIT 1").fetchone() is None
+
+    def get_feedback_page(
+        self,
+        limit: int = 50,
+        cursor: Optional[Tuple[float, int]] = None,
+        min_rating: Optional[int] = None,
+        max_rating: Optional[int] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """Newest-first page of feedback and the cursor for the next page (None at the end)"""
+        clauses, params = [], []
+        if cursor:
+            # Keyset pagination: strictly older than the last row of the previous page
+            cursor_ts, cursor_id = cursor
+            clauses.append("(timestamp < ? OR (timestamp = ? AND id < ?))")
+            params += [cursor_ts, cursor_ts, cursor_id]
+        if min_rating is not None:
+            clauses.append("rating >= ?")
+            params.append(min_rating)
+        if max_rating is not None:
+            clauses.append("rating <= ?")
+            params.append(max_rating)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"""SELECT id, feedback_id, user_id, timestamp, rating, comment FROM feedback
+                    {where} ORDER BY timestamp DESC, id DESC LIMIT ?""",
+                params + [limit + 1]
+            ).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = f"{rows[-1][3]!r}_{rows[-1][0]}"
+
+        return [{
+            "id": feedback_id,
+            "user_id": user_id,
+            "timestamp": datetime.fromtimestamp(timestamp).isoformat(),
+            "rating": rating,
+            "comment": comment
+        } for _, feedback_id, user_id, timestamp, rating, comment in rows], next_cursor
+
+    def get_feedback_stats(self, since_day: Optional[str] = None, until_day: Optional[str] = None) -> Dict:
+        """Per-day count, average and rating histogram from the running totals, plus overall totals"""
+        clauses, params = [], []
+        if since_day:
+            clauses.append("day >= ?")
+            params.append(since_day)
+        if until_day:
+            clauses.append("day <= ?")
+            params.append(until_day)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT day, rating, count FROM feedback_daily {where} ORDER BY day DESC, rating",
+                params
+            ).fetchall()
+
+        days: Dict[str, Dict] = {}
+        total = {"count": 0, "rating_sum": 0, "histogram": {}}
+        for day, rating, count in rows:
+            bucket = days.setdefault(day, {"day": day, "count": 0, "rating_sum": 0, "histogram": {}})
+            for totals in (bucket, total):
+                totals["count"] += count
+                totals["rating_sum"] += rating * count
+                totals["histogram"][str(rating)] = totals["histogram"].get(str(rating), 0) + count
+
+        for totals in list(days.values()) + [total]:
+            rating_sum = totals.pop("rating_sum")
+            totals["average"] = round(rating_sum / totals["count"], 2) if totals["count"] else 0.0
+        return {"total": total, "days": list(days.values())}
+
+    def close(self):
+        """Close the underlying connection"""
+        with self._lock:
+            self._conn.close()
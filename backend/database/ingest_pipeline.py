@@ -0,0 +1,181 @@
+# backend/database/ingest_pipeline.py
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Per-process embedding function, loaded once by the pool initializer
+_embedding_function = None
+
+def _init_worker(embedding_factory: Callable):
+    global _embedding_function
+    _embedding_function = embedding_factory()
+
+def _embed(documents: List[str]):
+    return _embedding_function(documents)
+
+class IngestCheckpoint:
+    """Records how many records of each source have been written, so interrupted loads resume"""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._state: Dict[str, Dict] = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as file:
+                    self._state = json.load(file)
+            except Exception as e:
+                logger.error("Error reading ingest checkpoint, starting over: %s", e)
+
+    @staticmethod
+    def _signature(source_path: Optional[str]) -> Optional[List]:
+        """Size and mtime of the source file; a changed file invalidates its checkpoint"""
+        if not source_path or not os.path.exists(source_path):
+            return None
+        stat = os.stat(source_path)
+        return [stat.st_size, stat.st_mtime]
+
+    def resume_from(self, key: str, source_path: Optional[str]) -> int:
+        entry = self._state.get(key)
+        if not entry or entry.get("signature") != self._signature(source_path):
+            return 0
+        return entry.get("records", 0)
+
+    def update(self, key: str, source_path: Optional[str], records: int):
+        self._state[key] = {"records": records, "signature": self._signature(source_path)}
+        self._save()
+
+    def complete(self, key: str):
+        self._state.pop(key, None)
+        self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        if not self._state:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            return
+        # Write-then-rename so a crash never leaves a truncated checkpoint
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self._state, file)
+        os.replace(tmp_path, self.path)
+
+class IngestPipeline:
+    """Embeds knowledge-base batches on a process pool and upserts them with precomputed embeddings"""
+
+    def __init__(
+        self,
+        db_manager,
+        workers: int = 0,
+        embedding_factory: Optional[Callable] = None,
+        chunk_size: int = 64,
+        max_inflight_batches: int = 2,
+        checkpoint_path: Optional[str] = None
+    ):
+        self.db_manager = db_manager
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.max_inflight_batches = max_inflight_batches
+        self.checkpoint = IngestCheckpoint(checkpoint_path)
+        self.pool = None
+        if workers > 0:
+            # Spawned workers avoid forking Chroma/ONNX runtime threads; each loads the model once
+            self.pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(embedding_factory or type(db_manager.embedding_function),)
+            )
+
+    def _submit(self, rows: List[Tuple[str, str, Dict]]) -> List:
+        """Shard a batch's documents across the pool"""
+        if not self.pool or not rows:
+            return []
+        documents = [doc for _, doc, _ in rows]
+        return [
+            self.pool.submit(_embed, documents[i:i + self.chunk_size])
+            for i in range(0, len(documents), self.chunk_size)
+        ]
+
+    def _write(self, collection, pending, totals: Dict):
+        rows, existing_ids, total, futures = pending
+        # Without a pool Chroma embeds inside upsert
+        embeddings = None
+        if futures:
+            embeddings = [vector for future in futures for vector in future.result()]
+        result = self.db_manager.write_documents(collection, rows, existing_ids, total, embeddings)
+        for name, value in result.items():
+            totals[name] += value
+        totals["embedded"] += len(rows)
+
+    def run(
+        self,
+        key: str,
+        collection,
+        batches: Iterable[List[Tuple[str, str, Dict]]],
+        source_path: Optional[str] = None,
+        skip_unchanged: bool = True
+    ) -> Dict:
+        """Load (id, document, metadata) batches for one source, resuming from its checkpoint"""
+        totals = {"inserted": 0, "updated": 0, "unchanged": 0, "failed": 0, "embedded": 0, "resumed": 0}
+        skip = self.checkpoint.resume_from(key, source_path)
+        done = 0
+        inflight = deque()
+
+        start = time.perf_counter()
+
+        def drain(limit: int):
+            nonlocal done
+            while len(inflight) > limit:
+                pending = inflight.popleft()
+                try:
+                    self._write(collection, pending, totals)
+                except Exception as e:
+                    logger.error("Error loading %s batch: %s", key, e)
+                    totals["failed"] += pending[2]
+                done += pending[2]
+                # Never checkpoint past a failed batch, so a re-run retries it
+                if totals["failed"] == 0:
+                    self.checkpoint.update(key, source_path, done)
+
+        for batch in batches:
+            if done + len(batch) <= skip:
+                # Already written by an earlier, interrupted run
+                done += len(batch)
+                totals["resumed"] += len(batch)
+                continue
+
+            ids, documents, metadatas = (list(column) for column in zip(*batch))
+            try:
+                rows, existing_ids = self.db_manager.diff_documents(
+                    collection, ids, documents, metadatas, skip_unchanged
+                )
+            except Exception as e:
+                logger.error("Error loading %s batch: %s", key, e)
+                drain(0)
+                totals["failed"] += len(batch)
+                done += len(batch)
+                continue
+
+            # Embedding of this batch overlaps with the upsert of the previous one
+            inflight.append((rows, existing_ids, len(batch), self._submit(rows)))
+            drain(self.max_inflight_batches - 1)
+
+        drain(0)
+        if totals["failed"] == 0:
+            self.checkpoint.complete(key)
+
+        totals["seconds"] = time.perf_counter() - start
+        return totals
+
+    def close(self):
+        if self.pool:
+            self.pool.shutdown()
@@ -1,6 +1,34 @@
+"""
+Bulk, idempotent knowledge-base loader
+
+Streams health tips, FAQs and products from data/health_knowledge (JSON or
+JSONL), embeds them in batches and upserts them into ChromaDB. JSONL is read
+line by line; a .json file is streamed record by record when the optional
+ijson package is installed and parsed whole otherwise, so convert very large
+catalogs to JSONL if ijson is unavailable. Documents
+whose content hash is unchanged since the last load are skipped, so the
+command is safe to re-run after editing the catalog:
+
+    python database/init_db.py --batch-size 256
+
+With --workers N, embeddings are computed on N processes and handed to
+Chroma precomputed. Progress is checkpointed after every batch, so an
+interrupted load resumes where it stopped:
+
+    python database/init_db.py --workers 4 --batch-size 1024
+"""
+import argparse
+import itertools
 import json
+import logging
 import os
 import sys
+import time
+
+try:
+    import ijson  # Optional: iterates .json arrays without loading the whole file
+except ImportError:
+    ijson = None
 
 # Add the backend directory to sys.path to allow imports from database and other modules
 backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -8,58 +36,122 @@ if backend_dir not in sys.path:
     sys.path.append(backend_dir)
 
 try:
-    from database.chromadb_manager import ChromaDBManager
+    from database.chromadb_manager import ChromaDBManager, faq_record, health_tip_record, product_record
+    from database.ingest_pipeline import IngestPipeline
 except ImportError:
-    from chromadb_manager import ChromaDBManager
+    from chromadb_manager import ChromaDBManager, faq_record, health_tip_record, product_record
+    from ingest_pipeline import IngestPipeline
+
+logger = logging.getLogger(__name__)
+
+# (file stem / JSON key, manager collection attribute, record builder)
+SOURCES = [
+    ("tips", "health_tips", lambda tip: health_tip_record(tip['id'], tip['text'], tip['category'])),
+    ("faqs", "faqs", lambda faq: faq_record(faq['id'], faq['question'], faq['answer'], faq['category'])),
+    ("products", "products", lambda product: product_record(
+        product['id'], product['name'], product['description'], product['category'], product['price']
+    )),
+]
 
 def load_json_data(file_path):
     with open(file_path, 'r', encoding='utf-8') as file:
         return json.load(file)
 
-def init_database():
+def source_path(data_dir, key):
+    """<stem>.jsonl if present, else <stem>.json (None if neither exists)"""
+    stem = "health_tips" if key == "tips" else key
+    for extension in ("jsonl", "json"):
+        path = os.path.join(data_dir, f"{stem}.{extension}")
+        if os.path.exists(path):
+            return path
+    return None
+
+def iter_records(path, key):
+    """Yield raw records, streaming JSONL line by line and .json arrays via ijson when available"""
+    if not path:
+        return
+    if path.endswith(".jsonl"):
+        with open(path, 'r', encoding='utf-8') as file:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        return
+    if ijson is not None:
+        with open(path, 'rb') as file:
+            # use_float keeps prices as floats (not Decimal) so content hashes match json.load
+            yield from ijson.items(file, f"{key}.item", use_float=True)
+        return
+    # Without ijson the whole document is held in memory
+    yield from load_json_data(path).get(key, [])
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def init_database(data_dir=None, chroma_dir=None, batch_size=256, skip_unchanged=True, workers=0, checkpoint_path=None):
     # Get the absolute path to the data directory
-    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-    data_dir = os.path.join(base_dir, 'data')
-    chroma_dir = os.path.join(data_dir, 'chromadb')
-    
+    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    data_dir = data_dir or os.path.join(base_dir, 'data', 'health_knowledge')
+    chroma_dir = chroma_dir or os.path.join(base_dir, 'data', 'chromadb')
+    checkpoint_path = checkpoint_path or os.path.join(chroma_dir, 'ingest_checkpoint.json')
+
     # Create ChromaDB manager
     db_manager = ChromaDBManager(chroma_dir)
-    
-    # Load and insert health tips
-    tips_data = load_json_data(os.path.join(data_dir, 'health_knowledge', 'health_tips.json'))
-    for tip in tips_data['tips']:
-        db_manager.add_health_tip(
-            tip_id=tip['id'],
-            tip_text=tip['text'],
-            category=tip['category']
-        )
-    
-    # Load and insert FAQs
-    faqs_data = load_json_data(os.path.join(data_dir, 'health_knowledge', 'faqs.json'))
-    for faq in faqs_data['faqs']:
-        db_manager.add_faq(
-            faq_id=faq['id'],
-            question=faq['question'],
-            answer=faq['answer'],
-            category=faq['category']
-        )
-    
-    # Load and insert products
-    products_data = load_json_data(os.path.join(data_dir, 'health_knowledge', 'products.json'))
-    for product in products_data['products']:
-        db_manager.add_product(
-            product_id=product['id'],
-            name=product['name'],
-            description=product['description'],
-            category=product['category'],
-            price=product['price']
-        )
-
-if __name__ == "__main__":
-    init_database()
-    print("Database initialized successfully!")
-
+    pipeline = IngestPipeline(db_manager, workers=workers, checkpoint_path=checkpoint_path)
 
+    results = {}
+    try:
+        for key, collection_name, build in SOURCES:
+            path = source_path(data_dir, key)
+            batches = (
+                [build(record) for record in batch]
+                for batch in batched(iter_records(path, key), batch_size)
+            )
+            totals = pipeline.run(key, getattr(db_manager, collection_name), batches, path, skip_unchanged)
+            processed = totals["inserted"] + totals["updated"] + totals["unchanged"] + totals["failed"]
+            rate = processed / totals["seconds"] if totals["seconds"] > 0 else 0.0
+            logger.info(
+                "%s: %d docs in %.2fs (%.1f docs/sec) - %d inserted, %d updated, %d unchanged, "
+                "%d failed, %d skipped via checkpoint",
+                key, processed, totals['seconds'], rate, totals['inserted'], totals['updated'],
+                totals['unchanged'], totals['failed'], totals['resumed']
+            )
+            results[key] = totals
+    finally:
+        pipeline.close()
+        db_manager.close()
+    return results
 
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data-dir', help="Directory with health_tips/faqs/products .json or .jsonl files")
+    parser.add_argument('--chroma-dir', help="ChromaDB persist directory")
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--force', action='store_true', help="Re-embed documents even if unchanged")
+    parser.add_argument('--workers', type=int, default=0, help="Embedding processes (0 = embed in-process)")
+    parser.add_argument('--checkpoint', help="Checkpoint file (default: <chroma-dir>/ingest_checkpoint.json)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
 
+    start = time.perf_counter()
+    results = init_database(
+        args.data_dir,
+        args.chroma_dir,
+        args.batch_size,
+        skip_unchanged=not args.force,
+        workers=args.workers,
+        checkpoint_path=args.checkpoint
+    )
+    elapsed = time.perf_counter() - start
+    processed = sum(t["inserted"] + t["updated"] + t["unchanged"] + t["failed"] for t in results.values())
+    logger.info(
+        "Database initialized successfully! %d docs in %.2fs (%.1f docs/sec)",
+        processed, elapsed, processed / elapsed if elapsed > 0 else 0.0
+    )
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+# backend/database/retrieval.py
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+@dataclass
+class RetrievedDocument:
+    """One knowledge-base hit; lower distance means closer to the query"""
+    source: str
+    doc_id: str
+    document: str
+    metadata: Dict
+    # Vector distance (None for lexical-only hits) and the ranking score that ordered it
+    distance: Optional[float] = None
+    score: float = 0.0
+
+@dataclass
+class RetrievalResult:
+    """Merged hits across knowledge-base collections, best first"""
+    query: str
+    documents: List[RetrievedDocument] = field(default_factory=list)
+    # Hits discarded by the relevance cutoff, per source
+    filtered: Dict[str, int] = field(default_factory=dict)
+
+    def by_source(self, source: str) -> List[RetrievedDocument]:
+        return [doc for doc in self.documents if doc.source == source]
+
+    def __bool__(self) -> bool:
+        return bool(self.documents)
+
+def reciprocal_rank_fusion(rankings: List[List[RetrievedDocument]], k: int = 60) -> List[RetrievedDocument]:
+    """Fuse ranked lists by summing 1 / (k + rank); the first list's copy of a document wins"""
+    fused: Dict[tuple, RetrievedDocument] = {}
+    scores: Dict[tuple, float] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = (doc.source, doc.doc_id)
+            fused.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+
+    for key, doc in fused.items():
+        doc.score = scores[key]
+    return sorted(fused.values(), key=lambda doc: doc.score, reverse=True)
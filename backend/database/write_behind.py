@@ -0,0 +1,143 @@
+# backend/database/write_behind.py
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+class WriteBehindQueue:
+    """Bounded queue that batches Chroma adds on a background worker thread"""
+
+    def __init__(
+        self,
+        max_queue_size: int = 1000,
+        max_batch_size: int = 64,
+        linger_ms: int = 50,
+        put_timeout: float = 0.5,
+        on_flushed: Optional[Callable] = None
+    ):
+        self.max_batch_size = max_batch_size
+        self.linger = linger_ms / 1000.0
+        self.put_timeout = put_timeout
+        self.on_flushed = on_flushed
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "enqueued": 0,
+            "written": 0,
+            "failed": 0,
+            "batches": 0,
+            "rejected": 0,  # Puts that timed out on a full queue (backpressure)
+            "max_depth": 0
+        }
+        # Submits in progress; close() waits for them so none lands behind the stop marker
+        self._closed = False
+        self._submitting = 0
+        self._close_cond = threading.Condition()
+        self._worker = threading.Thread(target=self._run, name="chroma-write-behind", daemon=True)
+        self._worker.start()
+
+    def submit(self, collection, document: str, metadata: Dict, doc_id: str) -> bool:
+        """Queue a document for a batched add; returns False when the queue stays full"""
+        with self._close_cond:
+            if self._closed:
+                return False
+            self._submitting += 1
+        try:
+            self._queue.put((collection, document, metadata, doc_id), timeout=self.put_timeout)
+        except queue.Full:
+            self._bump("rejected")
+            return False
+        finally:
+            with self._close_cond:
+                self._submitting -= 1
+                self._close_cond.notify_all()
+
+        with self._stats_lock:
+            self._stats["enqueued"] += 1
+            self._stats["max_depth"] = max(self._stats["max_depth"], self._queue.qsize())
+        return True
+
+    def stats(self) -> Dict:
+        """Snapshot of queue depth and throughput counters"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["depth"] = self._queue.qsize()
+        stats["capacity"] = self._queue.maxsize
+        stats["avg_batch_size"] = round(stats["written"] / stats["batches"], 2) if stats["batches"] else 0
+        return stats
+
+    def close(self, timeout: float = 10.0):
+        """Flush everything still queued and stop the worker"""
+        with self._close_cond:
+            if self._closed:
+                return
+            self._closed = True
+            # Puts time out after put_timeout, so this wait is bounded
+            self._close_cond.wait_for(lambda: self._submitting == 0)
+        self._queue.put(_STOP)
+        self._worker.join(timeout)
+
+    def _bump(self, key: str, n: int = 1):
+        with self._stats_lock:
+            self._stats[key] += n
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+
+            # Collect more items until the batch is full or the linger time runs out
+            batch = [item]
+            deadline = time.monotonic() + self.linger
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._flush(batch)
+
+        # Drain whatever arrived before shutdown
+        remaining_items = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                remaining_items.append(item)
+        for start in range(0, len(remaining_items), self.max_batch_size):
+            self._flush(remaining_items[start:start + self.max_batch_size])
+
+    def _flush(self, batch: List[tuple]):
+        """Write a batch with one collection.add call per target collection"""
+        by_collection: Dict[str, list] = {}
+        for collection, document, metadata, doc_id in batch:
+            by_collection.setdefault(collection.name, [collection, [], [], []])
+            entry = by_collection[collection.name]
+            entry[1].append(document)
+            entry[2].append(metadata)
+            entry[3].append(doc_id)
+
+        for collection, documents, metadatas, ids in by_collection.values():
+            try:
+                collection.add(documents=documents, metadatas=metadatas, ids=ids)
+                self._bump("written", len(ids))
+                self._bump("batches")
+                if self.on_flushed:
+                    self.on_flushed(collection, len(ids))
+            except Exception as e:
+                logger.error("Error flushing %d documents to %s: %s", len(ids), collection.name, e)
+                self._bump("failed", len(ids))
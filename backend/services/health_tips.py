@@ -1,6 +1,8 @@
 # backend/services/health_tips.py
+import logging
 from typing import Dict, List, Optional
-import random
+
+logger = logging.getLogger(__name__)
 
 class HealthTipsService:
     def __init__(self, db_manager):
@@ -12,14 +14,15 @@ class HealthTipsService:
     def get_random_tip(self, category: Optional[str] = None) -> Dict:
         """Get a random health tip"""
         try:
-            results = self.db_manager.get_health_tips(category=category, limit=5)
+            # Uniform sample over all tips (or the category) from the in-memory category index
+            tip = self.db_manager.get_random_health_tip(category)
             
-            if results and results.get('documents') and len(results['documents']) > 0:
-                index = random.randint(0, len(results['documents']) - 1)
+            if tip:
+                tip_category = tip['metadata'].get('category', 'general_health')
                 return {
-                    "tip": results['documents'][index],
-                    "category": results['metadatas'][index]['category'],
-                    "related_products": self.get_related_products(results['metadatas'][index]['category'])
+                    "tip": tip['document'],
+                    "category": tip_category,
+                    "related_products": self.get_related_products(tip_category)
                 }
             return {
                 "tip": "Ask me any health related question to get started!",
@@ -27,7 +30,7 @@ class HealthTipsService:
                 "related_products": []
             }
         except Exception as e:
-            print(f"Error getting tip: {str(e)}")
+            logger.error("Error getting tip: %s", e)
             return {
                 "tip": "I am ready to help with your health questions.",
                 "category": "general",
@@ -0,0 +1,8 @@
+# backend/tests/conftest.py
+import os
+import sys
+
+# Tests import modules the way the app does when run from the backend directory
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
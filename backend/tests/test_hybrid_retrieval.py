@@ -0,0 +1,60 @@
+# backend/tests/test_hybrid_retrieval.py
+import numpy as np
+import pytest
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+from database.chromadb_manager import ChromaDBManager
+from utils.rag_handler import RAGHandler
+
+# Each topic is one axis, so same-topic texts are at squared L2 0 and others at 2
+TOPICS = {
+    "sleep": ("sleep", "asleep", "bed", "bedtime", "insomnia", "melatonin"),
+    "fitness": ("workout", "workouts", "muscle", "strength", "training"),
+    "skin": ("sunscreen", "spf", "skin"),
+}
+
+class TopicEmbeddingFunction(EmbeddingFunction):
+    """Unit vector over the topics a text mentions"""
+    def __init__(self):
+        pass
+
+    def __call__(self, input: Documents) -> Embeddings:
+        vectors = []
+        for text in input:
+            words = set(text.lower().replace(",", " ").replace(".", " ").split())
+            vector = np.array([float(bool(words & set(terms))) for terms in TOPICS.values()] + [0.01])
+            vectors.append(vector / np.linalg.norm(vector))
+        return vectors
+
+    @staticmethod
+    def name() -> str:
+        return "test_topics"
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = ChromaDBManager(str(tmp_path), embedding_function=TopicEmbeddingFunction())
+    manager.add_health_tip("tip_schedule", "Go to bed at the same time every night for better sleep.", "sleep")
+    manager.add_health_tip("tip_melatonin", "Melatonin taken an hour before bedtime can help you fall asleep.", "sleep")
+    # Off-topic, but shares "magnesium" with the query below
+    manager.add_health_tip("tip_recovery", "Magnesium-rich foods support muscle recovery after workouts.", "fitness")
+    manager.add_health_tip("tip_sunscreen", "Apply SPF 30 sunscreen every morning.", "skin")
+    yield manager
+    manager.close()
+
+def test_off_topic_lexical_match_is_held_to_the_distance_cutoff(manager):
+    query = "magnesium for sleep"
+    lexical_ids = {doc.doc_id for doc in manager.lexical_search(query)}
+    assert "tip_recovery" in lexical_ids
+
+    handler = RAGHandler(manager, quotas={"health_tips": 3}, max_distance=1.2, max_results=3, hybrid=True)
+    ids = [doc.doc_id for doc in handler.retrieve(query).documents]
+
+    assert "tip_recovery" not in ids
+    assert "tip_melatonin" in ids or "tip_schedule" in ids
+
+def test_lexical_hits_get_their_vector_distance(manager):
+    hits = {doc.doc_id: doc for doc in manager.lexical_search("magnesium or melatonin for sleep")}
+    manager.attach_distances("magnesium or melatonin for sleep", list(hits.values()))
+
+    assert hits["tip_melatonin"].distance == pytest.approx(0.0, abs=1e-3)
+    assert hits["tip_recovery"].distance > 1.2
@@ -0,0 +1,72 @@
+# backend/tests/test_semantic_cache.py
+import asyncio
+import hashlib
+
+import numpy as np
+
+from config import Config
+from utils.gemini_handler import GeminiHandler
+from utils.semantic_cache import SemanticCache
+
+QUESTION = "What should a diabetic eat for breakfast?"
+
+class IsolatedConfig(Config):
+    GOOGLE_API_KEY = "test"
+    SONAR_API_KEY = None
+    DECOMPOSITION_CACHE_PERSISTENT = False
+    RESEARCH_CACHE_ENABLED = False
+    SESSION_BACKEND = "memory"
+
+def hash_embedding(texts):
+    """Deterministic stand-in for the ONNX model: identical text, identical vector"""
+    vectors = []
+    for text in texts:
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:4], "little")
+        vectors.append(np.random.default_rng(seed).standard_normal(32))
+    return vectors
+
+def make_handler():
+    handler = GeminiHandler(IsolatedConfig)
+    handler.semantic_cache = SemanticCache(hash_embedding, threshold=0.92)
+    calls = []
+
+    async def decompose_query(message):
+        return {"needs_research": False, "sub_queries": []}
+
+    async def generate_response(**inputs):
+        calls.append(inputs["conversation_context"])
+        return f"answer #{len(calls)} using context: {inputs['conversation_context']}"
+
+    handler.query_decomposer.decompose_query = decompose_query
+    handler.response_generator.generate_response = generate_response
+    return handler, calls
+
+def ask(handler, user_id, message):
+    return asyncio.run(handler.get_response(user_id, message))
+
+def test_answer_built_on_one_users_context_is_not_served_to_another():
+    handler, calls = make_handler()
+    handler.context_manager.update_context("alice", "I have type 2 diabetes", "Noted.")
+    handler.context_manager.update_context("alice", "I take metformin twice a day", "Noted.")
+
+    alice_answer = ask(handler, "alice", QUESTION)
+    bob_answer = ask(handler, "bob", QUESTION)
+
+    assert "metformin" in alice_answer
+    assert "metformin" not in bob_answer
+    assert len(calls) == 2
+    assert handler.semantic_cache.stats()["hits"] == 0
+
+def test_context_free_answer_is_not_served_into_a_conversation():
+    handler, calls = make_handler()
+    first = ask(handler, "bob", QUESTION)
+    # A second context-free asker reuses it
+    assert ask(handler, "carol", QUESTION) == first
+
+    handler.context_manager.update_context("alice", "I take metformin twice a day", "Noted.")
+    alice_answer = ask(handler, "alice", QUESTION)
+
+    assert alice_answer != first
+    assert "metformin" in alice_answer
+    assert len(calls) == 2
+    assert handler.semantic_cache.stats()["entries"] == 1
@@ -0,0 +1,30 @@
+# backend/tests/test_session_store.py
+import threading
+
+from utils.context_manager import ContextManager
+from utils.session_store import SQLiteSessionStore
+
+def test_concurrent_workers_keep_every_turn(tmp_path):
+    """Two stores on one database file stand in for two worker processes"""
+    db_path = str(tmp_path / "sessions.sqlite3")
+    managers = [ContextManager(store=SQLiteSessionStore(db_path), max_messages=1000) for _ in range(2)]
+
+    def chat(manager):
+        for i in range(50):
+            manager.update_context("shared", f"question {i}", f"answer {i}")
+
+    threads = [threading.Thread(target=chat, args=(manager,)) for manager in managers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(managers[0].get_context("shared", limit=1000)) == 200
+
+def test_update_without_result_leaves_session_untouched(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"))
+    manager = ContextManager(store=store)
+    manager.update_context("s", "hello there friend", "hi")
+
+    assert store.update("s", lambda session: None) is None
+    assert len(store.get("s").messages) == 2
@@ -0,0 +1,57 @@
+# backend/utils/async_runtime.py
+import asyncio
+import queue
+import threading
+from typing import AsyncIterator, Iterator, Optional
+
+class AsyncRuntime:
+    """One long-lived event loop on a background thread, shared by all requests"""
+
+    def __init__(self, name: str = "async-runtime"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name=name, daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """Run a coroutine on the shared loop and block the calling thread for its result"""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except Exception:
+            future.cancel()
+            raise
+
+    def iterate(self, async_gen: AsyncIterator) -> Iterator:
+        """Consume an async generator on the shared loop, yielding items synchronously; its errors re-raise here"""
+        items = queue.Queue()
+        done = object()
+        failure = []
+
+        async def consume():
+            try:
+                async for item in async_gen:
+                    items.put(item)
+            except Exception as e:
+                failure.append(e)
+            finally:
+                items.put(done)
+
+        # The generator keeps running if the caller stops early (e.g. client disconnect)
+        asyncio.run_coroutine_threadsafe(consume(), self.loop)
+        while True:
+            item = items.get()
+            if item is done:
+                if failure:
+                    raise failure[0]
+                return
+            yield item
+
+    def shutdown(self, timeout: float = 5.0):
+        """Stop the loop once pending callbacks have run"""
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout)
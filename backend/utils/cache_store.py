@@ -0,0 +1,98 @@
+# backend/utils/cache_store.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+class SQLiteCacheStore:
+    """Persistent key/value cache with a TTL and a least-recently-used size cap"""
+
+    def __init__(self, db_path: str, ttl_seconds: int = 86400, max_entries: int = 5000, table: str = "cache"):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.table = table
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+        """)
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_accessed ON {table} (accessed)")
+        self._conn.commit()
+        self._size = self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, created FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+
+            value, created = row
+            if now - created > self.ttl_seconds:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._conn.commit()
+                self._size -= 1
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+
+            self._conn.execute(f"UPDATE {self.table} SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self._stats["hits"] += 1
+        return json.loads(value)
+
+    def set(self, key: str, value: Any):
+        """Store a JSON-serializable value, evicting least recently used entries past max_entries"""
+        now = time.time()
+        payload = json.dumps(value)
+        with self._lock:
+            exists = self._conn.execute(
+                f"SELECT 1 FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone() is not None
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, payload, now, now)
+            )
+            if not exists:
+                self._size += 1
+
+            overflow = self._size - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN "
+                    f"(SELECT key FROM {self.table} ORDER BY accessed LIMIT ?)",
+                    (overflow,)
+                )
+                self._size -= overflow
+                self._stats["evictions"] += overflow
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        """Snapshot of cache counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = self._size
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+    def close(self):
+        """Close the underlying connection"""
+        with self._lock:
+            self._conn.close()
@@ -1,69 +1,148 @@
 from typing import Dict, List, Optional
-import json
-from datetime import datetime
+import asyncio
+import logging
+import time
+from utils.session_store import MemorySessionStore, Message, Session
+from utils.summarizer import ExtractiveSummarizer
+from utils.tokens import estimate_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
 
 class ContextManager:
-    def __init__(self):
-        self.session_contexts = {}
+    def __init__(
+        self,
+        store=None,
+        max_messages: int = 20,
+        token_budget: int = 1500,
+        summary_share: float = 0.25,
+        llm_summarizer=None
+    ):
+        # Pluggable session backend (in-memory LRU by default, SQLite for persistence)
+        self.store = store or MemorySessionStore()
+        self.max_messages = max_messages
+        # Packed prompt context: summary of older turns + recent turns, within token_budget
+        self.token_budget = token_budget
+        self.summary_budget = int(token_budget * summary_share)
+        # Evicted turns are folded into the running summary extractively right away;
+        # an optional LLM summarizer then refines it in the background
+        self.summarizer = ExtractiveSummarizer()
+        self.llm_summarizer = llm_summarizer
+        self._pending_summaries = set()
+        self._summary_stats = {"folds": 0, "turns_folded": 0, "llm_refinements": 0, "llm_failures": 0, "llm_stale": 0}
     
     def update_context(self, session_id: str, message: str, response: str):
         """Update context for a session"""
-        if session_id not in self.session_contexts:
-            self.session_contexts[session_id] = {
-                "messages": [],
-                "summary": "",
-                "last_update": None
-            }
+        def apply(session: Optional[Session]) -> Session:
+            session = session or Session()
+            now = time.time()
+            
+            # Add new message to context
+            session.messages.append(Message("user", message, now))
+            session.messages.append(Message("assistant", response, now))
+            
+            # Keep only last 10 exchanges
+            if len(session.messages) > self.max_messages:
+                del session.messages[:-self.max_messages]
+            
+            self._pack_turn(session_id, session, message, response)
+            session.last_update = now
+            return session
+        
+        # One atomic read-modify-write so concurrent workers cannot drop each other's turns
+        self.store.update(session_id, apply)
+
+    def _pack_turn(self, session_id: str, session: Session, message: str, response: str):
+        """Incrementally update the packed context with the newest turn"""
+        turn_budget = self.token_budget - self.summary_budget
+        turn_text = truncate_to_tokens(f"User: {message}\nAssistant: {response}", turn_budget)
+        tokens = estimate_tokens(turn_text)
+        session.packed_turns.append([turn_text, tokens])
+        session.packed_tokens += tokens
+        
+        # Turns that no longer fit leave the window and are folded into the running summary
+        evicted = []
+        while session.packed_tokens > turn_budget and len(session.packed_turns) > 1:
+            dropped_text, dropped_tokens = session.packed_turns.pop(0)
+            session.packed_tokens -= dropped_tokens
+            evicted.append(dropped_text)
         
-        # Add new message to context
-        self.session_contexts[session_id]["messages"].append({
-            "role": "user",
-            "content": message,
-            "timestamp": datetime.now().isoformat()
-        })
-        self.session_contexts[session_id]["messages"].append({
-            "role": "assistant",
-            "content": response,
-            "timestamp": datetime.now().isoformat()
-        })
+        if evicted:
+            previous_summary = session.summary
+            session.summary = self.summarizer.fold(previous_summary, evicted, self.summary_budget)
+            self._summary_stats["folds"] += 1
+            self._summary_stats["turns_folded"] += len(evicted)
+            if self.llm_summarizer:
+                self._schedule_llm_summary(session_id, previous_summary, session.summary, evicted)
+        
+        self._render(session)
+
+    def _render(self, session: Session):
+        """Rebuild the prompt-ready context from the summary and recent turns"""
+        parts = []
+        if session.summary:
+            parts.append(f"Earlier in the conversation:\n{session.summary}")
+        parts.append("Recent conversation:\n" + "\n\n".join(text for text, _ in session.packed_turns))
+        session.packed_text = "\n\n".join(parts)
+
+    def _schedule_llm_summary(self, session_id: str, previous_summary: str, extractive_summary: str, evicted: List[str]):
+        """Refine the running summary with the LLM without blocking the request"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # No event loop (sync caller): keep the extractive summary
         
-        # Keep only last 10 messages
-        if len(self.session_contexts[session_id]["messages"]) > 20:  # 10 exchanges
-            self.session_contexts[session_id]["messages"] = self.session_contexts[session_id]["messages"][-20:]
+        async def refine():
+            try:
+                summary = await self.llm_summarizer.fold(previous_summary, evicted, self.summary_budget)
+            except Exception as e:
+                logger.warning("Error refining conversation summary: %s", e)
+                self._summary_stats["llm_failures"] += 1
+                return
+            
+            def apply(session: Optional[Session]) -> Optional[Session]:
+                # Skip if the session moved on (another fold, clear or eviction) meanwhile
+                if not session or session.summary != extractive_summary or not summary:
+                    return None
+                session.summary = summary
+                self._render(session)
+                return session
+            
+            if self.store.update(session_id, apply) is None:
+                self._summary_stats["llm_stale"] += 1
+                return
+            self._summary_stats["llm_refinements"] += 1
         
-        self.session_contexts[session_id]["last_update"] = datetime.now().isoformat()
+        task = loop.create_task(refine())
+        self._pending_summaries.add(task)
+        task.add_done_callback(self._pending_summaries.discard)
+
+    def get_packed_context(self, session_id: str) -> str:
+        """Get the cached, token-budgeted conversation context for prompting"""
+        session = self.store.get(session_id)
+        return session.packed_text if session else ""
     
     def get_context(self, session_id: str, limit: int = 5) -> List[Dict]:
         """Get recent context for a session"""
-        if session_id not in self.session_contexts:
+        session = self.store.get(session_id)
+        if not session or not session.messages:
             return []
         
-        messages = self.session_contexts[session_id]["messages"]
-        return messages[-limit*2:] if messages else []  # Return last 'limit' exchanges
+        return [m.to_dict() for m in session.messages[-limit*2:]]  # Return last 'limit' exchanges
     
     def get_context_summary(self, session_id: str) -> str:
-        """Get summary of context"""
-        if session_id not in self.session_contexts:
-            return ""
-        
-        messages = self.session_contexts[session_id]["messages"]
-        if not messages:
-            return ""
-        
-        # Create a simple summary of the conversation
-        summary = []
-        for msg in messages[-6:]:  # Last 3 exchanges
-            if msg["role"] == "user":
-                summary.append(f"User asked about: {msg['content'][:50]}...")
-            else:
-                summary.append(f"Bot provided information about: {msg['content'][:50]}...")
-        
-        return "\n".join(summary)
+        """Get the running summary of turns that have left the context window"""
+        session = self.store.get(session_id)
+        return session.summary if session else ""
     
     def clear_context(self, session_id: str):
         """Clear context for a session"""
-        if session_id in self.session_contexts:
-            del self.session_contexts[session_id]
+        self.store.delete(session_id)
+
+    def stats(self) -> Dict:
+        """Session store and summarizer statistics"""
+        stats = self.store.stats()
+        stats["summaries"] = dict(self._summary_stats, pending_llm=len(self._pending_summaries))
+        return stats
 
 
 
@@ -80,27 +159,30 @@ Key Features:
    - Stores both user and assistant messages
    - Timestamps all interactions
    - Limits context size for memory efficiency
+   - Bounds the number of sessions (LRU) and expires idle ones
 
 2. Context Operations:
    - Update: Adds new messages to context
    - Retrieve: Gets recent conversation history
-   - Summarize: Creates brief conversation summaries
+   - Summarize: Maintains an incremental running summary of older turns
    - Clear: Removes session context
 
-Data Structure:
-self.session_contexts = {
-    "session_id": {
-        "messages": [
-            {
-                "role": "user/assistant",
-                "content": "message text",
-                "timestamp": "ISO format datetime"
-            }
-        ],
-        "summary": "conversation summary",
-        "last_update": "ISO format datetime"
-    }
-}
+Data Structure (utils/session_store.py):
+store: session_id -> Session(
+    messages=[Message(role="user/assistant", content="message text", ts=unix_time)],
+    summary="conversation summary",
+    last_update=unix_time,
+    packed_turns=[[turn_text, tokens]],
+    packed_tokens=int,
+    packed_text="prompt-ready conversation context"
+)
+Message and Session use __slots__ to keep per-message overhead small.
+
+Session Backends:
+- MemorySessionStore: in-process LRU capped at SESSION_MAX_SESSIONS, with
+  idle sessions expired after STREAMLIT_SESSION_TIMEOUT
+- SQLiteSessionStore: same eviction rules, persisted to SESSION_DB_PATH so
+  context survives restarts and is shared across worker processes
 
 Methods:
 1. update_context(session_id, message, response):
@@ -114,11 +196,19 @@ Methods:
    - Returns empty list for new sessions
 
 3. get_context_summary(session_id):
-   - Creates readable summary of recent conversation
-   - Uses last 3 exchanges (6 messages)
-   - Truncates long messages for clarity
+   - Returns the stored running summary (O(1), nothing is rebuilt per call)
+   - Turns evicted from the packed window are folded in by ExtractiveSummarizer,
+     which keeps the most informative sentence per turn and, over budget, drops
+     the least informative lines first so early facts survive
+   - With CONTEXT_SUMMARIZER=llm, an LLM rewrite refines it in the background
+
+4. get_packed_context(session_id):
+   - Returns the conversation context that goes into generation prompts
+   - Maintained incrementally by update_context within CONTEXT_TOKEN_BUDGET:
+     newest turns verbatim, older turns folded into the summary
+   - O(1) read; nothing is re-tokenized per request
 
-4. clear_context(session_id):
+5. clear_context(session_id):
    - Removes all context for specified session
    - Used for session cleanup or reset
 
@@ -128,6 +218,6 @@ context_manager.update_context("user123", "Hello", "Hi there!")
 recent_context = context_manager.get_context("user123")
 summary = context_manager.get_context_summary("user123")
 
-Note: This is an in-memory storage system. Context is lost when server restarts.
-For persistent storage, consider using ChromaDB or another database solution.
+Note: The default in-memory store loses context when the server restarts.
+Set SESSION_BACKEND=sqlite for persistent, multi-process context.
 """
\ No newline at end of file
@@ -0,0 +1,37 @@
+# backend/utils/deadline.py
+import time
+from typing import Optional
+
+class Deadline:
+    """End-to-end latency budget for one request, measured on the monotonic clock"""
+
+    def __init__(self, budget_seconds: Optional[float] = None):
+        # None means unbounded: remaining() is None and nothing times out
+        self.budget = budget_seconds
+        self.started = time.monotonic()
+        self.expires_at = self.started + budget_seconds if budget_seconds is not None else None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (never negative), or None when unbounded"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def slice(self, reserve: float = 0.0) -> Optional[float]:
+        """Time a stage may use: what is left after holding back reserve for later stages"""
+        remaining = self.remaining()
+        if remaining is None:
+            return None
+        return max(0.0, remaining - reserve)
+
+    def __repr__(self) -> str:
+        remaining = self.remaining()
+        left = "unbounded" if remaining is None else f"{remaining:.2f}s left"
+        return f"Deadline({left})"
@@ -1,81 +1,354 @@
 # backend/utils/gemini_handler.py
 import google.generativeai as genai
-from typing import Dict, List, Optional
+import asyncio
+import functools
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional
 from utils.rag_handler import RAGHandler
 from utils.query_decomposer import QueryDecomposer
 from utils.search_controller import SearchController
-from utils.response_generator import ResponseGenerator
+from utils.response_generator import FALLBACK_RESPONSE, ResponseGenerator
 from utils.context_manager import ContextManager
+from utils.session_store import create_session_store
+from utils.summarizer import LLMSummarizer
+from utils.pipeline import PipelineTrace
+from utils.semantic_cache import SemanticCache
+from utils.cache_store import SQLiteCacheStore
+from utils.llm_clients import LLMClientRegistry
+from utils.rate_limiter import PRIORITY_BACKGROUND, UpstreamScheduler
+from utils.tokens import estimate_tokens
+from utils.deadline import Deadline
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
 
 class GeminiHandler:
     def __init__(self, config):
         self.config = config
         genai.configure(api_key=config.GOOGLE_API_KEY)
         
+        # Shared connection pools and sync-SDK executors for every LLM backend
+        self.llm_clients = LLMClientRegistry(
+            max_connections=config.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=config.LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=config.LLM_KEEPALIVE_EXPIRY,
+            http2=config.LLM_HTTP2,
+            timeout=config.LLM_TIMEOUT,
+            executor_workers=config.LLM_EXECUTOR_WORKERS,
+            max_retries=0
+        )
+        # Per-provider rate/concurrency limits and retries shared by every upstream call
+        self.upstream = UpstreamScheduler(
+            limits=config.UPSTREAM_LIMITS,
+            max_retries=config.UPSTREAM_MAX_RETRIES,
+            base_delay=config.UPSTREAM_RETRY_BASE_DELAY,
+            max_delay=config.UPSTREAM_RETRY_MAX_DELAY
+        )
+        
         # Initialize components
-        self.query_decomposer = QueryDecomposer(config.GOOGLE_API_KEY)
-        self.search_controller = SearchController(config.SONAR_API_KEY)
-        self.response_generator = ResponseGenerator(config.GOOGLE_API_KEY)
+        self.decomposition_cache = SQLiteCacheStore(
+            config.DECOMPOSITION_CACHE_PATH,
+            ttl_seconds=config.DECOMPOSITION_CACHE_TTL,
+            max_entries=config.DECOMPOSITION_CACHE_MAX_ENTRIES,
+            table="decompositions"
+        ) if config.DECOMPOSITION_CACHE_PERSISTENT else None
+        self.query_decomposer = QueryDecomposer(
+            config.GOOGLE_API_KEY,
+            cache=self.decomposition_cache,
+            memory_size=config.DECOMPOSITION_MEMORY_SIZE,
+            clients=self.llm_clients,
+            scheduler=self.upstream
+        )
+        self.research_cache = SQLiteCacheStore(
+            config.RESEARCH_CACHE_PATH,
+            ttl_seconds=config.RESEARCH_CACHE_TTL,
+            max_entries=config.RESEARCH_CACHE_MAX_ENTRIES,
+            table="research"
+        ) if config.RESEARCH_CACHE_ENABLED else None
+        self.search_controller = SearchController(
+            config.SONAR_API_KEY,
+            cache=self.research_cache,
+            clients=self.llm_clients,
+            scheduler=self.upstream
+        )
+        self.response_generator = ResponseGenerator(
+            config.GOOGLE_API_KEY,
+            strategy=config.GENERATION_STRATEGY,
+            clients=self.llm_clients,
+            scheduler=self.upstream,
+            final_pass_reserve=config.FINAL_PASS_RESERVE_SECONDS
+        )
         self.rag_handler = None
-        self.context_manager = ContextManager()
+        self.semantic_cache = None
+        self.context_manager = ContextManager(
+            store=create_session_store(config),
+            token_budget=config.CONTEXT_TOKEN_BUDGET,
+            summary_share=config.CONTEXT_SUMMARY_SHARE,
+            llm_summarizer=(
+                LLMSummarizer(functools.partial(self.response_generator._complete, priority=PRIORITY_BACKGROUND))
+                if config.CONTEXT_SUMMARIZER == "llm" else None
+            )
+        )
         
         # Initialize chat sessions
         self.chat_sessions: Dict[str, any] = {}
+        
+        # Bounded pool for blocking Chroma lookups so they overlap with LLM calls
+        self.retrieval_executor = ThreadPoolExecutor(
+            max_workers=config.RETRIEVAL_EXECUTOR_WORKERS,
+            thread_name_prefix="retrieval"
+        )
+        self.recent_traces = deque(maxlen=100)
+        metrics.register_collector(self.metric_samples)
 
     def set_managers(self, db_manager):
-        """Set RAG handler"""
-        self.rag_handler = RAGHandler(db_manager)
+        """Set RAG handler and the semantic response cache"""
+        self.rag_handler = RAGHandler(
+            db_manager,
+            quotas=self.config.RETRIEVAL_QUOTAS,
+            max_distance=self.config.RETRIEVAL_MAX_DISTANCE,
+            max_results=self.config.RETRIEVAL_MAX_RESULTS,
+            hybrid=self.config.HYBRID_RETRIEVAL_ENABLED,
+            lexical_top_k=self.config.LEXICAL_TOP_K,
+            rrf_k=self.config.RRF_K
+        )
+        if self.config.SEMANTIC_CACHE_ENABLED:
+            # Shares the manager's query-embedding cache, so repeated questions skip the model
+            self.semantic_cache = SemanticCache(
+                db_manager.query_embeddings,
+                threshold=self.config.SEMANTIC_CACHE_THRESHOLD,
+                ttl_seconds=self.config.SEMANTIC_CACHE_TTL,
+                max_entries=self.config.SEMANTIC_CACHE_MAX_ENTRIES
+            )
 
-    async def get_response(self, user_id: str, message: str) -> str:
-        """Process user message and generate response"""
+    async def get_response(self, user_id: str, message: str, deadline: Optional[Deadline] = None) -> str:
+        """Process user message and generate response within the request's latency budget"""
+        trace = PipelineTrace()
+        deadline = deadline or Deadline(self.config.CHAT_LATENCY_BUDGET_SECONDS)
         try:
-            print(f"\n=== Processing Message for User: {user_id} ===")
-            print(f"Original Message: {message}")
-            
-            # Get session context
-            context = self.context_manager.get_context(user_id)
-            print(f"Retrieved context length: {len(context)}")
+            logger.debug("Processing message for user %s: %r", user_id, message)
             
-            # Step 1: Decompose query and check if research needed
-            decomposition_result = await self.query_decomposer.decompose_query(message)
-            needs_research = decomposition_result['needs_research']
-            sub_queries = decomposition_result['sub_queries']
-            
-            # Step 2: Get research results if needed (ONLY if Sonar API is configured)
-            research_results = {}
-            if needs_research and sub_queries and self.config.SONAR_API_KEY:
-                print("\n=== Conducting Research ===")
-                research_results = await self.search_controller.search_research(sub_queries)
-            elif needs_research and not self.config.SONAR_API_KEY:
-                print("\n=== Skipping Research (No SONAR_API_KEY configured) ===")
+            cached_response, cache_vector = await self._check_cache(trace, user_id, message)
+            if cached_response is not None:
+                self.context_manager.update_context(user_id, message, cached_response)
+                self._finish_trace(trace)
+                logger.debug("Served response from semantic cache")
+                return cached_response
             
-            # Step 3: Get RAG context
-            rag_context = ""
-            if self.rag_handler:
-                print("\n=== Getting RAG Context ===")
-                rag_context = self.rag_handler.get_relevant_context(message)
+            generation_inputs = await self._prepare(trace, user_id, message, deadline)
             
-            # Step 4: Generate comprehensive response
-            print("\n=== Generating Response ===")
-            response = await self.response_generator.generate_response(
-                original_query=message,
-                sub_queries=sub_queries,
-                research_results=research_results,
-                rag_context=rag_context
+            # Generate comprehensive response once every input is ready
+            response = await trace.run(
+                "generate",
+                self.response_generator.generate_response(**generation_inputs, deadline=deadline),
+                depends_on=["decompose", "research", "rag"]
             )
             
-            # Step 5: Update context
+            # Update context
             self.context_manager.update_context(user_id, message, response)
+            self._cache_response(message, response, generation_inputs, cache_vector)
             
-            print("\n=== Response Generation Complete ===")
+            self._finish_trace(trace)
             return response
             
         except Exception as e:
-            import traceback
-            print(f"Error in getting response: {str(e)}")
-            traceback.print_exc()
+            logger.exception("Error in getting response: %s", e)
             return self.config.DEFAULT_RESPONSE
 
+    async def get_response_stream(
+        self, user_id: str, message: str, deadline: Optional[Deadline] = None
+    ) -> AsyncIterator[str]:
+        """Process user message and stream the response as it is generated"""
+        trace = PipelineTrace()
+        deadline = deadline or Deadline(self.config.CHAT_LATENCY_BUDGET_SECONDS)
+        chunks = []
+        try:
+            logger.debug("Streaming message for user %s: %r", user_id, message)
+            
+            cached_response, cache_vector = await self._check_cache(trace, user_id, message)
+            if cached_response is not None:
+                chunks.append(cached_response)
+                yield cached_response
+            else:
+                generation_inputs = await self._prepare(trace, user_id, message, deadline)
+                
+                generate_start = trace.offset_ms()
+                stream = self.response_generator.generate_response_stream(**generation_inputs, deadline=deadline)
+                async for chunk in stream:
+                    if not chunks:
+                        trace.record("first_token", generate_start, depends_on=["decompose", "research", "rag"])
+                    chunks.append(chunk)
+                    yield chunk
+                trace.record("generate", generate_start, depends_on=["decompose", "research", "rag"])
+                self._cache_response(message, "".join(chunks), generation_inputs, cache_vector)
+            
+        except Exception as e:
+            logger.exception("Error in streaming response: %s", e)
+            if not chunks:
+                chunks.append(self.config.DEFAULT_RESPONSE)
+                yield self.config.DEFAULT_RESPONSE
+        
+        # Update context with the complete response
+        self.context_manager.update_context(user_id, message, "".join(chunks))
+        self._finish_trace(trace)
+
+    async def _check_cache(self, trace: PipelineTrace, user_id: str, message: str):
+        """Look the message up in the semantic cache; returns (answer, embedding to store under)"""
+        if not self.semantic_cache:
+            return None, None
+        
+        try:
+            conversation_context = self.context_manager.get_packed_context(user_id)
+            if not self.semantic_cache.is_cacheable(message, conversation_context):
+                return None, None
+            
+            # Embedding is CPU-bound, so keep it off the event loop
+            cached_response, cache_vector = await trace.run_blocking(
+                "cache_lookup",
+                self.retrieval_executor,
+                self.semantic_cache.lookup,
+                message
+            )
+            metrics.inc("cache_requests", cache="semantic", result="miss" if cached_response is None else "hit")
+            return cached_response, cache_vector
+        except Exception as e:
+            logger.error("Error checking semantic cache: %s", e)
+            return None, None
+
+    def _cache_response(self, message: str, response: str, generation_inputs: Dict, cache_vector):
+        """Store a freshly generated answer in the semantic cache"""
+        if cache_vector is None or not response or response in (FALLBACK_RESPONSE, self.config.DEFAULT_RESPONSE):
+            return
+        # Answers built on partial research or on this user's conversation shouldn't be replayed to others
+        if generation_inputs["missing_research"] or generation_inputs["conversation_context"]:
+            return
+        
+        # Decomposition + each research sub-query + one or two generation passes
+        passes = 2 if self.response_generator.uses_two_pass(generation_inputs["needs_research"]) else 1
+        upstream_calls = 1 + len(generation_inputs["research_results"]) + passes
+        self.semantic_cache.store(message, response, upstream_calls, vector=cache_vector)
+
+    async def _prepare(self, trace: PipelineTrace, user_id: str, message: str, deadline: Deadline) -> Dict:
+        """Run the pre-generation stages within the deadline and return the generator inputs"""
+        pending = []
+        try:
+            # Get the token-budgeted session context (maintained incrementally on update)
+            conversation_context = trace.run_sync("context", self.context_manager.get_packed_context, user_id)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Retrieved context tokens: %d", estimate_tokens(conversation_context))
+            
+            # Decomposition (LLM) and RAG retrieval (Chroma) are independent, so start both
+            decompose_task = asyncio.create_task(
+                trace.run("decompose", self.query_decomposer.decompose_query(message))
+            )
+            rag_task = asyncio.create_task(self._get_rag_context(trace, message))
+            pending = [decompose_task, rag_task]
+            
+            # Time after the generation reserve is what decomposition and research may spend
+            reserve = self.config.GENERATION_RESERVE_SECONDS
+            try:
+                decomposition_result = await asyncio.wait_for(decompose_task, deadline.slice(reserve))
+            except asyncio.TimeoutError:
+                logger.warning("Decomposition exceeded the latency budget; answering without research")
+                decomposition_result = {"needs_research": False, "sub_queries": []}
+            needs_research = decomposition_result['needs_research']
+            sub_queries = decomposition_result['sub_queries']
+            
+            # Research depends on decomposition; it overlaps with any RAG work still running
+            # (ONLY if Sonar API is configured)
+            research_results = {}
+            missing_research = []
+            if needs_research and sub_queries and self.config.SONAR_API_KEY:
+                research_timeout = deadline.slice(reserve)
+                logger.debug("Conducting research for %d sub-queries (%s)", len(sub_queries), deadline)
+                research_results = await trace.run(
+                    "research",
+                    self.search_controller.search_research(sub_queries, timeout=research_timeout),
+                    depends_on=["decompose"]
+                )
+                missing_research = [query for query in sub_queries if query not in research_results]
+            elif needs_research and not self.config.SONAR_API_KEY:
+                logger.debug("Skipping research (no SONAR_API_KEY configured)")
+            
+            try:
+                rag_context = await asyncio.wait_for(rag_task, deadline.slice(reserve))
+            except asyncio.TimeoutError:
+                logger.warning("RAG retrieval exceeded the latency budget; answering without local knowledge")
+                rag_context = ""
+            
+            return {
+                "original_query": message,
+                "sub_queries": sub_queries,
+                "research_results": research_results,
+                "rag_context": rag_context,
+                "needs_research": needs_research,
+                "conversation_context": conversation_context or None,
+                "missing_research": missing_research
+            }
+        finally:
+            for task in pending:
+                if not task.done():
+                    task.cancel()
+
+    async def _get_rag_context(self, trace: PipelineTrace, message: str) -> str:
+        """Fetch RAG context on the retrieval executor"""
+        if not self.rag_handler:
+            return ""
+        return await trace.run_blocking(
+            "rag",
+            self.retrieval_executor,
+            self.rag_handler.get_relevant_context,
+            message
+        )
+
+    def _finish_trace(self, trace: PipelineTrace):
+        """Keep the trace for stats and log the stage breakdown"""
+        summary = trace.summary()
+        self.recent_traces.append(summary)
+        logger.info(
+            "Pipeline finished in %.1f ms",
+            summary["total_ms"],
+            extra={"durations_ms": summary["durations_ms"], "critical_path": summary["critical_path"]}
+        )
+
+    def get_pipeline_stats(self) -> Dict:
+        """Average stage durations over recent requests"""
+        traces = list(self.recent_traces)
+        if not traces:
+            return {"requests": 0, "avg_ms": {}, "last": None}
+        
+        totals: Dict[str, List[float]] = {}
+        for summary in traces:
+            for name, duration in summary["durations_ms"].items():
+                totals.setdefault(name, []).append(duration)
+            totals.setdefault("total", []).append(summary["total_ms"])
+        
+        return {
+            "requests": len(traces),
+            "avg_ms": {name: round(sum(values) / len(values), 2) for name, values in totals.items()},
+            "last": traces[-1]
+        }
+
+    def metric_samples(self):
+        """Scrape-time gauges for queues, pools and caches owned by the handler"""
+        yield "research_in_flight", {}, self.search_controller.stats()["inflight"]
+        if self.semantic_cache:
+            yield "cache_entries", {"cache": "semantic"}, self.semantic_cache.stats()["entries"]
+        yield "cache_entries", {"cache": "decomposition_memory"}, self.query_decomposer.stats()["memory_entries"]
+        yield "summaries_pending", {}, self.context_manager.stats()["summaries"]["pending_llm"]
+        llm_stats = self.llm_clients.stats()
+        for provider, pool in llm_stats["pools"].items():
+            yield "llm_connections_active", {"provider": provider}, pool["active"]
+        for provider, executor in llm_stats["executors"].items():
+            yield "llm_executor_active", {"provider": provider}, executor["active"]
+        for provider, limiter in self.upstream.stats()["providers"].items():
+            yield "upstream_active", {"provider": provider}, limiter["active"]
+            yield "upstream_rate_per_second", {"provider": provider}, limiter["rate"]
+            for priority in ("interactive", "research", "background"):
+                yield "upstream_queue_depth", {"provider": provider, "priority": priority}, limiter["waiting"].get(priority, 0)
+
     def clear_context(self, user_id: str):
         """Clear context for a user"""
         self.context_manager.clear_context(user_id)
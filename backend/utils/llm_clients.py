@@ -0,0 +1,147 @@
+# backend/utils/llm_clients.py
+import asyncio
+import importlib.util
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import httpx
+from openai import AsyncOpenAI
+
+def provider_for(base_url: Optional[str]) -> str:
+    """Provider label for an OpenAI-compatible base URL"""
+    if not base_url:
+        return "openai"
+    if "groq" in base_url:
+        return "groq"
+    if "perplexity" in base_url:
+        return "sonar"
+    return httpx.URL(base_url).host
+
+class LLMClientRegistry:
+    """Shared, pooled LLM clients and per-provider executors for sync SDK calls"""
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True,
+        timeout: float = 60.0,
+        executor_workers: int = 8,
+        max_retries: int = 2
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        # HTTP/2 needs the optional h2 package (httpx[http2])
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        self.timeout = timeout
+        # SDK-level retries; 0 when an UpstreamScheduler owns retrying
+        self.max_retries = max_retries
+        self.executor_workers = executor_workers
+        self._clients: Dict[Tuple[Optional[str], str], Tuple[str, AsyncOpenAI, httpx.AsyncClient]] = {}
+        self._executors: Dict[str, ThreadPoolExecutor] = {}
+        self._lock = threading.Lock()
+        self._requests: Dict[str, int] = {}
+        self._executor_active: Dict[str, int] = {}
+        self._executor_submitted: Dict[str, int] = {}
+
+    def openai_client(self, api_key: str, base_url: Optional[str] = None) -> AsyncOpenAI:
+        """Shared AsyncOpenAI client for an endpoint/key pair"""
+        key = (base_url, api_key)
+        with self._lock:
+            if key not in self._clients:
+                provider = provider_for(base_url)
+                http_client = httpx.AsyncClient(
+                    limits=self.limits,
+                    http2=self.http2,
+                    timeout=self.timeout,
+                    event_hooks={"request": [self._request_hook(provider)]}
+                )
+                client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client, max_retries=self.max_retries)
+                self._clients[key] = (provider, client, http_client)
+            return self._clients[key][1]
+
+    def executor(self, provider: str) -> ThreadPoolExecutor:
+        """Bounded executor for a provider's blocking SDK calls"""
+        with self._lock:
+            if provider not in self._executors:
+                self._executors[provider] = ThreadPoolExecutor(
+                    max_workers=self.executor_workers,
+                    thread_name_prefix=f"llm-{provider}"
+                )
+                self._executor_active[provider] = 0
+                self._executor_submitted[provider] = 0
+            return self._executors[provider]
+
+    async def run_blocking(self, provider: str, func, *args):
+        """Run a blocking SDK call on the provider's executor, tracking utilization"""
+        executor = self.executor(provider)
+        with self._lock:
+            self._executor_submitted[provider] += 1
+
+        def tracked():
+            with self._lock:
+                self._executor_active[provider] += 1
+            try:
+                return func(*args)
+            finally:
+                with self._lock:
+                    self._executor_active[provider] -= 1
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, tracked)
+
+    def submit(self, provider: str, func, *args):
+        """Fire-and-forget a blocking call on the provider's executor"""
+        return self.executor(provider).submit(func, *args)
+
+    def _request_hook(self, provider: str):
+        async def on_request(request):
+            with self._lock:
+                self._requests[provider] = self._requests.get(provider, 0) + 1
+        return on_request
+
+    @staticmethod
+    def _pool_usage(http_client: httpx.AsyncClient) -> Dict:
+        """Open/idle connection counts from the client's connection pool"""
+        pool = getattr(getattr(http_client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        idle = sum(1 for conn in connections if getattr(conn, "is_idle", lambda: False)())
+        return {"open": len(connections), "idle": idle, "active": len(connections) - idle}
+
+    def stats(self) -> Dict:
+        """Pool and executor utilization per provider"""
+        with self._lock:
+            clients = list(self._clients.values())
+            executors = {
+                provider: {
+                    "workers": self.executor_workers,
+                    "active": self._executor_active[provider],
+                    "submitted": self._executor_submitted[provider]
+                }
+                for provider in self._executors
+            }
+            requests = dict(self._requests)
+
+        pools = {}
+        for provider, _, http_client in clients:
+            usage = self._pool_usage(http_client)
+            totals = pools.setdefault(provider, {"clients": 0, "open": 0, "idle": 0, "active": 0})
+            totals["clients"] += 1
+            for key in ("open", "idle", "active"):
+                totals[key] += usage[key]
+            totals["max_connections"] = self.limits.max_connections
+            totals["requests"] = requests.get(provider, 0)
+
+        return {"http2": self.http2, "pools": pools, "executors": executors}
+
+    def close(self):
+        """Shut down executors (HTTP clients close with the process)"""
+        with self._lock:
+            executors = list(self._executors.values())
+        for executor in executors:
+            executor.shutdown(wait=False)
@@ -0,0 +1,118 @@
+# backend/utils/logging_config.py
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from typing import Dict, Optional
+
+# Attributes every LogRecord has; anything else came in through extra= and is logged as a field
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional["NonBlockingQueueHandler"] = None
+_debug_sample_rate = 0.0
+
+def _extra_fields(record: logging.LogRecord) -> Dict:
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_FIELDS}
+
+class KeyValueFormatter(logging.Formatter):
+    """time level logger message key=value ..."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = _extra_fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value!r}" for key, value in fields.items())
+        return line
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line for log shippers"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **_extra_fields(record)
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to a bounded queue; drops (and counts) them when it is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener runs in this process, so the record can cross as-is and
+        # message formatting happens on the listener thread, not the request thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def configure_logging(
+    level: str = "INFO",
+    module_levels: Optional[Dict[str, str]] = None,
+    fmt: str = "text",
+    queue_size: int = 10000,
+    debug_sample_rate: float = 0.0
+):
+    """Route all logging through a queue drained by one background thread"""
+    global _listener, _handler, _debug_sample_rate
+    _debug_sample_rate = debug_sample_rate
+
+    root = logging.getLogger()
+    root.setLevel(level.upper())
+    for name, module_level in (module_levels or {}).items():
+        logging.getLogger(name).setLevel(module_level.upper())
+
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stderr)
+    stream.setFormatter(JsonFormatter() if fmt == "json" else KeyValueFormatter())
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    _handler = NonBlockingQueueHandler(log_queue)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    # Flush what is still queued on shutdown
+    atexit.register(_listener.stop)
+
+def parse_module_levels(spec: str) -> Dict[str, str]:
+    """'utils.rag_handler=DEBUG,chromadb=WARNING' -> {name: level}"""
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip()
+    return levels
+
+def sampled_debug(logger: logging.Logger, msg: str, *args, **kwargs):
+    """Debug event emitted for only a sample of calls (none unless a rate is configured)"""
+    if _debug_sample_rate > 0 and logger.isEnabledFor(logging.DEBUG) and random.random() < _debug_sample_rate:
+        logger.debug(msg, *args, **kwargs)
+
+def logging_stats() -> Dict:
+    return {
+        "queued": _handler.queue.qsize() if _handler else 0,
+        "dropped": _handler.dropped if _handler else 0,
+        "debug_sample_rate": _debug_sample_rate
+    }
@@ -0,0 +1,215 @@
+# backend/utils/metrics.py
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _label_key(labels: Dict) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float) and (math.isnan(value) or math.isinf(value)):
+        return "NaN" if math.isnan(value) else ("+Inf" if value > 0 else "-Inf")
+    return repr(round(value, 6)) if isinstance(value, float) else str(value)
+
+class _Summary:
+    """Count/sum plus a bounded window of recent samples for quantiles"""
+    __slots__ = ("count", "total", "samples")
+
+    def __init__(self, window: int):
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.samples.append(value)
+
+    def quantiles(self) -> Dict[float, float]:
+        # Sorting happens only at scrape time, keeping observe() O(1)
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {q: float("nan") for q in QUANTILES}
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in QUANTILES}
+
+class MetricsRegistry:
+    """In-process counters, gauges and latency summaries with a Prometheus text rendering"""
+
+    def __init__(self, enabled: bool = True, window: int = 2048, prefix: str = "healthbot"):
+        self.enabled = enabled
+        self.window = window
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._summaries: Dict[str, Dict[LabelKey, _Summary]] = {}
+        # Scrape-time collectors that turn component stats() into gauges
+        self._collectors: List[Callable[[], Iterable[Tuple[str, Dict, float]]]] = []
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Increment a counter"""
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def gauge_add(self, name: str, value: float, **labels):
+        """Move a gauge up or down"""
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._gauges.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record one latency (seconds) or size sample"""
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._summaries.setdefault(name, {})
+            summary = series.get(key)
+            if summary is None:
+                summary = series[key] = _Summary(self.window)
+            summary.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Observe the wall time of a block under name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    @contextmanager
+    def upstream(self, provider: str):
+        """Time an external API call and count its failures per provider"""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.inc("upstream_errors", provider=provider, error=type(e).__name__)
+            raise
+        finally:
+            self.observe("upstream_call_seconds", time.perf_counter() - start, provider=provider)
+
+    @contextmanager
+    def in_flight(self, name: str, **labels):
+        """Gauge of blocks currently executing"""
+        self.gauge_add(name, 1, **labels)
+        try:
+            yield
+        finally:
+            self.gauge_add(name, -1, **labels)
+
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, Dict, float]]]):
+        """Add a callable yielding (gauge name, labels, value) at scrape time"""
+        self._collectors.append(collector)
+
+    def _collected(self) -> Dict[str, Dict[LabelKey, float]]:
+        gauges: Dict[str, Dict[LabelKey, float]] = {}
+        for collector in self._collectors:
+            try:
+                for name, labels, value in collector():
+                    if value is not None:
+                        gauges.setdefault(name, {})[_label_key(labels)] = value
+            except Exception as e:
+                logger.error("Error collecting metrics: %s", e)
+        return gauges
+
+    def _read(self):
+        """Consistent copy of every series; quantiles are computed here"""
+        collected = self._collected()
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            gauges = {name: dict(series) for name, series in self._gauges.items()}
+            summaries = {
+                name: {key: (s.count, s.total, s.quantiles()) for key, s in series.items()}
+                for name, series in self._summaries.items()
+            }
+        for name, series in collected.items():
+            gauges.setdefault(name, {}).update(series)
+        return counters, gauges, summaries
+
+    def snapshot(self) -> Dict:
+        """JSON-friendly view of every series"""
+        counters, gauges, summaries = self._read()
+
+        def labelled(series):
+            return [{"labels": dict(key), "value": value} for key, value in series.items()]
+
+        return {
+            "counters": {name: labelled(series) for name, series in counters.items()},
+            "gauges": {name: labelled(series) for name, series in gauges.items()},
+            "summaries": {
+                name: [{
+                    "labels": dict(key),
+                    "count": count,
+                    "sum": round(total, 6),
+                    **{f"p{int(q * 100)}": round(value, 6) for q, value in quantiles.items()}
+                } for key, (count, total, quantiles) in series.items()]
+                for name, series in summaries.items()
+            }
+        }
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        counters, gauges, summaries = self._read()
+
+        lines = []
+
+        def header(name: str, kind: str):
+            lines.append(f"# TYPE {name} {kind}")
+
+        for base, series in sorted(counters.items()):
+            name = f"{self.prefix}_{base}_total"
+            header(name, "counter")
+            for key, value in series.items():
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+
+        for base, series in sorted(gauges.items()):
+            name = f"{self.prefix}_{base}"
+            header(name, "gauge")
+            for key, value in series.items():
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+
+        for base, series in sorted(summaries.items()):
+            name = f"{self.prefix}_{base}"
+            header(name, "summary")
+            for key, (count, total, quantiles) in series.items():
+                for q, value in quantiles.items():
+                    lines.append(f"{name}{_format_labels(key, ('quantile', str(q)))} {_format_value(value)}")
+                lines.append(f"{name}_sum{_format_labels(key)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(key)} {count}")
+
+        return "\n".join(lines) + "\n"
+
+# Process-wide registry used by the instrumented components
+metrics = MetricsRegistry()
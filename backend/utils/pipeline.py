@@ -0,0 +1,92 @@
+# backend/utils/pipeline.py
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from utils.metrics import metrics
+
+class PipelineTrace:
+    """Per-request record of pipeline stage timings and dependencies"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, Dict] = {}
+        self.total_ms: Optional[float] = None
+
+    def offset_ms(self) -> float:
+        """Milliseconds since the request started"""
+        return (time.perf_counter() - self.started) * 1000
+
+    def record(self, name: str, start_ms: float, depends_on: Optional[List[str]] = None):
+        """Record a stage that started at start_ms and ends now"""
+        end_ms = self.offset_ms()
+        self.stages[name] = {
+            "start_ms": round(start_ms, 2),
+            "end_ms": round(end_ms, 2),
+            "depends_on": depends_on or []
+        }
+        metrics.observe("chat_stage_seconds", (end_ms - start_ms) / 1000, stage=name)
+
+    async def run(self, name: str, coro, depends_on: Optional[List[str]] = None):
+        """Await a coroutine as a named stage"""
+        start_ms = self.offset_ms()
+        try:
+            return await coro
+        finally:
+            self.record(name, start_ms, depends_on)
+
+    async def run_blocking(self, name: str, executor, func, *args, depends_on: Optional[List[str]] = None):
+        """Run a blocking call on an executor as a named stage"""
+        start_ms = self.offset_ms()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, func, *args)
+        finally:
+            self.record(name, start_ms, depends_on)
+
+    def run_sync(self, name: str, func, *args, depends_on: Optional[List[str]] = None):
+        """Run a cheap synchronous call inline as a named stage"""
+        start_ms = self.offset_ms()
+        try:
+            return func(*args)
+        finally:
+            self.record(name, start_ms, depends_on)
+
+    def finish(self):
+        """Freeze end-to-end latency for the request"""
+        if self.total_ms is None:
+            self.total_ms = round(self.offset_ms(), 2)
+            metrics.observe("chat_request_seconds", self.total_ms / 1000)
+
+    def durations(self) -> Dict[str, float]:
+        """Stage name -> duration in milliseconds"""
+        return {
+            name: round(stage["end_ms"] - stage["start_ms"], 2)
+            for name, stage in self.stages.items()
+        }
+
+    def critical_path(self) -> List[str]:
+        """Chain of stages that determined end-to-end latency"""
+        if not self.stages:
+            return []
+
+        # Walk back from the last stage to finish through its latest-finishing dependency
+        current = max(self.stages, key=lambda name: self.stages[name]["end_ms"])
+        path = [current]
+        while True:
+            deps = [dep for dep in self.stages[current]["depends_on"] if dep in self.stages]
+            if not deps:
+                break
+            current = max(deps, key=lambda name: self.stages[name]["end_ms"])
+            path.append(current)
+        return list(reversed(path))
+
+    def summary(self) -> Dict:
+        """Serializable view of the trace"""
+        self.finish()
+        return {
+            "total_ms": self.total_ms,
+            "stages": self.stages,
+            "durations_ms": self.durations(),
+            "critical_path": self.critical_path()
+        }
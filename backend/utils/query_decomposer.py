@@ -1,15 +1,44 @@
 # backend/utils/query_decomposer.py
 import google.generativeai as genai
 from openai import AsyncOpenAI
+from collections import OrderedDict
 from typing import List, Dict
 import json
 import asyncio
+import functools
+import logging
+import re
+import threading
+
+from utils.metrics import metrics
+from utils.rate_limiter import run_upstream
+
+logger = logging.getLogger(__name__)
+
+# Greetings, thanks and small talk never need research
+SMALL_TALK_PATTERN = re.compile(
+    r"(hi|hello|hey|hiya|yo|good (morning|afternoon|evening|night)|thanks|thank you|thank you so much|"
+    r"thx|ty|ok|okay|k|cool|great|nice|awesome|got it|yes|no|yep|nope|sure|bye|goodbye|see you|"
+    r"how are you|how are you doing|what's up|whats up|sup|who are you|what can you do)( there| bot| again)?"
+)
+NO_RESEARCH = {"needs_research": False, "sub_queries": []}
 
 class QueryDecomposer:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, cache=None, memory_size: int = 512, clients=None, scheduler=None):
         self.api_key = api_key
+        self.clients = clients
+        self.scheduler = scheduler
+        # In-process LRU in front of an optional persistent tier (SQLiteCacheStore)
+        self.cache = cache
+        self.memory_size = memory_size
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"rule_based": 0, "memory_hits": 0, "persistent_hits": 0, "llm_calls": 0}
         if api_key and api_key.startswith("gsk_"):
-            self.client = AsyncOpenAI(api_key=api_key, base_url="https://api.groq.com/openai/v1")
+            if clients:
+                self.client = clients.openai_client(api_key, "https://api.groq.com/openai/v1")
+            else:
+                self.client = AsyncOpenAI(api_key=api_key, base_url="https://api.groq.com/openai/v1")
             self.model_name = "llama-3.3-70b-versatile"
             self.is_groq = True
         else:
@@ -24,9 +53,82 @@ class QueryDecomposer:
                 }
             )
             self.is_groq = False
+        self.model_label = self.model_name if self.is_groq else "gemini-1.5-flash"
         
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Lowercase, collapse whitespace and drop trailing punctuation"""
+        return re.sub(r"\s+", " ", query.lower()).strip().strip("?!.,~ ")
+
     async def decompose_query(self, query: str) -> Dict[str, List[str]]:
-        """Decompose main query into sub-queries and determine search necessity"""
+        """Decompose main query, answering from rules or cache before calling the LLM"""
+        normalized = self.normalize(query)
+        
+        # Rule-based pre-classifier: small talk and near-empty messages
+        if len(normalized) < 3 or SMALL_TALK_PATTERN.fullmatch(normalized):
+            self._count("rule_based")
+            logger.debug("Skipping decomposition (small talk): %r", query)
+            return self._copy(NO_RESEARCH)
+        
+        key = f"{self.model_label}\n{normalized}"
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                metrics.inc("decompositions", path="memory_hits")
+                return self._copy(self._memory[key])
+        
+        loop = asyncio.get_running_loop()
+        if self.cache:
+            # SQLite I/O stays off the shared event loop
+            cached = await loop.run_in_executor(None, self.cache.get, key)
+            if cached is not None:
+                self._count("persistent_hits")
+                self._remember(key, cached)
+                return self._copy(cached)
+        
+        try:
+            self._count("llm_calls")
+            result = await self._decompose_with_llm(query)
+        except Exception as e:
+            logger.error("Error decomposing query: %s", e)
+            return self._copy(NO_RESEARCH)
+        
+        self._remember(key, result)
+        if self.cache:
+            await loop.run_in_executor(None, self.cache.set, key, result)
+        return self._copy(result)
+
+    def stats(self) -> Dict:
+        """Per-path counters, including how many LLM calls were avoided"""
+        with self._lock:
+            stats = dict(self.counters)
+            stats["memory_entries"] = len(self._memory)
+        stats["llm_calls_avoided"] = stats["rule_based"] + stats["memory_hits"] + stats["persistent_hits"]
+        return stats
+
+    def _count(self, key: str):
+        with self._lock:
+            self.counters[key] += 1
+        metrics.inc("decompositions", path=key)
+
+    def _remember(self, key: str, result: Dict):
+        with self._lock:
+            self._memory[key] = result
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    @staticmethod
+    def _copy(result: Dict) -> Dict:
+        """Callers get their own copy so cached results can't be mutated"""
+        return {
+            "needs_research": bool(result.get("needs_research")),
+            "sub_queries": list(result.get("sub_queries") or [])
+        }
+
+    async def _decompose_with_llm(self, query: str) -> Dict[str, List[str]]:
+        """Ask the LLM to decompose the query; raises on failure"""
         prompt = f"""Analyze the following health-related query and:
 2. Decompose into 3-4 specific sub-queries if research is needed
 
@@ -46,11 +148,13 @@ Provide response in the following JSON format:
 If research is not needed, return empty sub_queries list.
 """
 
-        try:
-            print(f"\n=== Decomposing Query: {query} ===")
-            
+        logger.debug("Decomposing query: %r", query)
+        
+        provider = "groq" if self.is_groq else "gemini"
+        with metrics.upstream(provider):
             if self.is_groq:
-                response = await self.client.chat.completions.create(
+                response = await run_upstream(self.scheduler, provider, functools.partial(
+                    self.client.chat.completions.create,
                     model=self.model_name,
                     messages=[
                         {"role": "system", "content": "You are a health query analyzer. Respond ONLY with JSON."},
@@ -58,27 +162,21 @@ If research is not needed, return empty sub_queries list.
                     ],
                     temperature=0.3,
                     response_format={"type": "json_object"}
-                )
+                ))
                 text = response.choices[0].message.content
             else:
-                loop = asyncio.get_event_loop()
-                response = await loop.run_in_executor(None, lambda: self.model.generate_content(prompt))
+                if self.clients:
+                    call = functools.partial(self.clients.run_blocking, "gemini", self.model.generate_content, prompt)
+                else:
+                    call = functools.partial(asyncio.get_running_loop().run_in_executor, None, self.model.generate_content, prompt)
+                response = await run_upstream(self.scheduler, provider, call)
                 text = response.text
-            
-            # Parse JSON response
-            # Remove markdown code blocks if present
-            clean_text = text.replace('```json', '').replace('```', '').strip()
-            result = json.loads(clean_text)
-            
-            print(f"Needs Research: {result['needs_research']}")
-            if result.get('needs_research'):
-                print("Sub-queries:", result.get('sub_queries'))
-            
-            return result
-            
-        except Exception as e:
-            print(f"Error decomposing query: {str(e)}")
-            return {
-                "needs_research": False,
-                "sub_queries": []
-            }
\ No newline at end of file
+        
+        # Parse JSON response
+        # Remove markdown code blocks if present
+        clean_text = text.replace('```json', '').replace('```', '').strip()
+        result = json.loads(clean_text)
+        
+        logger.debug("Needs research: %s, sub-queries: %s", result.get('needs_research'), result.get('sub_queries'))
+        
+        return result
@@ -1,9 +1,102 @@
 # backend/utils/rag_handler.py
 from typing import Dict, List, Optional
+import logging
+from database.retrieval import RetrievalResult, RetrievedDocument, reciprocal_rank_fusion
+from utils.logging_config import sampled_debug
+
+logger = logging.getLogger(__name__)
+
+class _DocumentDump:
+    """Renders retrieved documents only if the log record is actually emitted"""
+    __slots__ = ("documents",)
+
+    def __init__(self, documents: List[RetrievedDocument]):
+        self.documents = documents
+
+    def __str__(self) -> str:
+        return "\n".join(
+            f"- [{doc.source} {f'{doc.distance:.3f}' if doc.distance is not None else 'lexical'}] {doc.document}"
+            for doc in self.documents
+        )
 
 class RAGHandler:
-    def __init__(self, db_manager):
+    def __init__(
+        self,
+        db_manager,
+        quotas: Optional[Dict[str, int]] = None,
+        max_distance: Optional[float] = None,
+        max_results: Optional[int] = None,
+        hybrid: bool = True,
+        lexical_top_k: int = 10,
+        rrf_k: int = 60
+    ):
         self.db_manager = db_manager
+        # Per-source hit quotas, relevance cutoff and overall cap for the merged ranking
+        self.quotas = quotas
+        self.max_distance = max_distance
+        self.max_results = max_results
+        # Hybrid mode fuses BM25 hits with the vector hits by reciprocal rank fusion
+        self.hybrid = hybrid
+        self.lexical_top_k = lexical_top_k
+        self.rrf_k = rrf_k
+    
+    def retrieve(self, query: str, user_profile: Optional[Dict] = None) -> RetrievalResult:
+        """Ranked knowledge-base hits for a query"""
+        if not self.hybrid:
+            return self.db_manager.retrieve(
+                query,
+                user_profile=user_profile,
+                quotas=self.quotas,
+                max_distance=self.max_distance,
+                max_results=self.max_results
+            )
+        
+        vector_result = self.db_manager.retrieve(
+            query,
+            user_profile=user_profile,
+            quotas=self.quotas,
+            max_distance=self.max_distance
+        )
+        lexical_hits = self.db_manager.lexical_search(
+            vector_result.query,
+            limit=self.lexical_top_k,
+            sources=list(self.quotas) if self.quotas else None
+        )
+        if self.max_distance is not None:
+            # One shared term is enough for a BM25 match, so lexical-only hits must also
+            # pass the vector cutoff before they can be fused into the prompt context
+            vector_keys = {(doc.source, doc.doc_id) for doc in vector_result.documents}
+            lexical_only = [doc for doc in lexical_hits if (doc.source, doc.doc_id) not in vector_keys]
+            self.db_manager.attach_distances(vector_result.query, lexical_only)
+            lexical_hits = [
+                doc for doc in lexical_hits
+                if (doc.source, doc.doc_id) in vector_keys
+                or (doc.distance is not None and doc.distance <= self.max_distance)
+            ]
+        fused = reciprocal_rank_fusion([vector_result.documents, lexical_hits], k=self.rrf_k)
+        
+        # Re-apply per-source quotas and the overall cap to the fused ranking
+        taken: Dict[str, int] = {}
+        documents = []
+        for doc in fused:
+            quota = self.quotas.get(doc.source, 0) if self.quotas else None
+            if quota is not None and taken.get(doc.source, 0) >= quota:
+                continue
+            taken[doc.source] = taken.get(doc.source, 0) + 1
+            documents.append(doc)
+            if self.max_results is not None and len(documents) >= self.max_results:
+                break
+        
+        return RetrievalResult(query=vector_result.query, documents=documents, filtered=vector_result.filtered)
+    
+    @staticmethod
+    def format_document(doc: RetrievedDocument) -> str:
+        """Prompt line for one hit"""
+        if doc.source == "products":
+            return f"Product: {doc.metadata.get('name', 'Unknown')} - {doc.document}"
+        if doc.source == "faqs":
+            return f"FAQ: {doc.document}"
+        return f"Health Tip: {doc.document}"
     
     def get_relevant_context(
         self, 
@@ -12,45 +105,16 @@ class RAGHandler:
     ) -> str:
         """Get relevant context from database"""
         try:
-            print("\n=== RAG Debug: Starting Context Retrieval ===")
-            print(f"User Query: {query}")
-            
-            # Get relevant content using user profile
-            relevant_content = self.db_manager.get_relevant_content(
-                query=query,
-                user_profile=user_profile
-            )
-            
-            # Extract health tips and products
-            health_tips = relevant_content['health_tips']
-            products = relevant_content['products']
-            
-            print("\nRetrieved Health Tips:")
-            for tip in health_tips['documents']:
-                print(f"- {tip}")
+            # One embedding, all knowledge sources, merged closest-first
+            result = self.retrieve(query, user_profile)
             
-            print("\nRetrieved Products:")
-            for doc, meta in zip(products['documents'], products['metadatas']):
-                print(f"- {meta.get('name', 'Unknown')}: {doc}")
+            logger.debug("Retrieved %d documents (filtered by cutoff: %s)", len(result.documents), result.filtered)
             
             # Combine context
             context_parts = []
             
-            # Add health tips to context
-            if health_tips['documents']:
-                tips_context = "\n".join([
-                    f"Health Tip: {tip}" 
-                    for tip in health_tips['documents']
-                ])
-                context_parts.append(tips_context)
-            
-            # Add products to context
-            if products['documents']:
-                products_context = "\n".join([
-                    f"Product: {meta.get('name', 'Unknown')} - {doc}"
-                    for doc, meta in zip(products['documents'], products['metadatas'])
-                ])
-                context_parts.append(products_context)
+            if result.documents:
+                context_parts.append("\n".join(self.format_document(doc) for doc in result.documents))
             
             # Add user context if available
             if user_profile and user_profile.get('summary'):
@@ -58,16 +122,20 @@ class RAGHandler:
             
             final_context = "\n\n".join(context_parts)
             
-            print("\nFinal Combined Context:")
-            print(final_context)
-            print("\n=== RAG Debug: Context Retrieval Complete ===")
+            # Full per-document and context dumps are sampled, and off unless configured
+            sampled_debug(
+                logger,
+                "RAG context for %r:\n%s\n--- combined ---\n%s",
+                query,
+                _DocumentDump(result.documents),
+                final_context
+            )
             
             return final_context
             
         except Exception as e:
-            print(f"\nError getting context: {str(e)}")
+            logger.error("Error getting context: %s", e)
             return ""
-        
 
 
 """
@@ -79,10 +147,16 @@ information, and user history to provide context-aware responses.
 
 Key Features:
 1. Context Retrieval:
-   - Fetches relevant health tips
-   - Retrieves related products
+   - Embeds the query once and searches health tips, FAQs and products
+     concurrently (ChromaDBManager.retrieve)
+   - Merges hits by distance with per-source quotas (RETRIEVAL_QUOTAS)
+   - Drops hits beyond the relevance cutoff (RETRIEVAL_MAX_DISTANCE) so
+     unrelated documents never reach the prompt
+   - Hybrid mode (HYBRID_RETRIEVAL_ENABLED) also runs a BM25 search over the
+     same documents and fuses both rankings by reciprocal rank fusion, so
+     exact terms (drug names, dosages) are not blurred by the embedding;
+     lexical-only hits must still pass the same distance cutoff
    - Incorporates user history
-   - Combines multiple context sources
 
 2. User Profile Integration:
    - Uses user profile for context enhancement
@@ -95,27 +169,31 @@ Context Components:
    - Category-specific information
    - General wellness guidelines
 
-2. Products:
+2. FAQs:
+   - Question/answer pairs from the FAQ collection
+
+3. Products:
    - Related product information
    - Product descriptions
    - Pricing and categories
 
-3. User History:
+4. User History:
    - Previous interactions
    - User preferences
    - Historical context
 
 Output Format:
-- Structured text combining:
-  * Health tips
+- retrieve() returns a typed RetrievalResult (RetrievedDocument hits, closest first)
+- get_relevant_context() renders it as structured text combining:
+  * Health tips and FAQs
   * Product information
   * User history
 - Formatted for LLM consumption
 - Debug information for monitoring
 
 Debug Features:
-- Detailed logging of retrieval process
-- Context composition tracking
+- Retrieval counts logged at DEBUG
+- Full document/context dumps as sampled DEBUG events (LOG_DEBUG_SAMPLE_RATE, off by default)
 - Error reporting and handling
 
 Usage Example:
@@ -127,7 +205,7 @@ context = rag_handler.get_relevant_context(
 
 Error Handling:
 - Returns empty string on errors
-- Logs all retrieval steps
+- Logs errors through the module logger
 - Maintains system stability
 
 Note: This component is essential for providing relevant context
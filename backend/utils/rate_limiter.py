@@ -0,0 +1,266 @@
+# backend/utils/rate_limiter.py
+import asyncio
+import contextlib
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from utils.deadline import Deadline
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Lower value = served first when callers queue for the same provider
+PRIORITY_INTERACTIVE = 0  # Decomposition and user-facing generation
+PRIORITY_RESEARCH = 1  # Optional research sub-queries
+PRIORITY_BACKGROUND = 2  # Work nobody is waiting on (summary refinement)
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_RESEARCH: "research", PRIORITY_BACKGROUND: "background"}
+
+DEFAULT_LIMITS = {"rate": 5.0, "burst": 10, "concurrency": 16}
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    # openai.APIStatusError has status_code; google.api_core exceptions have code
+    for attr in ("status_code", "code"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return int(value)
+    return None
+
+def is_rate_limited(exc: BaseException) -> bool:
+    return _status_code(exc) == 429 or type(exc).__name__ in ("RateLimitError", "ResourceExhausted", "TooManyRequests")
+
+def is_retryable(exc: BaseException) -> bool:
+    """Throttling, timeouts, dropped connections and 5xx are worth another attempt"""
+    if is_rate_limited(exc) or isinstance(exc, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = _status_code(exc)
+    if status is not None:
+        return status >= 500
+    return type(exc).__name__ in ("APIConnectionError", "APITimeoutError", "ServiceUnavailable", "DeadlineExceeded")
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Seconds from a Retry-After header, if the error carries one"""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+class ProviderLimiter:
+    """Token bucket plus concurrency cap for one provider, granting waiters in priority order"""
+
+    def __init__(self, name: str, rate: float, burst: int, concurrency: int, min_rate: Optional[float] = None):
+        self.name = name
+        self.max_rate = rate
+        self.min_rate = min_rate if min_rate is not None else rate / 20
+        # Current rate: halved on 429, recovers additively on success (AIMD)
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self.tokens = float(burst)
+        self.active = 0
+        self.paused_until = 0.0
+        self._refilled = time.monotonic()
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        # Heap of [priority, seq, future]; only the head may take a slot
+        self._waiting: List[list] = []
+        self.counters = {"granted": 0, "throttled": 0}
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def _try_grant(self, entry: list) -> Optional[float]:
+        """0 when entry got a slot; else seconds until a token frees up (None: wait for a release)"""
+        if not self._waiting or self._waiting[0] is not entry or self.active >= self.concurrency:
+            return None
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        if self.tokens < 1:
+            return (1 - self.tokens) / self.rate
+        self.tokens -= 1
+        self.active += 1
+        self.counters["granted"] += 1
+        heapq.heappop(self._waiting)
+        self._wake_head()
+        return 0.0
+
+    def _wake_head(self):
+        if self._waiting:
+            future = self._waiting[0][2]
+            if not future.done():
+                future.get_loop().call_soon_threadsafe(_resolve, future)
+
+    async def acquire(self, priority: int = PRIORITY_INTERACTIVE):
+        loop = asyncio.get_running_loop()
+        entry = [priority, next(self._seq), loop.create_future()]
+        with self._lock:
+            heapq.heappush(self._waiting, entry)
+        try:
+            while True:
+                with self._lock:
+                    wait = self._try_grant(entry)
+                    if wait == 0.0:
+                        return
+                    if entry[2].done():
+                        entry[2] = loop.create_future()
+                    future = entry[2]
+                try:
+                    await asyncio.wait_for(asyncio.shield(future), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            with self._lock:
+                if entry in self._waiting:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                    self._wake_head()
+            raise
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+            self._wake_head()
+
+    def on_success(self):
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+    def on_rate_limited(self, delay: Optional[float]):
+        """Multiplicative decrease, and hold all callers off until Retry-After passes"""
+        with self._lock:
+            self.counters["throttled"] += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+            if delay:
+                self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        logger.warning("%s rate limited; request rate lowered to %.2f/s", self.name, self.rate)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            waiting: Dict[str, int] = {}
+            for priority, _, _ in self._waiting:
+                label = PRIORITY_NAMES.get(priority, str(priority))
+                waiting[label] = waiting.get(label, 0) + 1
+            return {
+                "rate": round(self.rate, 3),
+                "max_rate": self.max_rate,
+                "active": self.active,
+                "concurrency": self.concurrency,
+                "waiting": waiting,
+                **self.counters
+            }
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+class UpstreamScheduler:
+    """Shared per-provider limiters with jittered retries for every LLM and search call"""
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Dict]] = None,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0
+    ):
+        self.limits = limits or {}
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._limiters: Dict[str, ProviderLimiter] = {}
+        self._lock = threading.Lock()
+        self.retries = 0
+
+    def limiter(self, provider: str) -> ProviderLimiter:
+        with self._lock:
+            if provider not in self._limiters:
+                limits = dict(DEFAULT_LIMITS, **self.limits.get(provider, {}))
+                self._limiters[provider] = ProviderLimiter(
+                    provider, limits["rate"], limits["burst"], limits["concurrency"], limits.get("min_rate")
+                )
+            return self._limiters[provider]
+
+    @contextlib.asynccontextmanager
+    async def slot(self, provider: str, priority: int = PRIORITY_INTERACTIVE):
+        """Hold one rate-limited slot for the block (e.g. a whole streamed completion)"""
+        limiter = self.limiter(provider)
+        await limiter.acquire(priority)
+        try:
+            yield
+        except Exception as e:
+            if is_rate_limited(e):
+                limiter.on_rate_limited(retry_after(e))
+            raise
+        else:
+            limiter.on_success()
+        finally:
+            limiter.release()
+
+    async def _attempt(self, provider: str, make_call: Callable[[], Awaitable], priority: int):
+        async with self.slot(provider, priority):
+            return await make_call()
+
+    async def call(
+        self,
+        provider: str,
+        make_call: Callable[[], Awaitable],
+        priority: int = PRIORITY_INTERACTIVE,
+        deadline: Optional[Deadline] = None
+    ):
+        """Await make_call() under the provider's limits, retrying transient failures with full jitter"""
+        attempt = 0
+        while True:
+            try:
+                # Queueing for a slot and the call itself both spend the caller's deadline
+                return await asyncio.wait_for(
+                    self._attempt(provider, make_call, priority),
+                    deadline.remaining() if deadline else None
+                )
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                delay = max(delay, retry_after(e) or 0.0)
+                remaining = deadline.remaining() if deadline else None
+                if remaining is not None and delay >= remaining:
+                    # No time left for another attempt
+                    raise
+                attempt += 1
+                self.retries += 1
+                metrics.inc("upstream_retries", provider=provider)
+                logger.info("Retrying %s call in %.2fs (attempt %d): %s", provider, delay, attempt, e)
+                await asyncio.sleep(delay)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {
+            "retries": self.retries,
+            "providers": {name: limiter.stats() for name, limiter in limiters.items()}
+        }
+
+async def run_upstream(scheduler: Optional[UpstreamScheduler], provider: str, make_call: Callable[[], Awaitable],
+                       priority: int = PRIORITY_INTERACTIVE, deadline: Optional[Deadline] = None):
+    """scheduler.call when a scheduler is configured, else a direct call (both bounded by the deadline)"""
+    if scheduler is None:
+        return await asyncio.wait_for(make_call(), deadline.remaining() if deadline else None)
+    return await scheduler.call(provider, make_call, priority, deadline)
+
+def upstream_slot(scheduler: Optional[UpstreamScheduler], provider: str, priority: int = PRIORITY_INTERACTIVE):
+    """scheduler.slot when a scheduler is configured, else a no-op context"""
+    if scheduler is None:
+        return contextlib.nullcontext()
+    return scheduler.slot(provider, priority)
@@ -1,14 +1,40 @@
 # backend/utils/response_generator.py
 import google.generativeai as genai
 from openai import AsyncOpenAI
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, List, Optional
 import asyncio
+import functools
+import logging
+import threading
+
+from utils.deadline import Deadline
+from utils.metrics import metrics
+from utils.rate_limiter import PRIORITY_INTERACTIVE, run_upstream, upstream_slot
+
+logger = logging.getLogger(__name__)
+
+GENERATION_STRATEGIES = ("two_pass", "single_pass", "adaptive")
+
+FALLBACK_RESPONSE = """I apologize, but I'm having trouble generating a response right now. 
+For your safety and best advice, please consider consulting with a healthcare professional."""
 
 class ResponseGenerator:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, strategy: str = "two_pass", clients=None, scheduler=None,
+                 final_pass_reserve: float = 0.0):
         self.api_key = api_key
+        self.clients = clients
+        # Optional UpstreamScheduler shared with the decomposer and research controller
+        self.scheduler = scheduler
+        if strategy not in GENERATION_STRATEGIES:
+            raise ValueError(f"Unknown generation strategy: {strategy}")
+        self.strategy = strategy
+        # Seconds of the deadline the reasoning pass must leave for the final pass
+        self.final_pass_reserve = final_pass_reserve
         if api_key and api_key.startswith("gsk_"):
-            self.client = AsyncOpenAI(api_key=api_key, base_url="https://api.groq.com/openai/v1")
+            if clients:
+                self.client = clients.openai_client(api_key, "https://api.groq.com/openai/v1")
+            else:
+                self.client = AsyncOpenAI(api_key=api_key, base_url="https://api.groq.com/openai/v1")
             self.model_name = "llama-3.3-70b-versatile"
             self.is_groq = True
         else:
@@ -30,35 +56,179 @@ class ResponseGenerator:
         sub_queries: List[str], 
         research_results: Dict[str, str],
         rag_context: Optional[str] = None,
-        user_profile: Optional[Dict] = None
+        user_profile: Optional[Dict] = None,
+        needs_research: bool = False,
+        conversation_context: Optional[str] = None,
+        missing_research: Optional[List[str]] = None,
+        deadline: Optional[Deadline] = None
     ) -> str:
-        """Generate natural, contextual response using Chain of Thought"""
+        """Generate natural, contextual response using the configured strategy, within the deadline"""
         try:
-            print("\n=== Generating Response ===")
+            context = self._build_context(
+                research_results, rag_context, user_profile, conversation_context, missing_research
+            )
             
-            # Prepare context information
-            context_parts = []
+            if self.uses_two_pass(needs_research) and self._fits_two_pass(deadline):
+                final_text = await self._generate_two_pass(original_query, context, deadline)
+            else:
+                final_text = await self._generate_single_pass(original_query, context, deadline)
             
-            # Add RAG context if available
-            if rag_context:
-                context_parts.append(f"Local Knowledge:\n{rag_context}")
+            logger.debug("Response generated (%d chars)", len(final_text))
+            return final_text
             
-            # Add user profile context if available
-            if user_profile and user_profile.get('summary'):
-                context_parts.append(f"User Context:\n{user_profile['summary']}")
+        except Exception as e:
+            logger.error("Error generating response: %s", e)
+            return FALLBACK_RESPONSE
+
+    async def generate_response_stream(
+        self, 
+        original_query: str, 
+        sub_queries: List[str], 
+        research_results: Dict[str, str],
+        rag_context: Optional[str] = None,
+        user_profile: Optional[Dict] = None,
+        needs_research: bool = False,
+        conversation_context: Optional[str] = None,
+        missing_research: Optional[List[str]] = None,
+        deadline: Optional[Deadline] = None
+    ) -> AsyncIterator[str]:
+        """Streaming variant of generate_response; the deadline bounds the time to the first chunk"""
+        emitted = False
+        try:
+            context = self._build_context(
+                research_results, rag_context, user_profile, conversation_context, missing_research
+            )
             
-            # Add research findings
-            if research_results:
-                research_summary = "\n".join([
-                    f"Research on {query}:\n{results}"
-                    for query, results in research_results.items()
-                ])
-                context_parts.append(f"Research Findings:\n{research_summary}")
+            reasoning_text = None
+            if self.uses_two_pass(needs_research) and self._fits_two_pass(deadline):
+                # The reasoning pass is hidden from the user, so only the final pass streams
+                reasoning_text = await self._reason(original_query, context, deadline)
+            if reasoning_text is not None:
+                system_prompt = "You are a health advisor. Provide a natural response."
+                prompt = self._final_prompt(original_query, reasoning_text)
+                generation_pass = "final"
+            else:
+                system_prompt = "You are a health advisor. Reason carefully but reply with the final answer only."
+                prompt = self._single_pass_prompt(original_query, context)
+                generation_pass = "single"
             
-            # Combine all context
-            context = "\n\n".join(context_parts)
+            with metrics.timer("generation_pass_seconds", generation_pass=generation_pass):
+                stream = self._stream(system_prompt, prompt)
+                # An answer that has started streaming is allowed to finish
+                try:
+                    first_chunk = await asyncio.wait_for(
+                        stream.__anext__(), deadline.remaining() if deadline else None
+                    )
+                except StopAsyncIteration:
+                    return
+                emitted = True
+                yield first_chunk
+                async for chunk in stream:
+                    yield chunk
             
-            prompt = f"""As a health advisor, use Chain of Thought reasoning to provide a helpful response.
+        except Exception as e:
+            logger.error("Error streaming response: %s", e)
+            if not emitted:
+                yield FALLBACK_RESPONSE
+
+    def uses_two_pass(self, needs_research: bool) -> bool:
+        """Whether a message gets the separate reasoning pass under the current strategy"""
+        # Adaptive: only pay for the separate reasoning pass on research questions
+        return self.strategy == "two_pass" or (self.strategy == "adaptive" and needs_research)
+
+    def _fits_two_pass(self, deadline: Optional[Deadline]) -> bool:
+        """Whether the reasoning pass can get at least as much time as it must leave for the final pass"""
+        if deadline is None or deadline.remaining() is None:
+            return True
+        if deadline.slice(self.final_pass_reserve) >= self.final_pass_reserve:
+            return True
+        # Too little budget for two calls: one single-pass call beats a draft the final pass can't finish
+        metrics.inc("generation_downgrades", reason="deadline")
+        logger.debug("Falling back to single-pass generation: %s", deadline)
+        return False
+
+    def _reasoning_deadline(self, deadline: Optional[Deadline]) -> Optional[Deadline]:
+        """Sub-deadline for the reasoning pass that holds final_pass_reserve back for the final pass"""
+        if deadline is None or deadline.remaining() is None:
+            return deadline
+        return Deadline(deadline.slice(self.final_pass_reserve))
+
+    def _build_context(
+        self,
+        research_results: Dict[str, str],
+        rag_context: Optional[str] = None,
+        user_profile: Optional[Dict] = None,
+        conversation_context: Optional[str] = None,
+        missing_research: Optional[List[str]] = None
+    ) -> str:
+        """Combine conversation, RAG, user and research context for the prompt"""
+        context_parts = []
+        
+        # Add the packed conversation so follow-up questions resolve
+        if conversation_context:
+            context_parts.append(f"Conversation So Far:\n{conversation_context}")
+        
+        # Add RAG context if available
+        if rag_context:
+            context_parts.append(f"Local Knowledge:\n{rag_context}")
+        
+        # Add user profile context if available
+        if user_profile and user_profile.get('summary'):
+            context_parts.append(f"User Context:\n{user_profile['summary']}")
+        
+        # Add research findings
+        if research_results:
+            research_summary = "\n".join([
+                f"Research on {query}:\n{results}"
+                for query, results in research_results.items()
+            ])
+            context_parts.append(f"Research Findings:\n{research_summary}")
+        
+        # Sub-queries that failed or ran out of time, so the answer doesn't imply they were checked
+        if missing_research:
+            missing = "\n".join(f"- {query}" for query in missing_research)
+            context_parts.append(
+                "Research Not Available (timed out or failed; do not claim findings on these, "
+                f"and note the gap if it matters to the answer):\n{missing}"
+            )
+        
+        return "\n\n".join(context_parts)
+
+    @property
+    def provider(self) -> str:
+        return "groq" if self.is_groq else "gemini"
+
+    async def _complete(
+        self,
+        system_prompt: str,
+        prompt: str,
+        priority: int = PRIORITY_INTERACTIVE,
+        deadline: Optional[Deadline] = None
+    ) -> str:
+        """Run one completion against the configured backend, giving up when the deadline passes"""
+        with metrics.upstream(self.provider):
+            if self.is_groq:
+                response = await run_upstream(self.scheduler, self.provider, functools.partial(
+                    self.client.chat.completions.create,
+                    model=self.model_name,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.7
+                ), priority, deadline)
+                return response.choices[0].message.content
+            
+            if self.clients:
+                call = functools.partial(self.clients.run_blocking, "gemini", self.model.generate_content, prompt)
+            else:
+                call = functools.partial(asyncio.get_running_loop().run_in_executor, None, self.model.generate_content, prompt)
+            response = await run_upstream(self.scheduler, self.provider, call, priority, deadline)
+            return response.text
+
+    def _reasoning_prompt(self, original_query: str, context: str) -> str:
+        """First-pass Chain of Thought prompt"""
+        return f"""As a health advisor, use Chain of Thought reasoning to provide a helpful response.
 
 User Query: {original_query}
 
@@ -99,25 +269,87 @@ Now, think through your response step by step, then provide a natural, focused a
 
 Reasoning:"""
 
-            print(f"Getting CoT response from {'Groq' if self.is_groq else 'Gemini'}...")
-            
+    async def _stream(self, system_prompt: str, prompt: str) -> AsyncIterator[str]:
+        """Stream one completion from the configured backend"""
+        # The slot is held for the whole stream, so concurrency caps count open streams
+        async with upstream_slot(self.scheduler, self.provider):
             if self.is_groq:
-                reasoning_response = await self.client.chat.completions.create(
-                    model=self.model_name,
-                    messages=[
-                        {"role": "system", "content": "You are a health advisor using Chain of Thought reasoning."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.7
-                )
-                reasoning_text = reasoning_response.choices[0].message.content
+                with metrics.upstream(self.provider):
+                    stream = await self.client.chat.completions.create(
+                        model=self.model_name,
+                        messages=[
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": prompt}
+                        ],
+                        temperature=0.7,
+                        stream=True
+                    )
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+                return
+        
+            # The Gemini SDK streams synchronously; pump its chunks from a thread
+            loop = asyncio.get_running_loop()
+            chunks: asyncio.Queue = asyncio.Queue()
+            done = object()
+        
+            def pump():
+                try:
+                    for chunk in self.model.generate_content(prompt, stream=True):
+                        if chunk.text:
+                            loop.call_soon_threadsafe(chunks.put_nowait, chunk.text)
+                    loop.call_soon_threadsafe(chunks.put_nowait, done)
+                except Exception as e:
+                    loop.call_soon_threadsafe(chunks.put_nowait, e)
+        
+            if self.clients:
+                self.clients.submit("gemini", pump)
             else:
-                loop = asyncio.get_event_loop()
-                reasoning_response = await loop.run_in_executor(None, lambda: self.model.generate_content(prompt))
-                reasoning_text = reasoning_response.text
-            
-            # Generate final response without the reasoning
-            final_prompt = f"""Based on this reasoning:
+                threading.Thread(target=pump, name="gemini-stream", daemon=True).start()
+            while True:
+                item = await chunks.get()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    metrics.inc("upstream_errors", provider=self.provider, error=type(item).__name__)
+                    raise item
+                yield item
+
+    async def _reason(self, original_query: str, context: str, deadline: Optional[Deadline]) -> Optional[str]:
+        """Chain of Thought pass capped to leave final_pass_reserve; None when it ran out of time"""
+        logger.debug("Getting CoT response from %s", self.provider)
+        try:
+            with metrics.timer("generation_pass_seconds", generation_pass="reasoning"):
+                return await self._complete(
+                    "You are a health advisor using Chain of Thought reasoning.",
+                    self._reasoning_prompt(original_query, context),
+                    deadline=self._reasoning_deadline(deadline)
+                )
+        except asyncio.TimeoutError:
+            # The reserve is still unspent, so answer in one pass rather than not at all
+            metrics.inc("generation_downgrades", reason="reasoning_timeout")
+            logger.debug("Reasoning pass timed out; answering in a single pass: %s", deadline)
+            return None
+
+    async def _generate_two_pass(self, original_query: str, context: str, deadline: Optional[Deadline] = None) -> str:
+        """Chain of Thought reasoning call followed by a separate final-answer call"""
+        reasoning_text = await self._reason(original_query, context, deadline)
+        if reasoning_text is None:
+            return await self._generate_single_pass(original_query, context, deadline)
+        
+        # Generate final response without the reasoning
+        final_prompt = self._final_prompt(original_query, reasoning_text)
+        with metrics.timer("generation_pass_seconds", generation_pass="final"):
+            return await self._complete(
+                "You are a health advisor. Provide a natural response.",
+                final_prompt,
+                deadline=deadline
+            )
+
+    def _final_prompt(self, original_query: str, reasoning_text: str) -> str:
+        """Second-pass prompt that turns reasoning into the user-facing answer"""
+        return f"""Based on this reasoning:
 
 {reasoning_text}
 
@@ -132,25 +364,37 @@ Remember:
 
 Final Response:"""
 
-            if self.is_groq:
-                final_response = await self.client.chat.completions.create(
-                    model=self.model_name,
-                    messages=[
-                        {"role": "system", "content": "You are a health advisor. Provide a natural response."},
-                        {"role": "user", "content": final_prompt}
-                    ],
-                    temperature=0.7
-                )
-                final_text = final_response.choices[0].message.content
-            else:
-                loop = asyncio.get_event_loop()
-                final_response = await loop.run_in_executor(None, lambda: self.model.generate_content(final_prompt))
-                final_text = final_response.text
-            
-            print("Response generated successfully")
-            return final_text
-            
-        except Exception as e:
-            print(f"Error generating response: {str(e)}")
-            return """I apologize, but I'm having trouble generating a response right now. 
-For your safety and best advice, please consider consulting with a healthcare professional."""
\ No newline at end of file
+    def _single_pass_prompt(self, original_query: str, context: str) -> str:
+        """One structured prompt: reason privately, output only the final answer"""
+        return f"""As a health advisor, answer the user's question using the context below.
+
+User Query: {original_query}
+
+Context Information:
+{context}
+
+Before answering, silently work through:
+1. The main health topic/concern and the level of detail needed
+2. Which context and research findings are relevant, and any safety concerns
+3. Whether warnings or professional consultation should be recommended
+
+Do NOT include this reasoning in your reply. Output only the final answer.
+
+Guidelines for the final answer:
+- Start with a direct answer to the question
+- Include relevant context naturally; only mention general health tips or products if truly relevant
+- Add safety information and suggest professional help when appropriate
+- Be clear about limitations and uncertainties
+- Keep it concise, conversational and professional
+
+Final Response:"""
+
+    async def _generate_single_pass(self, original_query: str, context: str, deadline: Optional[Deadline] = None) -> str:
+        """Single LLM call with hidden reasoning"""
+        logger.debug("Getting single-pass response from %s", self.provider)
+        with metrics.timer("generation_pass_seconds", generation_pass="single"):
+            return await self._complete(
+                "You are a health advisor. Reason carefully but reply with the final answer only.",
+                self._single_pass_prompt(original_query, context),
+                deadline=deadline
+            )
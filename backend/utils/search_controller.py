@@ -1,11 +1,36 @@
 # backend/utils/search_controller.py
 from openai import AsyncOpenAI
-from typing import List, Dict
-import json
+from typing import List, Dict, Optional
 import asyncio
+import functools
+import hashlib
+import json
+import logging
+import re
+import threading
+
+from utils.metrics import metrics
+from utils.rate_limiter import PRIORITY_RESEARCH, run_upstream
+
+logger = logging.getLogger(__name__)
+
+def _retrieve_exception(task: asyncio.Task):
+    # Every caller may have stopped waiting; mark the failure as seen so asyncio doesn't warn
+    if not task.cancelled():
+        task.exception()
 
 class SearchController:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, cache=None, clients=None, scheduler=None):
+        # Optional persistent research cache (SQLiteCacheStore) and in-flight request coalescing
+        self.cache = cache
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._inflight_lock = threading.Lock()
+        self.coalesced = 0
+        self.failed = 0
+        self.timed_out = 0
+        # Research runs at lower priority than generation in the shared upstream scheduler
+        self.scheduler = scheduler
+        
         # Handle missing API key gracefully
         if not api_key:
             self.client = None
@@ -14,28 +39,108 @@ class SearchController:
             
         # Use Groq if the key starts with gsk_
         base_url = "https://api.groq.com/openai/v1" if api_key.startswith("gsk_") else None
-        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url)
+        if clients:
+            self.client = clients.openai_client(api_key, base_url)
+        else:
+            self.client = AsyncOpenAI(api_key=api_key, base_url=base_url)
         self.model = "llama-3.3-70b-versatile" if api_key.startswith("gsk_") else "llama-3.1-sonar-small-128k-online"
+        self.provider = "groq" if api_key.startswith("gsk_") else "sonar"
     
-    async def search_research(self, queries: List[str]) -> Dict[str, str]:
-        """Search for research papers and medical data"""
+    async def search_research(self, queries: List[str], timeout: Optional[float] = None) -> Dict[str, str]:
+        """Search for research papers and medical data; failed or unfinished sub-queries are left out"""
         # Return empty if client not initialized (no API key)
         if not self.client:
-            print("SearchController: No API key configured, skipping research")
+            logger.info("No research API key configured, skipping research")
+            return {}
+        if not queries:
             return {}
-            
-        results = {}
         
         # Process queries concurrently
         async def process_query(query: str) -> tuple:
             try:
-                print(f"\n=== Searching for: {query} ===")
-                response = await self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": """You are a medical research assistant. Search and summarize recent, reliable research papers and medical data.
+                with metrics.timer("research_query_seconds"):
+                    return query, await self._get_research(query)
+            except Exception as e:
+                logger.error("Error searching for %r: %s", query, e)
+                self.failed += 1
+                return query, None
+        
+        # Process all queries concurrently; whatever misses the timeout is cancelled
+        tasks = [asyncio.create_task(process_query(query)) for query in queries]
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            self.timed_out += len(pending)
+            metrics.inc("research_timeouts", len(pending))
+            logger.warning("Research timed out after %.1fs; %d of %d sub-queries unfinished", timeout, len(pending), len(tasks))
+            await asyncio.gather(*pending, return_exceptions=True)
+        
+        # Convert results to dictionary; error text never reaches the generator
+        return {
+            query: content
+            for query, content in (task.result() for task in tasks if task in done)
+            if content is not None
+        }
+
+    def _cache_key(self, query: str) -> str:
+        """Hash of the normalized sub-query plus model name"""
+        normalized = re.sub(r"\s+", " ", query.lower()).strip().rstrip("?!. ")
+        return hashlib.sha256(f"{self.model}\n{normalized}".encode('utf-8')).hexdigest()
+
+    async def _get_research(self, query: str) -> str:
+        """Cached, coalesced research lookup for one sub-query"""
+        key = self._cache_key(query)
+        loop = asyncio.get_running_loop()
+        if self.cache:
+            # SQLite I/O stays off the shared event loop
+            cached = await loop.run_in_executor(None, self.cache.get, key)
+            if cached is not None:
+                metrics.inc("cache_requests", cache="research", result="hit")
+                logger.debug("Research cache hit for: %r", query)
+                return cached
+        
+        # Identical sub-queries already in flight (from any request) share one upstream call
+        with self._inflight_lock:
+            task = self._inflight.get(key)
+            joined = task is not None and task.get_loop() is loop
+            if joined:
+                self.coalesced += 1
+            else:
+                task = loop.create_task(self._fetch_shared(key, query))
+                task.add_done_callback(_retrieve_exception)
+                self._inflight[key] = task
+        
+        metrics.inc("cache_requests", cache="research", result="coalesced" if joined else "miss")
+        if joined:
+            logger.debug("Joining in-flight research for: %r", query)
+        # The fetch belongs to no single request: a caller's timeout or cancellation
+        # only ends that caller's wait, and the result still reaches the cache
+        return await asyncio.shield(task)
+
+    async def _fetch_shared(self, key: str, query: str) -> str:
+        """Upstream fetch shared by every caller of one sub-query; runs as its own task"""
+        try:
+            with metrics.upstream("research"):
+                content = await self._fetch_research(query)
+            if self.cache:
+                await asyncio.get_running_loop().run_in_executor(None, self.cache.set, key, content)
+            return content
+        finally:
+            with self._inflight_lock:
+                if self._inflight.get(key) is asyncio.current_task():
+                    del self._inflight[key]
+
+    async def _fetch_research(self, query: str) -> str:
+        """Run one research query against the search model"""
+        logger.debug("Searching for: %r", query)
+        response = await run_upstream(self.scheduler, self.provider, functools.partial(
+            self.client.chat.completions.create,
+            model=self.model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": """You are a medical research assistant. Search and summarize recent, reliable research papers and medical data.
 Focus on:
 1. Scientific evidence and clinical studies
 2. Potential health risks and safety concerns
@@ -47,32 +152,29 @@ Format your response to include:
 - Safety warnings
 - Scientific consensus
 - References to studies (if available)"""
-                        },
-                        {
-                            "role": "user",
-                            "content": f"Search for recent scientific research about: {query}"
-                        }
-                    ],
-                    temperature=0.3,
-                    max_tokens=1024
-                )
-                
-                content = response.choices[0].message.content
-                print(f"Found research for: {query}")
-                return query, content
-                
-            except Exception as e:
-                print(f"Error searching for {query}: {str(e)}")
-                return query, f"Error retrieving research: {str(e)}"
-        
-        # Process all queries concurrently
-        tasks = [process_query(query) for query in queries]
-        query_results = await asyncio.gather(*tasks)
+                },
+                {
+                    "role": "user",
+                    "content": f"Search for recent scientific research about: {query}"
+                }
+            ],
+            temperature=0.3,
+            max_tokens=1024
+        ), PRIORITY_RESEARCH)
         
-        # Convert results to dictionary
-        results = dict(query_results)
-        
-        return results
+        content = response.choices[0].message.content
+        logger.debug("Found research for: %r", query)
+        return content
+
+    def stats(self) -> Dict:
+        """Research cache and coalescing counters"""
+        stats = self.cache.stats() if self.cache else {}
+        stats["coalesced"] = self.coalesced
+        stats["failed"] = self.failed
+        stats["timed_out"] = self.timed_out
+        with self._inflight_lock:
+            stats["inflight"] = len(self._inflight)
+        return stats
     
 
 
@@ -114,7 +216,7 @@ Process Flow:
 
 2. Parallel Processing:
    - Creates async tasks for each query
-   - Manages concurrent execution
+   - Upstream calls share the per-provider scheduler at research priority
    - Handles individual query failures
 
 3. Result Aggregation:
@@ -123,8 +225,9 @@ Process Flow:
    - Handles errors gracefully
 
 Error Handling:
-- Per-query error management
-- Graceful failure handling
+- Transient failures and 429s retried with jitter by the scheduler
+- Sub-queries that still fail are left out of the results
+- An optional timeout returns the sub-queries finished in time and cancels the rest
 - Detailed error reporting
 
 Usage Example:
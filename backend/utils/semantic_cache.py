@@ -0,0 +1,128 @@
+# backend/utils/semantic_cache.py
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from utils.metrics import metrics
+
+# Self-disclosure ("my", "I have", "I'm taking") shouldn't be answered from someone else's turn;
+# a bare "I" is too common in generic questions ("how much sleep do I need") to exclude
+PERSONAL_PATTERN = re.compile(
+    r"\b(my|mine|myself|our|ours|i'm|im|i am|i've|ive|i have|i had|i was|i feel|i felt|i take|i took|i'd)\b"
+)
+
+class SemanticCache:
+    """In-process cache of answers keyed on normalized-message embeddings"""
+
+    def __init__(
+        self,
+        embedding_function,
+        threshold: float = 0.92,
+        ttl_seconds: int = 86400,
+        max_entries: int = 1000
+    ):
+        self.embedding_function = embedding_function
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # normalized message -> (unit vector, answer, created_at, upstream_calls)
+        self._entries: "OrderedDict[str, Tuple[np.ndarray, str, float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "lookups": 0,
+            "hits": 0,
+            "misses": 0,
+            "skipped": 0,
+            "evictions": 0,
+            "expired": 0,
+            "saved_upstream_calls": 0,
+            "lookup_ms_total": 0.0
+        }
+
+    @staticmethod
+    def normalize(message: str) -> str:
+        """Lowercase, collapse whitespace and drop trailing punctuation"""
+        return re.sub(r"\s+", " ", message.lower()).strip().rstrip("?!. ")
+
+    def is_cacheable(self, message: str, conversation_context: str) -> bool:
+        """Only context-free, impersonal questions; entries are shared by every user"""
+        normalized = self.normalize(message)
+        # Any prior turns (or their summary) are in the prompt and may shape the answer,
+        # so it must neither be served from nor stored into the shared cache
+        cacheable = bool(normalized) and not conversation_context and not PERSONAL_PATTERN.search(normalized)
+        if not cacheable:
+            with self._lock:
+                self._stats["skipped"] += 1
+        return cacheable
+
+    def embed(self, message: str) -> np.ndarray:
+        """Unit-length embedding of the normalized message"""
+        vector = np.asarray(self.embedding_function([self.normalize(message)])[0], dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, message: str) -> Tuple[Optional[str], np.ndarray]:
+        """Return (cached answer or None, query embedding)"""
+        start = time.perf_counter()
+        vector = self.embed(message)
+        now = time.time()
+        answer = None
+        saved_calls = 0
+
+        with self._lock:
+            # Drop expired entries; insertion order tracks recency, not age, so scan all
+            expired = [key for key, entry in self._entries.items() if now - entry[2] > self.ttl_seconds]
+            for key in expired:
+                del self._entries[key]
+            self._stats["expired"] += len(expired)
+
+            if self._entries:
+                keys = list(self._entries)
+                matrix = np.stack([self._entries[key][0] for key in keys])
+                scores = matrix @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    key = keys[best]
+                    self._entries.move_to_end(key)
+                    answer = self._entries[key][1]
+                    saved_calls = self._entries[key][3]
+                    self._stats["saved_upstream_calls"] += saved_calls
+
+            self._stats["lookups"] += 1
+            self._stats["hits" if answer is not None else "misses"] += 1
+            elapsed = time.perf_counter() - start
+            self._stats["lookup_ms_total"] += elapsed * 1000
+
+        # Exported for /metrics; hit rate is semantic_cache_hits / semantic_cache_lookups
+        metrics.inc("semantic_cache_lookups")
+        metrics.observe("semantic_cache_lookup_seconds", elapsed)
+        if answer is not None:
+            metrics.inc("semantic_cache_hits")
+            metrics.inc("upstream_calls_saved", saved_calls)
+        return answer, vector
+
+    def store(self, message: str, answer: str, upstream_calls: int, vector: Optional[np.ndarray] = None):
+        """Cache an answer, evicting the least recently used entry when full"""
+        if vector is None:
+            vector = self.embed(message)
+        key = self.normalize(message)
+        with self._lock:
+            self._entries[key] = (vector, answer, time.time(), upstream_calls)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def stats(self) -> Dict:
+        """Snapshot of cache counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookup_ms_total = stats.pop("lookup_ms_total")
+        stats["hit_rate"] = round(stats["hits"] / stats["lookups"], 4) if stats["lookups"] else 0.0
+        stats["avg_lookup_ms"] = round(lookup_ms_total / stats["lookups"], 3) if stats["lookups"] else 0.0
+        return stats
@@ -0,0 +1,246 @@
+# backend/utils/session_store.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+class Message:
+    """Compact conversation message record"""
+    __slots__ = ("role", "content", "ts")
+
+    def __init__(self, role: str, content: str, ts: float):
+        self.role = role
+        self.content = content
+        self.ts = ts
+
+    def to_dict(self) -> Dict:
+        return {
+            "role": self.role,
+            "content": self.content,
+            "timestamp": datetime.fromtimestamp(self.ts).isoformat()
+        }
+
+class Session:
+    """Per-session conversation state, including the packed prompt prefix"""
+    __slots__ = ("messages", "summary", "last_update", "packed_turns", "packed_tokens", "packed_text")
+
+    def __init__(self, messages: Optional[List[Message]] = None, summary: str = "", last_update: float = 0.0):
+        self.messages = messages if messages is not None else []
+        self.summary = summary
+        self.last_update = last_update
+        # Recent turns that fit the context token budget: [[text, tokens], ...]
+        self.packed_turns: List[list] = []
+        self.packed_tokens = 0
+        self.packed_text = ""
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "messages": [(m.role, m.content, m.ts) for m in self.messages],
+            "summary": self.summary,
+            "last_update": self.last_update,
+            "packed_turns": self.packed_turns,
+            "packed_tokens": self.packed_tokens,
+            "packed_text": self.packed_text
+        })
+
+    @classmethod
+    def from_json(cls, data: str) -> "Session":
+        raw = json.loads(data)
+        session = cls(
+            messages=[Message(role, content, ts) for role, content, ts in raw["messages"]],
+            summary=raw.get("summary", ""),
+            last_update=raw.get("last_update", 0.0)
+        )
+        session.packed_turns = raw.get("packed_turns", [])
+        session.packed_tokens = raw.get("packed_tokens", 0)
+        session.packed_text = raw.get("packed_text", "")
+        return session
+
+class MemorySessionStore:
+    """In-process session store with a max-sessions LRU and idle TTL eviction"""
+
+    def __init__(self, max_sessions: int = 10000, idle_ttl: int = 3600):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = {"lru": 0, "idle": 0}
+
+    def get(self, session_id: str) -> Optional[Session]:
+        with self._lock:
+            return self._get(session_id)
+
+    def _get(self, session_id: str) -> Optional[Session]:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        if time.time() - session.last_update > self.idle_ttl:
+            del self._sessions[session_id]
+            self.evictions["idle"] += 1
+            return None
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def put(self, session_id: str, session: Session):
+        with self._lock:
+            self._put(session_id, session)
+
+    def _put(self, session_id: str, session: Session):
+        self._sessions[session_id] = session
+        self._sessions.move_to_end(session_id)
+        self._evict(time.time())
+
+    def update(self, session_id: str, fn: Callable[[Optional[Session]], Optional[Session]]) -> Optional[Session]:
+        """Atomic read-modify-write: fn gets the current session (or None) and returns what to store (None: no write); returns the stored session"""
+        with self._lock:
+            session = fn(self._get(session_id))
+            if session is not None:
+                self._put(session_id, session)
+            return session
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _evict(self, now: float):
+        # Least recently used sessions sit at the front, so idle ones are found first
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_update > self.idle_ttl:
+                self.evictions["idle"] += 1
+            elif len(self._sessions) > self.max_sessions:
+                self.evictions["lru"] += 1
+            else:
+                break
+            del self._sessions[session_id]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"backend": "memory", "sessions": len(self._sessions), "evictions": dict(self.evictions)}
+
+class SQLiteSessionStore:
+    """Persistent session store; survives restarts and can be shared by worker processes (updates are transactional)"""
+    SWEEP_EVERY = 50
+
+    def __init__(self, db_path: str, max_sessions: int = 10000, idle_ttl: int = 3600):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                last_update REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_last_update ON sessions (last_update)")
+        self._conn.commit()
+        self.evictions = {"lru": 0, "idle": 0}
+        self._puts = 0
+
+    def get(self, session_id: str) -> Optional[Session]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, last_update FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            if time.time() - row[1] > self.idle_ttl:
+                self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                self._conn.commit()
+                self.evictions["idle"] += 1
+                return None
+        return Session.from_json(row[0])
+
+    def put(self, session_id: str, session: Session):
+        with self._lock:
+            self._put(session_id, session)
+            self._conn.commit()
+
+    def _put(self, session_id: str, session: Session):
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO sessions (session_id, data, last_update) VALUES (?, ?, ?)",
+            (session_id, session.to_json(), session.last_update or now)
+        )
+        self._puts += 1
+        if self._puts % self.SWEEP_EVERY == 0:
+            self._evict(now)
+
+    def update(self, session_id: str, fn: Callable[[Optional[Session]], Optional[Session]]) -> Optional[Session]:
+        """Atomic read-modify-write: fn gets the current session (or None) and returns what to store (None: no write); returns the stored session
+
+        BEGIN IMMEDIATE takes the write lock before the read, so two worker
+        processes updating the same session serialize instead of losing a turn.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT data, last_update FROM sessions WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                current = None
+                if row is not None:
+                    if time.time() - row[1] > self.idle_ttl:
+                        self.evictions["idle"] += 1
+                    else:
+                        current = Session.from_json(row[0])
+                session = fn(current)
+                if session is not None:
+                    self._put(session_id, session)
+                elif row is not None and current is None:
+                    self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+            return session
+
+    def _evict(self, now: float):
+        # Sweeps are periodic since counting rows is a table scan
+        idle = self._conn.execute(
+            "DELETE FROM sessions WHERE last_update < ?", (now - self.idle_ttl,)
+        ).rowcount
+        self.evictions["idle"] += max(idle, 0)
+
+        overflow = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] - self.max_sessions
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM sessions WHERE session_id IN "
+                "(SELECT session_id FROM sessions ORDER BY last_update LIMIT ?)",
+                (overflow,)
+            )
+            self.evictions["lru"] += overflow
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            return {"backend": "sqlite", "sessions": count, "evictions": dict(self.evictions)}
+
+def create_session_store(config):
+    """Build the session store selected by Config.SESSION_BACKEND"""
+    if config.SESSION_BACKEND == "sqlite":
+        return SQLiteSessionStore(
+            config.SESSION_DB_PATH,
+            max_sessions=config.SESSION_MAX_SESSIONS,
+            idle_ttl=config.STREAMLIT_SESSION_TIMEOUT
+        )
+    if config.SESSION_BACKEND != "memory":
+        raise ValueError(f"Unknown session backend: {config.SESSION_BACKEND}")
+    return MemorySessionStore(
+        max_sessions=config.SESSION_MAX_SESSIONS,
+        idle_ttl=config.STREAMLIT_SESSION_TIMEOUT
+    )
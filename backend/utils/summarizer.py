@@ -0,0 +1,81 @@
+# backend/utils/summarizer.py
+import re
+from typing import Awaitable, Callable, List, Tuple
+from utils.tokens import estimate_tokens, truncate_to_tokens
+
+# Sentences that carry durable facts about the user (conditions, medications, numbers)
+FACT_PATTERN = re.compile(
+    r"\b(i am|i'm|i have|i've|i was|my|allergic|diagnosed|pregnant|diabetic|medication|"
+    r"taking|prescribed|surgery|age|years old|kg|lbs|mg)\b|\d+",
+    re.IGNORECASE
+)
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+def split_turn(turn_text: str) -> Tuple[str, str]:
+    """Split packed 'User: ...\\nAssistant: ...' turn text into message and response"""
+    user_part, _, assistant_part = turn_text.partition("\nAssistant: ")
+    return user_part[len("User: "):], assistant_part
+
+class ExtractiveSummarizer:
+    """Cheap running summary: keeps the most informative sentence of each evicted turn"""
+
+    def __init__(self, user_tokens: int = 40, assistant_tokens: int = 25):
+        self.user_tokens = user_tokens
+        self.assistant_tokens = assistant_tokens
+
+    @staticmethod
+    def _score(sentence: str) -> int:
+        return 1 + 2 * len(FACT_PATTERN.findall(sentence))
+
+    def _best_sentence(self, text: str) -> str:
+        sentences = [s.strip() for s in SENTENCE_SPLIT.split(text) if s.strip()]
+        if not sentences:
+            return ""
+        # First sentence wins ties, so the topic is kept when nothing stands out
+        return max(sentences, key=self._score)
+
+    def summarize_turn(self, message: str, response: str) -> List[str]:
+        """Summary lines for one evicted turn"""
+        lines = []
+        user_sentence = self._best_sentence(message)
+        if user_sentence:
+            lines.append(f"User: {truncate_to_tokens(user_sentence, self.user_tokens)}")
+        answer_sentence = SENTENCE_SPLIT.split(response.strip(), 1)[0] if response.strip() else ""
+        if answer_sentence:
+            lines.append(f"Assistant: {truncate_to_tokens(answer_sentence, self.assistant_tokens)}")
+        return lines
+
+    def fold(self, summary: str, evicted_turns: List[str], max_tokens: int) -> str:
+        """Fold evicted turns into the running summary, staying within max_tokens"""
+        lines = summary.split("\n") if summary else []
+        for turn_text in evicted_turns:
+            lines.extend(self.summarize_turn(*split_turn(turn_text)))
+
+        # Over budget: drop the least informative lines first (oldest among equals),
+        # so early facts like allergies outlive small talk
+        while lines and estimate_tokens("\n".join(lines)) > max_tokens:
+            weakest = min(range(len(lines)), key=lambda i: (self._score(lines[i]), i))
+            del lines[weakest]
+        return "\n".join(lines)
+
+class LLMSummarizer:
+    """Abstractive running summary produced by an LLM call off the request path"""
+
+    def __init__(self, complete: Callable[[str, str], Awaitable[str]]):
+        # complete(system_prompt, prompt) -> text, e.g. ResponseGenerator._complete
+        self.complete = complete
+
+    async def fold(self, summary: str, evicted_turns: List[str], max_tokens: int) -> str:
+        """Rewrite the running summary to include the evicted turns"""
+        prompt = f"""Update the running summary of a health chat with the new conversation turns.
+
+Current summary:
+{summary or "(empty)"}
+
+New turns:
+{chr(10).join(evicted_turns)}
+
+Keep durable facts about the user (conditions, medications, allergies, goals) and the topics discussed.
+Use short plain lines, at most {max_tokens * 3 // 4} words in total. Return only the summary."""
+        text = await self.complete("You summarize conversations concisely and accurately.", prompt)
+        return truncate_to_tokens(text.strip(), max_tokens)
@@ -0,0 +1,14 @@
+# backend/utils/tokens.py
+
+def estimate_tokens(text: str) -> int:
+    """Fast local token estimate (~4 characters per token for English text)"""
+    if not text:
+        return 0
+    return max(1, (len(text) + 3) // 4)
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Trim text so its estimate fits within max_tokens"""
+    max_chars = max(0, max_tokens * 4)
+    if len(text) <= max_chars:
+        return text
+    return text[:max(0, max_chars - 3)].rstrip() + "..."
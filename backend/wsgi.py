@@ -0,0 +1,15 @@
+# backend/wsgi.py
+"""
+Production WSGI entry point for the health chatbot API.
+
+Serves the Flask app from app.py with a threaded WSGI server. Each request
+(and each open /chat/stream connection) holds one server thread while its
+async work runs on the single event loop owned by app.runtime, so pooled LLM
+connections and in-flight research coalescing are shared across requests.
+
+Run from the backend directory with one worker process (the event loop,
+caches, write-behind queue and Chroma client live in the process) and as
+many threads as concurrent requests plus open streams to allow:
+    gunicorn wsgi:app --worker-class gthread --workers 1 --threads 64 --timeout 120 --bind 0.0.0.0:5000
+"""
+from app import app
@@ -48,15 +48,34 @@ def check_password():
         # Password correct.
         return True
 
-def fetch_feedback():
+PAGE_SIZE = 50
+
+def fetch_feedback_page(cursor=None, filters=None):
+    """One page of feedback from the API; the full table is never downloaded"""
     try:
-        response = requests.get(f"{API_URL}/admin/feedback")
+        params = {"limit": PAGE_SIZE, **(filters or {})}
+        if cursor:
+            params["cursor"] = cursor
+        response = requests.get(f"{API_URL}/admin/feedback", params=params)
         if response.status_code == 200:
-            return response.json().get("feedback", [])
-        return []
+            data = response.json()
+            return data.get("feedback", []), data.get("next_cursor")
+        return [], None
     except Exception as e:
         st.error(f"Error fetching data: {str(e)}")
-        return []
+        return [], None
+
+def fetch_feedback_stats(filters=None):
+    """Server-side aggregates (running totals per day)"""
+    try:
+        params = {key: value for key, value in (filters or {}).items() if key in ("since", "until")}
+        response = requests.get(f"{API_URL}/admin/feedback/stats", params=params)
+        if response.status_code == 200:
+            return response.json()
+        return {}
+    except Exception as e:
+        st.error(f"Error fetching stats: {str(e)}")
+        return {}
 
 def main():
     st.title("🛡️ Admin Dashboard")
@@ -68,9 +87,49 @@ def main():
         st.header("📝 User Feedback")
         
         if st.button("Refresh Data"):
+            st.session_state["feedback_cursors"] = [None]
             st.rerun()
-            
-        feedback_data = fetch_feedback()
+        
+        # Filters
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            min_rating, max_rating = st.slider("Rating", 1, 5, (1, 5))
+        with col2:
+            since = st.date_input("From", value=None)
+        with col3:
+            until = st.date_input("To", value=None)
+        
+        filters = {"min_rating": min_rating, "max_rating": max_rating}
+        if since:
+            filters["since"] = since.isoformat()
+        if until:
+            filters["until"] = until.isoformat()
+        
+        # Reset pagination whenever the filters change
+        if st.session_state.get("feedback_filters") != filters:
+            st.session_state["feedback_filters"] = filters
+            st.session_state["feedback_cursors"] = [None]
+        cursors = st.session_state.setdefault("feedback_cursors", [None])
+        
+        # Display metrics (date filters only; aggregates are kept per day)
+        stats = fetch_feedback_stats(filters)
+        total = stats.get("total", {})
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Total Feedback", total.get("count", 0))
+        with col2:
+            st.metric("Average Rating", f"{total.get('average', 0.0):.1f}/5.0")
+        
+        days = stats.get("days", [])
+        if days:
+            daily = pd.DataFrame([
+                {"day": day["day"], "count": day["count"], "average": day["average"]}
+                for day in days
+            ]).set_index("day").sort_index()
+            st.line_chart(daily["average"])
+            st.bar_chart(pd.DataFrame([total.get("histogram", {})]).T.rename(columns={0: "count"}))
+        
+        feedback_data, next_cursor = fetch_feedback_page(cursors[-1], filters)
         
         if feedback_data:
             df = pd.DataFrame(feedback_data)
@@ -79,14 +138,6 @@ def main():
             if 'timestamp' in df.columns:
                 df['timestamp'] = pd.to_datetime(df['timestamp']).dt.strftime('%Y-%m-%d %H:%M:%S')
             
-            # Display metrics
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("Total Feedback", len(df))
-            with col2:
-                avg_rating = df['rating'].mean() if 'rating' in df.columns else 0
-                st.metric("Average Rating", f"{avg_rating:.1f}/5.0")
-            
             # Display Dataframe
             st.dataframe(
                 df,
@@ -103,6 +154,19 @@ def main():
                 hide_index=True,
                 use_container_width=True
             )
+            
+            # Pagination
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col1:
+                if len(cursors) > 1 and st.button("← Newer"):
+                    cursors.pop()
+                    st.rerun()
+            with col2:
+                st.caption(f"Page {len(cursors)}")
+            with col3:
+                if next_cursor and st.button("Older →"):
+                    cursors.append(next_cursor)
+                    st.rerun()
         else:
             st.info("No feedback data available.")
 
@@ -40,20 +40,31 @@ def get_random_tip():
         st.error(f"Error fetching health tip: {str(e)}")
         return None
 
-def send_message(message):
-    """Send chat message to API"""
+def stream_message(message):
+    """Send chat message to the streaming endpoint and yield response tokens"""
     try:
-        response = requests.post(
-            f"{API_URL}/chat",
+        with requests.post(
+            f"{API_URL}/chat/stream",
             json={
                 "user_id": st.session_state.user_id,
                 "message": message
-            }
-        )
-        return response.json()
+            },
+            stream=True
+        ) as response:
+            if response.status_code != 200:
+                st.error(f"Error sending message: HTTP {response.status_code}")
+                return
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data: "):
+                    continue
+                event = json.loads(line[len("data: "):])
+                if event.get("error"):
+                    st.error(f"Error sending message: {event['error']}")
+                if event.get("done"):
+                    break
+                yield event.get("token", "")
     except Exception as e:
         st.error(f"Error sending message: {str(e)}")
-        return None
 
 def submit_feedback(rating, comment):
     """Submit user feedback to API"""
@@ -129,14 +140,15 @@ if prompt := st.chat_input("How can I help you today?"):
     with st.chat_message("user"):
         st.markdown(prompt)
 
-    # Get bot response
-    response = send_message(prompt)
-    if response:
-        # Add assistant response to chat history
-        assistant_response = response.get('response', "I'm sorry, I couldn't process that request.")
-        st.session_state.messages.append({"role": "assistant", "content": assistant_response})
-        with st.chat_message("assistant"):
+    # Stream bot response as it is generated
+    with st.chat_message("assistant"):
+        assistant_response = st.write_stream(stream_message(prompt))
+        if not assistant_response:
+            assistant_response = "I'm sorry, I couldn't process that request."
             st.markdown(assistant_response)
+    
+    # Add assistant response to chat history
+    st.session_state.messages.append({"role": "assistant", "content": assistant_response})
 
 # Footer
 st.markdown("---")
\ No newline at end of file